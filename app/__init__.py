@@ -4,15 +4,20 @@ from flask_wtf.csrf import CSRFProtect
 from flask_login import LoginManager
 import os
 from datetime import datetime
+from app.cache import leaderboard_cache, user_cache
+from app.events import match_events
+from app.group_commit import group_writer
+from app.metrics import metrics
+from app.database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 csrf = CSRFProtect()
 login = LoginManager()
 login.login_view = "auth.login"
 login.login_message_category = "info"
 
 
-def create_app(config_name="default"):
+def create_app(config_name="default", config=None):
     app = Flask(__name__, instance_relative_config=True)
 
     # Ensure the instance folder exists
@@ -21,6 +26,43 @@ def create_app(config_name="default"):
     except OSError:
         pass
 
+    # Defaults for settings that instance/config.py may override
+    app.config.from_mapping(
+        MATCHES_PAGE_SIZE=20,
+        MATCHES_MAX_PAGE_SIZE=100,
+        LEADERBOARD_CACHE_SIZE=1024,
+        LEADERBOARD_CACHE_TTL=300,
+        USER_CACHE_SIZE=4096,
+        USER_CACHE_TTL=300,
+        SSE_KEEPALIVE=15,
+        SSE_QUEUE_SIZE=100,
+        SSE_MAX_STREAMS=32,  # per process, see app/events.py
+        SQL_SLOW_QUERY_MS=100,
+        SQL_STATS_HEADERS=None,  # None: only in debug mode
+        SQL_LOG_FILE=None,  # None: instance/logs/sql.log
+        SQL_LOG_MAX_BYTES=1_000_000,
+        SQL_LOG_BACKUP_COUNT=5,
+        METRICS_DIR=None,  # None: instance/metrics
+        ARCHIVE_AFTER_DAYS=90,
+        ARCHIVE_BATCH_SIZE=100,
+        PURGE_AFTER_DAYS=30,
+        PURGE_BATCH_SIZE=100,
+        SQLITE_PROFILE="tuned",  # see app/database.py
+        SQLITE_PRAGMAS=None,  # overrides of the profile's pragmas
+        SQLITE_STATEMENT_CACHE_SIZE=256,
+        DB_POOL_SIZE=10,
+        DB_MAX_OVERFLOW=20,
+        DB_READ_ROUTING=True,  # only with WAL on a file database
+        DB_WRITE_POOL_SIZE=1,  # writer connections when reads are routed
+        SCORING_MAX_RETRIES=3,
+        GROUP_COMMIT=False,  # batch scoring writes, see app/group_commit.py
+        GROUP_COMMIT_WINDOW_MS=2,
+        GROUP_COMMIT_MAX_BATCH=64,
+        GROUP_COMMIT_TIMEOUT=30,
+        IDEMPOTENCY_KEY_TTL=24 * 60 * 60,  # seconds, see app/idempotency.py
+        IDEMPOTENCY_LOCK_TIMEOUT=60,  # seconds before a stuck key is retaken
+    )
+
     # Load the default configuration
     app.config.from_pyfile("config.py")
 
@@ -28,17 +70,34 @@ def create_app(config_name="default"):
     if config_name == "testing":
         app.config.update(TESTING=True, SQLALCHEMY_DATABASE_URI="sqlite:///:memory:")
 
+    # Explicit overrides, e.g. from tests or benchmarks
+    if config:
+        app.config.update(config)
+
+    from .database import engine_options
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
     # Initialize extensions
     db.init_app(app)
     csrf.init_app(app)
     login.init_app(app)
+    leaderboard_cache.configure(
+        app.config["LEADERBOARD_CACHE_SIZE"], app.config["LEADERBOARD_CACHE_TTL"]
+    )
+    user_cache.configure(app.config["USER_CACHE_SIZE"], app.config["USER_CACHE_TTL"])
+    match_events.configure(app.config["SSE_QUEUE_SIZE"], app.config["SSE_MAX_STREAMS"])
+    group_writer.configure(app)
+    if not app.config["METRICS_DIR"]:
+        app.config["METRICS_DIR"] = os.path.join(app.instance_path, "metrics")
+    metrics.configure(app.config["METRICS_DIR"])
 
     # User loader callback
-    from app.models import User
+    from app.services.user_service import UserService
 
     @login.user_loader
     def load_user(id):
-        return db.session.get(User, int(id))
+        return UserService.load_user(int(id))
 
     # Register error handlers
     @app.errorhandler(404)
@@ -69,6 +128,38 @@ def create_app(config_name="default"):
         app.register_blueprint(matches_bp, url_prefix="/matches")
         app.register_blueprint(auth_bp, url_prefix="/auth")
 
+        from .database import (
+            READ_ENGINE,
+            configure_sqlite,
+            create_read_engine,
+            init_read_routing,
+            read_pragmas,
+            read_routing_enabled,
+            sqlite_pragmas,
+        )
+
+        pragmas = sqlite_pragmas(app.config)
+        configure_sqlite(db.engine, pragmas)
+        engines = [db.engine]
+        if read_routing_enabled(app.config):
+            reader = create_read_engine(app.config, db.engine.url)
+            configure_sqlite(reader, read_pragmas(pragmas))
+            app.extensions[READ_ENGINE] = reader
+            init_read_routing(app, db.session)
+            engines.append(reader)
+
+        from .commands import register_commands
+
+        register_commands(app)
+
+        from .sql_stats import init_sql_stats
+
+        init_sql_stats(app, *engines)
+
+        from .metrics import init_metrics
+
+        init_metrics(app)
+
         db.create_all()
 
     return app
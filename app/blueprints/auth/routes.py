@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, current_user, login_required
 from urllib.parse import urlsplit
 from app.models import User, db
 from app.forms import LoginForm, RegistrationForm
+from app.services.user_service import UserService
 from . import bp
 
 
@@ -29,6 +30,8 @@ def login():
 
 @bp.route("/logout")
 def logout():
+    if current_user.is_authenticated:
+        UserService.invalidate(current_user.id)
     logout_user()
     return redirect(url_for("main.home"))
 
@@ -1,5 +1,6 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, Response, render_template
 from app.models import db
+from app.metrics import metrics
 
 bp = Blueprint("main", __name__)
 
@@ -8,3 +9,9 @@ bp = Blueprint("main", __name__)
 def home():
     """Home page route."""
     return render_template("home.html")
+
+
+@bp.route("/metrics")
+def metrics_endpoint():
+    """Request metrics for all workers in the Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,4 +1,8 @@
+import gzip
+import queue
 from flask import (
+    Response,
+    current_app,
     render_template,
     redirect,
     url_for,
@@ -7,12 +11,20 @@ from flask import (
     jsonify,
     abort,
     get_flashed_messages,
+    session,
 )
 from flask_login import login_required, current_user
 from app.models import db
+from app.events import StreamLimitError, match_events
+from app.idempotency import idempotent
 from app.services.match_service import MatchService
-from app.services.hole_service import HoleService
-from app.services.pointstable_service import PointstableService
+from app.services.hole_service import (
+    ConflictError,
+    HoleService,
+    ScoringTimeoutError,
+)
+from app.services.leaderboard_service import LeaderboardService
+from app.services.snapshot_service import SnapshotService
 from app.forms import HoleForm, MatchForm
 from . import bp
 
@@ -20,9 +32,20 @@ from . import bp
 @bp.route("/")
 @login_required
 def matches():
-    """List all matches for the current user."""
-    matches = MatchService.get_all_matches()
-    return render_template("matches.html", matches=matches)
+    """List the current user's matches a page at a time."""
+    try:
+        matches, next_cursor = MatchService.get_matches_page(
+            cursor=request.args.get("before"),
+            page_size=request.args.get("per_page", type=int),
+        )
+    except ValueError:
+        abort(400)
+    return render_template(
+        "matches.html",
+        matches=matches,
+        next_cursor=next_cursor,
+        is_first_page="before" not in request.args,
+    )
 
 
 @bp.route("/new")
@@ -35,6 +58,7 @@ def new_match():
 
 @bp.route("/start", methods=["POST"])
 @login_required
+@idempotent
 def start_match():
     """Start a new match with the provided players."""
     player_names = [
@@ -43,7 +67,7 @@ def start_match():
         request.form["player3"],
         request.form["player4"],
     ]
-    match = MatchService.create_match(player_names)
+    match = MatchService.create_match(player_names, bulk=True)
     flash("New match created successfully!", "success")
     return redirect(url_for("matches.matches"))
 
@@ -56,8 +80,60 @@ def match_overview(match_id):
     # If match is None or belongs to another user, return 404
     if not match or match.user_id != current_user.id:
         abort(404)
-    pointstable = PointstableService.get_formatted_pointstable(match_id)
-    return render_template("match_overview.html", match=match, pointstable=pointstable)
+    # Pending flash messages are not part of the frozen page
+    if match.completed and "_flashes" not in session:
+        return _snapshot_response(SnapshotService.get_snapshot(match), "overview")
+    leaderboard = LeaderboardService.get_leaderboard(match_id, match.version)
+    return render_template(
+        "match_overview.html",
+        match=match,
+        pointstable=leaderboard["pointstable"],
+        scorecards=leaderboard["scorecards"],
+    )
+
+
+@bp.route("/<int:match_id>/stream")
+@login_required
+def match_stream(match_id):
+    """Stream live leaderboard updates for a match as Server-Sent Events.
+
+    The first event is the full leaderboard; each later "delta" event holds
+    only what changed when a hole result was recorded. Only results scored
+    through this worker process are streamed, see app/events.py.
+    """
+    match = MatchService.get_match(match_id)
+    try:
+        subscription = match_events.subscribe(
+            match_id, LeaderboardService.get_leaderboard(match_id, match.version)
+        )
+    except StreamLimitError:
+        # Every stream holds a request thread; keep some for other requests
+        response = jsonify({"status": "error", "message": "Too many live streams"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(current_app.config["SSE_KEEPALIVE"])
+        return response
+    keepalive = current_app.config["SSE_KEEPALIVE"]
+
+    def stream():
+        yield subscription.initial
+        while True:
+            try:
+                message = subscription.get(timeout=keepalive)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+
+    response = Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Also runs if the client goes away before the stream has started
+    response.call_on_close(lambda: match_events.unsubscribe(match_id, subscription))
+    return response
 
 
 @bp.route("/delete/<int:match_id>")
@@ -69,26 +145,67 @@ def delete_match(match_id):
     return redirect(url_for("matches.matches"))
 
 
+@bp.route("/delete", methods=["POST"])
+@login_required
+def delete_matches():
+    """Delete the selected matches of the current user."""
+    match_ids = request.form.getlist("match_ids", type=int)
+    if not match_ids:
+        flash("No matches selected.", "warning")
+        return redirect(url_for("matches.matches"))
+
+    deleted = MatchService.delete_matches(match_ids)
+    flash(f"Deleted {deleted} match{'' if deleted == 1 else 'es'}.", "success")
+    return redirect(url_for("matches.matches"))
+
+
+def _snapshot_response(snapshot, page):
+    """Serve a snapshot page, answering 304 if the client's copy is current.
+
+    The gzipped and plain bodies are different representations, so each
+    gets its own strong ETag.
+    """
+    html, etag = SnapshotService.get_page(snapshot, page)
+    gzipped = bool(request.accept_encodings["gzip"])
+    if gzipped:
+        etag = f"{etag}-gzip"
+    response = Response(mimetype="text/html")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Accept-Encoding")
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+    elif gzipped:
+        response.set_data(html)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response.set_data(gzip.decompress(html))
+    return response
+
+
 @bp.route("/finish/<int:match_id>", methods=["GET"])
 @login_required
 def finish_round(match_id):
     match = MatchService.get_match(match_id)
-    # Check if all holes have been played and all holematches have a result
-    incomplete_hole = HoleService.get_first_incomplete_hole(match_id)
-    if incomplete_hole:
-        flash(
-            f"Cannot finish round. Hole {incomplete_hole.num} is not complete.", "error"
-        )
-        return redirect(
-            url_for("matches.hole", match_id=match_id, hole_num=incomplete_hole.num)
-        )
+    if not match.completed:
+        # Check if all holes have been played and all holematches have a result
+        incomplete_num = match.first_incomplete_hole_num
+        if incomplete_num:
+            flash(
+                f"Cannot finish round. Hole {incomplete_num} is not complete.", "error"
+            )
+            return redirect(
+                url_for("matches.hole", match_id=match_id, hole_num=incomplete_num)
+            )
 
-    final_results = PointstableService.get_formatted_pointstable(match_id)
-    match.completed = True
-    db.session.commit()
-    return render_template(
-        "round_summary.html", match=match, final_results=final_results
-    )
+        # The standings are final, so freeze them with the completed flag
+        leaderboard = LeaderboardService.get_leaderboard(match_id, match.version)
+        match.completed = True
+        SnapshotService.create_snapshot(match, leaderboard, commit=False)
+        db.session.commit()
+        LeaderboardService.invalidate(match_id)
+
+    return _snapshot_response(SnapshotService.get_snapshot(match), "summary")
 
 
 @bp.route("/<int:match_id>/hole/<int:hole_num>", methods=["GET"])
@@ -104,11 +221,7 @@ def hole(match_id, hole_num):
         abort(404)
 
     form = HoleForm()
-    previous_results = HoleService.get_previous_results(hole.id)
-
-    # Filter hole matches by match_id
-    hole_matches = [hm for hm in hole.holematches if hm.match_id == match_id]
-    hole.holematches = hole_matches
+    previous_results = HoleService.get_previous_results(hole)
 
     return render_template(
         "hole.html",
@@ -121,15 +234,75 @@ def hole(match_id, hole_num):
 
 @bp.route("/<int:match_id>/hole/<int:hole_num>/process", methods=["POST"])
 @login_required
+@idempotent
 def process_hole(match_id, hole_num):
-    hole = HoleService.get_hole_by_match_hole_num(match_id, hole_num)
+    # Every hole has two matchups, posted as winner1 and winner2
     winners_ids = []
-    for i in range(1, len(hole.holematches) + 1):
+    for i in range(1, 3):
         if request.form.get(f"winner{i}"):
             winner = request.form.get(f"winner{i}")
             winners_ids.append(-1 if winner == "draw" else int(winner))
         else:
             winners_ids.append(None)
 
-    HoleService.handle_hole_outcome(match_id, hole.id, winners_ids)
+    try:
+        HoleService.score_hole(match_id, hole_num, winners_ids)
+    except ValueError:
+        abort(404)
+    except ConflictError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    except ScoringTimeoutError as e:
+        # The write may still land, and scoring the same result again is
+        # harmless, so the client can simply retry
+        response = jsonify({"status": "error", "message": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
     return jsonify({"status": "success"})
+
+
+def _parse_hole_results(payload):
+    """Turn a batch payload into a dict of hole number -> winner IDs.
+
+    The payload looks like {"results": [{"hole": 1, "winners": [3, -1]}]},
+    with -1 for a draw and null to clear a result.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("results"), list):
+        raise ValueError("Expected a JSON object with a results list")
+
+    results = {}
+    for entry in payload["results"]:
+        if not isinstance(entry, dict):
+            raise ValueError("Each result must be an object")
+        hole_num, winners_ids = entry.get("hole"), entry.get("winners")
+        if type(hole_num) is not int:
+            raise ValueError("Each result needs an integer hole number")
+        if not isinstance(winners_ids, list) or not all(
+            winner is None or type(winner) is int for winner in winners_ids
+        ):
+            raise ValueError(f"Winners for hole {hole_num} must be IDs, -1 or null")
+        if hole_num in results:
+            raise ValueError(f"Duplicate results for hole {hole_num}")
+        results[hole_num] = winners_ids
+    return results
+
+
+@bp.route("/<int:match_id>/holes/process", methods=["POST"])
+@login_required
+def process_holes(match_id):
+    """Record results for many holes at once and return the standings."""
+    MatchService.get_match(match_id)
+    try:
+        results = _parse_hole_results(request.get_json(silent=True))
+        HoleService.score_holes(match_id, results)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ConflictError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+    return jsonify(
+        {
+            "status": "success",
+            "pointstable": LeaderboardService.get_leaderboard(match_id)["pointstable"],
+        }
+    )
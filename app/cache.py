@@ -0,0 +1,123 @@
+"""Bounded in-process caches shared by the services."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """A thread-safe LRU cache whose entries also expire after a TTL.
+
+    At most maxsize entries are kept; the least recently used entry is
+    evicted first. Hit, miss and eviction counts are kept for tuning.
+
+    Each worker process has its own cache, so invalidate() only reaches
+    the worker that made a write. Entries that other workers can change
+    should be stored with a stamp, such as a row version, which callers
+    read and pass on every lookup.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self._lock = threading.Lock()
+        self.configure(maxsize, ttl)
+
+    def configure(self, maxsize, ttl):
+        """Set the size and TTL limits, dropping any cached entries."""
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries = OrderedDict()
+            # Bumped on every invalidation so in-flight loads are not stored
+            self._epoch = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get(self, key, default=None, stamp=None):
+        """Get a cached value, or default if missing or expired.
+
+        Args:
+            key: The cache key
+            default: Returned on a miss
+            stamp: If given, an entry stored with a different stamp is
+                stale and counts as a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is None
+                or entry[0] < time.monotonic()
+                or (stamp is not None and entry[2] != stamp)
+            ):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, epoch=None, stamp=None):
+        """Cache a value.
+
+        Args:
+            key: The cache key
+            value: The value to cache
+            epoch: Epoch read before the value was loaded. The value is
+                dropped if any entry was invalidated since then.
+            stamp: Version of the source data the value was loaded from
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value, stamp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, stamp=None):
+        """Get a cached value, calling loader() to fill it on a miss.
+
+        The stamp must be read before the value is loaded, so that a value
+        newer than its stamp is at worst reloaded once more.
+        """
+        missing = object()
+        value = self.get(key, missing, stamp=stamp)
+        if value is missing:
+            epoch = self._epoch
+            value = loader()
+            self.set(key, value, epoch=epoch, stamp=stamp)
+        return value
+
+    def invalidate(self, key):
+        """Remove a key from the cache."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+# Formatted points table and scorecards, keyed by match ID
+leaderboard_cache = TTLCache()
+
+# Lightweight identities of logged-in users, keyed by user ID
+user_cache = TTLCache()
@@ -0,0 +1,108 @@
+import click
+from flask import current_app
+from app.migrations import run_migrations
+from sqlalchemy import text
+from app.models import db
+from app.services.archive_service import ArchiveService
+from app.services.idempotency_service import IdempotencyService
+from app.services.match_service import MatchService
+
+
+def register_commands(app):
+    """Register the application's flask CLI commands."""
+
+    @app.cli.command("migrate-db")
+    def migrate_db():
+        """Upgrade an existing database to the current schema."""
+        for name, count in run_migrations():
+            click.echo(f"{name}: {count} changed")
+
+    @app.cli.command("archive-matches")
+    @click.option(
+        "--older-than-days",
+        type=int,
+        help="Only archive matches created this many days ago "
+        "(default: ARCHIVE_AFTER_DAYS)",
+    )
+    @click.option(
+        "--batch-size",
+        type=int,
+        help="Matches per transaction (default: ARCHIVE_BATCH_SIZE)",
+    )
+    @click.option("--limit", type=int, help="Stop after this many matches")
+    def archive_matches(older_than_days, batch_size, limit):
+        """Compact old completed matches into single archive records."""
+        if older_than_days is None:
+            older_than_days = current_app.config["ARCHIVE_AFTER_DAYS"]
+        if batch_size is None:
+            batch_size = current_app.config["ARCHIVE_BATCH_SIZE"]
+
+        matches = rows = 0
+        for result in ArchiveService.archive_old_matches(
+            older_than_days, batch_size=batch_size, limit=limit
+        ):
+            matches += result["matches"]
+            rows += result["rows"]
+            click.echo(f"archived {result['matches']} matches ({result['rows']} rows)")
+        click.echo(f"total: {matches} matches archived, {rows} rows removed")
+
+    @app.cli.command("unarchive-match")
+    @click.argument("match_id", type=int)
+    def unarchive_match(match_id):
+        """Restore an archived match's rows."""
+        if ArchiveService.unarchive_match(match_id):
+            click.echo(f"match {match_id} restored")
+        else:
+            raise click.ClickException(f"match {match_id} is not archived")
+
+    @app.cli.command("purge-matches")
+    @click.option(
+        "--older-than-days",
+        type=int,
+        help="Only purge matches created this many days ago "
+        "(default: PURGE_AFTER_DAYS)",
+    )
+    @click.option(
+        "--include-played",
+        is_flag=True,
+        help="Also purge unfinished matches with holes played",
+    )
+    @click.option(
+        "--batch-size",
+        type=int,
+        help="Matches per transaction (default: PURGE_BATCH_SIZE)",
+    )
+    @click.option("--limit", type=int, help="Stop after this many matches")
+    def purge_matches(older_than_days, include_played, batch_size, limit):
+        """Delete abandoned matches that were never finished."""
+        if older_than_days is None:
+            older_than_days = current_app.config["PURGE_AFTER_DAYS"]
+        if batch_size is None:
+            batch_size = current_app.config["PURGE_BATCH_SIZE"]
+
+        matches = rows = 0
+        for result in MatchService.purge_abandoned_matches(
+            older_than_days,
+            include_played=include_played,
+            batch_size=batch_size,
+            limit=limit,
+        ):
+            matches += result["matches"]
+            rows += result["rows"]
+            click.echo(f"purged {result['matches']} matches ({result['rows']} rows)")
+        click.echo(f"total: {matches} matches purged, {rows} rows removed")
+
+        free_pages = db.session.execute(text("PRAGMA freelist_count")).scalar()
+        page_size = db.session.execute(text("PRAGMA page_size")).scalar()
+        click.echo(
+            f"{free_pages * page_size // 1024} KiB free in the database file "
+            "(reused by new rows; VACUUM to shrink the file)"
+        )
+
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys():
+        """Delete Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL."""
+        deleted = IdempotencyService.purge_expired(
+            current_app.config["IDEMPOTENCY_KEY_TTL"]
+        )
+        click.echo(f"purged {deleted} expired idempotency keys")
@@ -0,0 +1,198 @@
+"""SQLite connection setup.
+
+Every connection gets the pragmas of the SQLITE_PROFILE setting, with any
+SQLITE_PRAGMAS applied on top:
+
+- "default" is SQLite's own behaviour: a rollback journal, so a write
+  blocks readers until it commits, and a full fsync on every commit.
+- "tuned" uses the write-ahead log, so readers never wait for a writer,
+  fsyncs only at checkpoints, and gives each connection a larger page
+  cache and memory-mapped reads.
+
+With the write-ahead log on a file database, reads can also be routed to
+a separate pool of read-only (mode=ro) connections, leaving a small pool
+of DB_WRITE_POOL_SIZE writer connections for the statements that change
+data. Requests, and @read_only service methods outside them, read from
+the pool until they first write; from then on the rest of the transaction
+uses the writer, so a request always reads its own writes. A writer
+connection is thus only checked out from a request's first write to its
+commit, never for the reads, hashing or rendering around them.
+"""
+
+import functools
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import CompoundSelect, Select, create_engine, event
+
+READ_ENGINE = "read_engine"
+
+SQLITE_PROFILES = {
+    "default": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,  # KiB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def _is_file_database(uri):
+    return uri.startswith("sqlite:///") and uri not in (
+        "sqlite:///",
+        "sqlite:///:memory:",
+    )
+
+
+def sqlite_pragmas(config):
+    """Get the pragmas for the configured profile and overrides."""
+    profile = config["SQLITE_PROFILE"]
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}")
+    return {**SQLITE_PROFILES[profile], **(config["SQLITE_PRAGMAS"] or {})}
+
+
+def read_routing_enabled(config):
+    """Whether reads go to a read-only pool: needs WAL on a file database."""
+    return (
+        config["DB_READ_ROUTING"]
+        and _is_file_database(config["SQLALCHEMY_DATABASE_URI"])
+        and sqlite_pragmas(config)["journal_mode"].upper() == "WAL"
+    )
+
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    Explicit SQLALCHEMY_ENGINE_OPTIONS entries take precedence.
+    """
+    options = {}
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    if uri.startswith("sqlite"):
+        options["connect_args"] = {
+            "cached_statements": config["SQLITE_STATEMENT_CACHE_SIZE"],
+        }
+        # In-memory databases use a single connection per thread
+        if read_routing_enabled(config):
+            # SQLite allows one writer at a time anyway; queueing for a
+            # connection here beats retrying on "database is locked"
+            options["pool_size"] = config["DB_WRITE_POOL_SIZE"]
+            options["max_overflow"] = 0
+        elif _is_file_database(uri):
+            options["pool_size"] = config["DB_POOL_SIZE"]
+            options["max_overflow"] = config["DB_MAX_OVERFLOW"]
+    return {**options, **config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+
+
+def create_read_engine(config, url):
+    """Create the read-only engine on the writer engine's database URL."""
+    if not url.query.get("uri"):
+        url = url.set(database=f"file:{url.database}")
+    return create_engine(
+        url.update_query_dict({"mode": "ro", "uri": "true"}),
+        connect_args={"cached_statements": config["SQLITE_STATEMENT_CACHE_SIZE"]},
+        pool_size=config["DB_POOL_SIZE"],
+        max_overflow=config["DB_MAX_OVERFLOW"],
+    )
+
+
+def read_engine():
+    """Get the current app's read-only engine, if reads are routed."""
+    return current_app.extensions.get(READ_ENGINE)
+
+
+def read_pragmas(pragmas):
+    """Drop the pragmas a read-only connection cannot or need not set."""
+    return {
+        name: value
+        for name, value in pragmas.items()
+        if name not in ("journal_mode", "synchronous")
+    }
+
+
+def configure_sqlite(engine, pragmas):
+    """Set foreign keys and the given pragmas on every SQLite connection.
+
+    Foreign keys are off by default in SQLite, which would leave the
+    ON DELETE CASCADE constraints unenforced.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    statements = ["PRAGMA foreign_keys = ON"] + [
+        f"PRAGMA {name} = {value}" for name, value in pragmas.items()
+    ]
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        for statement in statements:
+            dbapi_connection.execute(statement)
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the read-only engine when allowed.
+
+    SELECTs use the read engine while info["read_only"] is set and the
+    current transaction has not written. Anything else goes to the writer
+    and marks the transaction as writing until it ends.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        reader = read_engine() if bind is None else None
+        if reader is not None:
+            if isinstance(clause, (Select, CompoundSelect)) and not self._flushing:
+                if self.info.get("read_only") and not self.info.get("writing"):
+                    return reader
+            else:
+                self.info["writing"] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _end_writing(session, transaction):
+    # Once committed, a write is visible to new reads on the read engine
+    if transaction.parent is None:
+        session.info.pop("writing", None)
+
+
+def read_only(func):
+    """Route a read-only service method's queries to the read engine."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        from app import db
+
+        info = db.session.info
+        previous = info.get("read_only", False)
+        info["read_only"] = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            info["read_only"] = previous
+
+    return wrapper
+
+
+def init_read_routing(app, session):
+    """Let requests read from the read-only engine until they first write.
+
+    This includes POSTs, so that their reads before the first write, such
+    as loading the user or the match, do not hold a writer connection.
+    """
+
+    @app.before_request
+    def route_reads():
+        session.info["read_only"] = True
+
+    @app.teardown_request
+    def end_read_routing(exc):
+        session.info.pop("read_only", None)
@@ -0,0 +1,189 @@
+"""Fan-out of live match updates to Server-Sent Events subscribers.
+
+Each match with at least one subscriber has a publisher holding the last
+leaderboard sent. When results change the new leaderboard is diffed and
+formatted once, and the same message is queued for every subscriber.
+
+Publishers live in the worker process that serves the stream, and only
+writes committed through that process are published. Under a server with
+several worker processes, a spectator on one worker does not see results
+scored through another until they reconnect, so live streams need a
+single-process deployment (threaded or async). Each open stream also holds
+a request thread for as long as it is open, so SSE_MAX_STREAMS caps the
+streams per process to leave threads for ordinary requests.
+"""
+
+import json
+import queue
+import threading
+
+
+def format_event(event, data):
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def leaderboard_delta(old, new):
+    """Describe what changed between two leaderboards.
+
+    Returns:
+        Dict with the full points table if any row changed (it only has
+        one row per player and its order matters) and a list of changed
+        [player index, hole number, result] scorecard cells.
+    """
+    delta = {}
+    if new["pointstable"] != old["pointstable"]:
+        delta["pointstable"] = new["pointstable"]
+
+    cells = []
+    for index, (old_row, new_row) in enumerate(
+        zip(old["scorecards"], new["scorecards"])
+    ):
+        for hole, (before, after) in enumerate(
+            zip(old_row["scorecard"], new_row["scorecard"]), 1
+        ):
+            if before != after:
+                cells.append([index, hole, after])
+    if cells:
+        delta["scorecards"] = cells
+    return delta
+
+
+class StreamLimitError(Exception):
+    """The worker already serves as many streams as it is allowed."""
+
+
+class Subscription:
+    """A subscriber's queue of formatted messages."""
+
+    def __init__(self, initial, maxsize):
+        self.initial = initial
+        self.closed = False
+        # Set once the subscription no longer counts towards max_streams
+        self.released = False
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        """Queue a message, closing the subscription if it has fallen behind."""
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.closed = True
+
+    def get(self, timeout):
+        """Get the next message, or None once the subscription is closed.
+
+        Raises:
+            queue.Empty: If nothing arrives within timeout seconds
+        """
+        if self.closed:
+            return None
+        message = self._queue.get(timeout=timeout)
+        if message is None:
+            self.closed = True
+        return message
+
+
+class MatchEvents:
+    """In-process publishers for live match leaderboards."""
+
+    def __init__(self, queue_size=100, max_streams=None):
+        self._lock = threading.Lock()
+        self.configure(queue_size, max_streams)
+
+    def configure(self, queue_size, max_streams=None):
+        """Set the queue size and stream limit, closing any open streams.
+
+        Args:
+            queue_size: Messages queued per subscriber before it is dropped
+            max_streams: Subscriptions allowed at once (default: no limit)
+        """
+        with self._lock:
+            for subscribers, _ in getattr(self, "_publishers", {}).values():
+                for subscription in subscribers:
+                    subscription.put(None)
+                    subscription.released = True
+            self.queue_size = queue_size
+            self.max_streams = max_streams
+            self._publishers = {}
+            self._streams = 0
+
+    def subscribe(self, match_id, leaderboard):
+        """Subscribe to a match's updates.
+
+        Args:
+            match_id: The ID of the match
+            leaderboard: The current leaderboard, used if the match has no
+                publisher yet
+
+        Returns:
+            A Subscription whose initial message is the full leaderboard
+
+        Raises:
+            StreamLimitError: If max_streams subscriptions are already open
+        """
+        with self._lock:
+            if self.max_streams is not None and self._streams >= self.max_streams:
+                raise StreamLimitError("Too many open streams")
+            subscribers, last = self._publishers.get(match_id, (set(), leaderboard))
+            subscription = Subscription(
+                format_event("leaderboard", last), self.queue_size
+            )
+            subscribers.add(subscription)
+            self._streams += 1
+            self._publishers[match_id] = (subscribers, last)
+            return subscription
+
+    def unsubscribe(self, match_id, subscription):
+        """Remove a subscriber, dropping the publisher once it has none."""
+        with self._lock:
+            subscribers, _ = self._publishers.get(match_id, (set(), None))
+            subscribers.discard(subscription)
+            if not subscription.released:
+                subscription.released = True
+                self._streams -= 1
+            if not subscribers:
+                self._publishers.pop(match_id, None)
+
+    def has_subscribers(self, match_id):
+        """Check whether anyone is listening to a match."""
+        return match_id in self._publishers
+
+    def subscriber_count(self, match_id):
+        """Count a match's subscribers."""
+        with self._lock:
+            subscribers, _ = self._publishers.get(match_id, (set(), None))
+            return len(subscribers)
+
+    def stream_count(self):
+        """Count the open subscriptions of all matches."""
+        with self._lock:
+            return self._streams
+
+    def publish(self, match_id, leaderboard):
+        """Send the changes since the last update to every subscriber."""
+        with self._lock:
+            if match_id not in self._publishers:
+                return
+            subscribers, last = self._publishers[match_id]
+            delta = leaderboard_delta(last, leaderboard)
+            self._publishers[match_id] = (subscribers, leaderboard)
+            if not delta:
+                return
+            message = format_event("delta", delta)
+            for subscription in list(subscribers):
+                subscription.put(message)
+                if subscription.closed:
+                    subscribers.discard(subscription)
+            if not subscribers:
+                self._publishers.pop(match_id)
+
+    def close(self, match_id):
+        """End every stream for a match, e.g. after it is deleted."""
+        with self._lock:
+            subscribers, _ = self._publishers.pop(match_id, (set(), None))
+            for subscription in subscribers:
+                subscription.put(None)
+
+
+match_events = MatchEvents()
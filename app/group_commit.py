@@ -0,0 +1,158 @@
+"""Group commit of concurrent scoring writes.
+
+With GROUP_COMMIT on, scoring requests hand their writes to one writer
+thread instead of committing themselves. The thread collects whatever
+arrives within GROUP_COMMIT_WINDOW_MS (up to GROUP_COMMIT_MAX_BATCH
+operations) and runs it as one transaction, each operation inside its own
+savepoint, so a batch costs one commit and one fsync.
+
+An operation that fails only rolls back its savepoint and fails its own
+request. Every request waits for the batch's commit before it is told its
+write succeeded, so durability is the same as committing alone. A
+request that gives up after GROUP_COMMIT_TIMEOUT seconds leaves its
+operation queued, so its write may still be committed later.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from sqlalchemy import text
+
+
+class GroupCommitWriter:
+    """Runs submitted operations in batched transactions on a thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._app = None
+        self.enabled = False
+        self.window = 0.002
+        self.max_batch = 64
+        self.timeout = 30
+        self.batches = 0
+        self.operations = 0
+
+    def configure(self, app):
+        """Take the app and group commit settings from its config."""
+        self.stop()
+        self._app = app
+        self.enabled = app.config["GROUP_COMMIT"]
+        self.window = app.config["GROUP_COMMIT_WINDOW_MS"] / 1000
+        self.max_batch = app.config["GROUP_COMMIT_MAX_BATCH"]
+        self.timeout = app.config["GROUP_COMMIT_TIMEOUT"]
+        self.batches = self.operations = 0
+
+    def _ensure_thread(self):
+        # Started lazily so forked workers each get their own writer
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,), daemon=True
+                )
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) for the next batch.
+
+        Returns:
+            A Future with func's return value once the batch has committed
+        """
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((func, args, kwargs, future))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Submit an operation and wait for it to be committed."""
+        return self.submit(func, *args, **kwargs).result(timeout=self.timeout)
+
+    def stop(self):
+        """Finish the queued operations and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self):
+        """Get the number of batches committed and operations they held."""
+        return {"batches": self.batches, "operations": self.operations}
+
+    def _collect(self, operations):
+        """Wait for an operation, then gather more until the window closes.
+
+        Returns:
+            (batch, stop) where stop is set once stop() has been called
+        """
+        first = operations.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = operations.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self, operations):
+        with self._app.app_context():
+            stop = False
+            while not stop:
+                batch, stop = self._collect(operations)
+                if batch:
+                    self._write(batch)
+
+    def _write(self, batch):
+        from app import db
+
+        succeeded = []
+        try:
+            # Take the write lock up front; the savepoints nest inside
+            db.session.execute(text("BEGIN IMMEDIATE"))
+            for func, args, kwargs, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.session.begin_nested():
+                        result = func(*args, **kwargs)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    succeeded.append((future, result))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            error = Exception(f"Failed to commit batch: {str(e)}")
+            for *_, future in batch:
+                if future.done():
+                    continue
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+            return
+        finally:
+            db.session.close()
+
+        self.batches += 1
+        self.operations += len(succeeded)
+        for future, result in succeeded:
+            future.set_result(result)
+
+
+group_writer = GroupCommitWriter()
@@ -0,0 +1,104 @@
+"""Idempotency-Key support for POST endpoints that create or score.
+
+A client on a flaky connection can send an Idempotency-Key header with a
+request and the same key with its retries. The first request with a key
+runs as usual and its response is stored; a retry gets the stored
+response back, marked with Idempotent-Replayed, without running the view
+again. Keys are per user and expire after IDEMPOTENCY_KEY_TTL seconds.
+A key whose first request never stored a response, e.g. because its
+worker died, is given to the next retry after IDEMPOTENCY_LOCK_TIMEOUT
+seconds.
+
+Only successful (2xx and 3xx) responses are stored. After an error the
+key is released, so a retry runs the request again.
+"""
+
+import functools
+import hashlib
+import json
+from flask import Response, current_app, jsonify, make_response, request
+from flask_login import current_user
+from app.models import db
+from app.services.idempotency_service import IdempotencyService
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint():
+    """Hash the request's method, path and form, less the CSRF token."""
+    form = sorted(
+        (name, value)
+        for name, value in request.form.items(multi=True)
+        if name != "csrf_token"
+    )
+    data = json.dumps([request.method, request.path, form])
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+def _error(message, status):
+    return jsonify({"status": "error", "message": message}), status
+
+
+def _replay(stored):
+    response = Response(stored.body, status=stored.status, mimetype=stored.mimetype)
+    if stored.location:
+        response.headers["Location"] = stored.location
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    """Answer retries of a request with the same Idempotency-Key from storage.
+
+    Requests without the header are not affected. Goes after
+    @login_required, as keys belong to the current user.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(f"{HEADER} is longer than {MAX_KEY_LENGTH} characters", 400)
+
+        user_id = current_user.id
+        fingerprint = request_fingerprint()
+        reserved_at, stored = IdempotencyService.reserve(
+            user_id,
+            key,
+            fingerprint,
+            current_app.config["IDEMPOTENCY_KEY_TTL"],
+            current_app.config["IDEMPOTENCY_LOCK_TIMEOUT"],
+        )
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                return _error(f"{HEADER} was already used for another request", 422)
+            if stored.status is None:
+                return _error(f"A request with this {HEADER} is still running", 409)
+            return _replay(stored)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            # The view's transaction may have failed part way
+            db.session.rollback()
+            IdempotencyService.release(user_id, key, reserved_at)
+            raise
+
+        if response.status_code < 400 and not response.is_streamed:
+            IdempotencyService.save_response(
+                user_id,
+                key,
+                reserved_at,
+                response.status_code,
+                response.mimetype,
+                response.headers.get("Location"),
+                response.get_data(),
+            )
+        else:
+            IdempotencyService.release(user_id, key, reserved_at)
+        return response
+
+    return wrapper
@@ -0,0 +1,333 @@
+"""Request metrics in the Prometheus text format, shared across workers.
+
+Each process writes its samples to its own memory-mapped file in
+METRICS_DIR, so recording a request is a few in-memory writes. A scrape of
+/metrics reads every process's file and sums the samples, which gives
+totals across all workers without an external service.
+
+The files outlive their processes. Counters of exited workers still count
+towards the totals, as they did happen, but gauges such as in-flight
+requests only describe live processes, so a file's gauges are skipped
+once its process has exited and reset when a new process reuses its PID.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from flask import g, request
+
+# Upper bounds in seconds; +Inf is added when rendering
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10)
+
+# family -> (type, help)
+FAMILIES = {
+    "http_requests_total": ("counter", "HTTP requests by endpoint and status"),
+    "http_request_errors_total": ("counter", "HTTP requests that returned a 5xx"),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency"),
+    "http_requests_in_progress": ("gauge", "HTTP requests being handled"),
+    "leaderboard_cache_hits_total": ("counter", "Leaderboard cache hits"),
+    "leaderboard_cache_misses_total": ("counter", "Leaderboard cache misses"),
+    "leaderboard_cache_evictions_total": ("counter", "Leaderboard cache evictions"),
+    "leaderboard_cache_size": ("gauge", "Leaderboards currently cached"),
+}
+
+_HEADER = struct.Struct("i4x")
+_LENGTH = struct.Struct("i")
+_VALUE = struct.Struct("d")
+
+
+def _align(pos):
+    return pos + (-pos % 8)
+
+
+def read_samples(data):
+    """Parse the (key, value) entries of a metrics file's contents."""
+    if len(data) < _HEADER.size:
+        return
+    used = _HEADER.unpack_from(data, 0)[0]
+    pos = _HEADER.size
+    while pos < used:
+        length = _LENGTH.unpack_from(data, pos)[0]
+        key = data[pos + _LENGTH.size : pos + _LENGTH.size + length].decode()
+        pos = _align(pos + _LENGTH.size + length)
+        yield key, _VALUE.unpack_from(data, pos)[0], pos
+        pos += _VALUE.size
+
+
+class MmapValues:
+    """Float values keyed by string in a memory-mapped file.
+
+    Entries are appended as (key length, key, padding, double) and the
+    used size in the header is only advanced once an entry is complete,
+    so readers in other processes never see a partial entry.
+    """
+
+    def __init__(self, path, initial_size=16384):
+        self.path = path
+        self._file = open(path, "a+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < initial_size:
+            self._file.truncate(initial_size)
+            size = initial_size
+        self._size = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._map, 0)[0]
+        if self._used == 0:
+            self._used = _HEADER.size
+            _HEADER.pack_into(self._map, 0, self._used)
+        self._positions = {
+            key: pos for key, _, pos in read_samples(self._map[: self._used])
+        }
+
+    def _position(self, key):
+        pos = self._positions.get(key)
+        if pos is not None:
+            return pos
+
+        encoded = key.encode()
+        value_pos = _align(self._used + _LENGTH.size + len(encoded))
+        end = value_pos + _VALUE.size
+        if end > self._size:
+            while end > self._size:
+                self._size *= 2
+            self._map.close()
+            self._file.truncate(self._size)
+            self._map = mmap.mmap(self._file.fileno(), self._size)
+
+        _LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[
+            self._used + _LENGTH.size : self._used + _LENGTH.size + len(encoded)
+        ] = encoded
+        _VALUE.pack_into(self._map, value_pos, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = value_pos
+        return value_pos
+
+    def add(self, key, amount):
+        pos = self._position(key)
+        _VALUE.pack_into(self._map, pos, _VALUE.unpack_from(self._map, pos)[0] + amount)
+
+    def set(self, key, value):
+        _VALUE.pack_into(self._map, self._position(key), value)
+
+    def keys(self):
+        return list(self._positions)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _is_gauge(key):
+    family = json.loads(key)[0]
+    return FAMILIES.get(family, (None,))[0] == "gauge"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+
+def _key(family, suffix, labels):
+    return json.dumps([family, suffix, labels], sort_keys=True)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\""),
+        )
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+class Metrics:
+    """Per-process writer and cross-process reader of request metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self.directory = None
+
+    def configure(self, directory):
+        """Write this process's samples under directory."""
+        with self._lock:
+            if self._values is not None:
+                self._values.close()
+                self._values = None
+            os.makedirs(directory, exist_ok=True)
+            self.directory = directory
+            self._pid = None
+
+    def _file(self):
+        # Opened lazily so forked workers each get their own file
+        pid = os.getpid()
+        if self._values is None or self._pid != pid:
+            self._values = MmapValues(os.path.join(self.directory, f"metrics_{pid}.db"))
+            self._pid = pid
+            # Left over from an exited process that had the same PID
+            for key in self._values.keys():
+                if _is_gauge(key):
+                    self._values.set(key, 0.0)
+        return self._values
+
+    def inc(self, family, labels, amount=1, suffix=""):
+        """Add to a counter or gauge."""
+        with self._lock:
+            self._file().add(_key(family, suffix, labels), amount)
+
+    def set(self, family, labels, value):
+        """Set this process's value of a gauge."""
+        with self._lock:
+            self._file().set(_key(family, "", labels), value)
+
+    def observe(self, family, labels, value):
+        """Record a histogram observation."""
+        bound = next((b for b in BUCKETS if value <= b), math.inf)
+        with self._lock:
+            values = self._file()
+            values.add(_key(family, "_bucket", {**labels, "le": bound}), 1)
+            values.add(_key(family, "_sum", labels), value)
+            values.add(_key(family, "_count", labels), 1)
+
+    def collect(self):
+        """Sum every process's samples, less the gauges of exited ones.
+
+        Returns:
+            Dict of family -> {(suffix, sorted label items): value}
+        """
+        totals = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.startswith("metrics_"):
+                continue
+            pid = name[len("metrics_") :].split(".")[0]
+            alive = not pid.isdigit() or _pid_alive(int(pid))
+            with open(os.path.join(self.directory, name), "rb") as f:
+                data = f.read()
+            for key, value, _ in read_samples(data):
+                if not alive and _is_gauge(key):
+                    continue
+                family, suffix, labels = json.loads(key)
+                samples = totals.setdefault(family, {})
+                index = (suffix, tuple(sorted(labels.items())))
+                samples[index] = samples.get(index, 0) + value
+        return totals
+
+    def render(self):
+        """Render all samples in the Prometheus text exposition format."""
+        totals = self.collect()
+        lines = []
+        for family, (kind, help_text) in FAMILIES.items():
+            samples = totals.get(family)
+            if not samples:
+                continue
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+            if kind == "histogram":
+                lines.extend(self._render_histogram(family, samples))
+                continue
+            for (suffix, labels), value in sorted(samples.items()):
+                lines.append(
+                    f"{family}{suffix}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(family, samples):
+        # Buckets are stored per bound; Prometheus wants them cumulative
+        series = {}
+        for (suffix, labels), value in samples.items():
+            labels = dict(labels)
+            bound = labels.pop("le", None)
+            entry = series.setdefault(
+                tuple(sorted(labels.items())), {"buckets": {}, "_sum": 0, "_count": 0}
+            )
+            if suffix == "_bucket":
+                entry["buckets"][bound] = value
+            else:
+                entry[suffix] = value
+
+        lines = []
+        for labels, entry in sorted(series.items()):
+            cumulative = 0
+            for bound in BUCKETS + (math.inf,):
+                cumulative += entry["buckets"].get(bound, 0)
+                bucket_labels = labels + (("le", _format_value(bound)),)
+                lines.append(
+                    f"{family}_bucket{_format_labels(bucket_labels)} "
+                    f"{_format_value(cumulative)}"
+                )
+            lines.append(
+                f"{family}_sum{_format_labels(labels)} {_format_value(entry['_sum'])}"
+            )
+            lines.append(
+                f"{family}_count{_format_labels(labels)} "
+                f"{_format_value(entry['_count'])}"
+            )
+        return lines
+
+
+metrics = Metrics()
+
+
+def init_metrics(app):
+    """Time every request and count errors and in-flight requests."""
+    from app.cache import leaderboard_cache
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_endpoint = request.endpoint or "unmatched"
+        g.metrics_started = time.perf_counter()
+        metrics.inc("http_requests_in_progress", {"endpoint": g.metrics_endpoint})
+
+    @app.after_request
+    def record_response_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        endpoint = g.pop("metrics_endpoint")
+        status = g.pop("metrics_status", 500)
+        labels = {"endpoint": endpoint}
+
+        metrics.inc("http_requests_in_progress", labels, -1)
+        metrics.observe(
+            "http_request_duration_seconds", labels, time.perf_counter() - started
+        )
+        metrics.inc(
+            "http_requests_total",
+            {**labels, "method": request.method, "status": str(status)},
+        )
+        if status >= 500:
+            metrics.inc("http_request_errors_total", labels)
+
+        stats = leaderboard_cache.stats()
+        metrics.set("leaderboard_cache_hits_total", {}, stats["hits"])
+        metrics.set("leaderboard_cache_misses_total", {}, stats["misses"])
+        metrics.set("leaderboard_cache_evictions_total", {}, stats["evictions"])
+        metrics.set("leaderboard_cache_size", {}, stats["size"])
@@ -0,0 +1,189 @@
+"""In-place upgrades for databases created by older versions.
+
+db.create_all() only creates missing tables, so changes to existing tables
+are applied here. Every migration is idempotent and returns the number of
+rows or schema objects it changed.
+"""
+
+import json
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
+from app import db
+from app.scorecard import encode_scorecard
+
+
+def migrate_scorecards():
+    """Re-encode JSON list scorecards as two-bit-per-hole integers."""
+    rows = db.session.execute(
+        text(
+            "SELECT id, scorecard FROM player "
+            "WHERE scorecard IS NULL OR typeof(scorecard) = 'text'"
+        )
+    ).all()
+    params = []
+    for row in rows:
+        scorecard = json.loads(row.scorecard) if row.scorecard else [None] * 18
+        params.append({"id": row.id, "bits": encode_scorecard(scorecard)})
+
+    if params:
+        db.session.execute(
+            text("UPDATE player SET scorecard = :bits WHERE id = :id"), params
+        )
+    return len(rows)
+
+
+def create_indexes():
+    """Create model indexes that are missing from existing tables."""
+    connection = db.session.connection()
+    existing = {
+        name
+        for (name,) in connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        )
+    }
+    created = 0
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                created += 1
+    return created
+
+
+def _add_column(table, column, definition):
+    """Add a column to an existing table unless it is already there.
+
+    Returns:
+        Whether the column was added
+    """
+    columns = {
+        row.name for row in db.session.execute(text(f'PRAGMA table_info("{table}")'))
+    }
+    if column in columns:
+        return False
+    db.session.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {column} {definition}'))
+    return True
+
+
+def add_match_progress():
+    """Add the match.completed_holes column and fill it from hole results."""
+    if not _add_column("match", "completed_holes", "INTEGER NOT NULL DEFAULT 0"):
+        return 0
+
+    result = db.session.execute(
+        text(
+            'UPDATE "match" SET completed_holes = ('
+            "SELECT coalesce(sum(1 << (hole.num - 1)), 0) FROM hole "
+            'WHERE hole.match_id = "match".id AND ('
+            "SELECT count(hole_match.winner_id) FROM hole_match "
+            "WHERE hole_match.hole_id = hole.id) = 2) "
+            "WHERE EXISTS (SELECT 1 FROM hole "
+            'WHERE hole.match_id = "match".id)'
+        )
+    )
+    return result.rowcount
+
+
+def add_match_archive():
+    """Add the match.archive column used by archived matches."""
+    return int(_add_column("match", "archive", "TEXT"))
+
+
+def add_versions():
+    """Add the version columns used to detect concurrent scoring writes."""
+    added = _add_column("match", "version", "INTEGER NOT NULL DEFAULT 1")
+    added += _add_column("player", "version", "INTEGER NOT NULL DEFAULT 1")
+    return added
+
+
+def _foreign_keys_match(table):
+    """Whether a table's foreign keys in the database match the model's."""
+    existing = {
+        (row[3], row[2], row[6])
+        for row in db.session.execute(text(f'PRAGMA foreign_key_list("{table.name}")'))
+    }
+    expected = {
+        (fk.parent.name, fk.column.table.name, (fk.ondelete or "NO ACTION").upper())
+        for fk in table.foreign_keys
+    }
+    return existing == expected
+
+
+def _rebuild_table(table):
+    """Recreate a table from its model definition, keeping its rows.
+
+    SQLite cannot alter constraints in place, so the table is copied into
+    a new one and swapped in. Foreign keys must be off while this runs.
+    """
+    connection = db.session.connection()
+    columns = {
+        row.name
+        for row in db.session.execute(text(f'PRAGMA table_info("{table.name}")'))
+    }
+    copied = ", ".join(f'"{c.name}"' for c in table.columns if c.name in columns)
+
+    new_name = f"_new_{table.name}"
+    quoted = connection.dialect.identifier_preparer.format_table(table)
+    create = str(CreateTable(table).compile(dialect=connection.dialect))
+    create = create.replace(f"CREATE TABLE {quoted} (", f'CREATE TABLE "{new_name}" (')
+    connection.execute(text(create))
+    connection.execute(
+        text(f'INSERT INTO "{new_name}" ({copied}) SELECT {copied} FROM "{table.name}"')
+    )
+    connection.execute(text(f'DROP TABLE "{table.name}"'))
+    connection.execute(text(f'ALTER TABLE "{new_name}" RENAME TO "{table.name}"'))
+    for index in table.indexes:
+        index.create(connection)
+
+
+def add_cascade_deletes():
+    """Rebuild tables whose foreign keys lack the model's ON DELETE CASCADE."""
+    rebuilt = 0
+    for table in db.metadata.sorted_tables:
+        if not _foreign_keys_match(table):
+            _rebuild_table(table)
+            rebuilt += 1
+
+    if rebuilt:
+        violations = db.session.execute(text("PRAGMA foreign_key_check")).all()
+        if violations:
+            raise ValueError(
+                f"{len(violations)} rows reference missing rows, "
+                f"first in table {violations[0][0]}"
+            )
+    return rebuilt
+
+
+MIGRATIONS = [
+    migrate_scorecards,
+    create_indexes,
+    add_match_progress,
+    add_match_archive,
+    add_versions,
+    add_cascade_deletes,
+]
+
+
+def run_migrations():
+    """Apply every migration in a single transaction.
+
+    Foreign keys are turned off for the duration so that tables can be
+    rebuilt, and checked with PRAGMA foreign_key_check before committing.
+
+    Returns:
+        List of (migration name, rows changed) tuples
+    """
+    # The pragma is a no-op inside a transaction, so it must come first
+    dbapi_connection = db.session.connection().connection.dbapi_connection
+    dbapi_connection.execute("PRAGMA foreign_keys = OFF")
+    try:
+        if dbapi_connection.execute("PRAGMA foreign_keys").fetchone()[0]:
+            raise RuntimeError("Could not turn off foreign keys for migrations")
+        results = [(migration.__name__, migration()) for migration in MIGRATIONS]
+        db.session.commit()
+        return results
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
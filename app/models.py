@@ -1,9 +1,15 @@
+import json
 from . import db
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.dialects.sqlite import JSON
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from app.scorecard import (
+    decode_scorecard,
+    encode_scorecard,
+    first_incomplete_hole,
+    popcount,
+)
 
 
 class User(UserMixin, db.Model):
@@ -28,8 +34,27 @@ class Player(db.Model):
     name = db.Column(db.String(80), nullable=False)
     # order = db.Column(db.Integer, nullable=False)
     # handicap = db.Column(db.Float, nullable=False)
-    match_id = db.Column(db.Integer, db.ForeignKey("match.id"), nullable=False)
-    scorecard = db.Column(JSON, default=lambda: [None] * 18)
+    match_id = db.Column(
+        db.Integer,
+        db.ForeignKey("match.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    # Two bits per hole, see app.scorecard
+    scorecard_bits = db.Column("scorecard", db.Integer, nullable=False, default=0)
+    # Bumped by every update; ORM updates only apply to the version they read
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    @property
+    def scorecard(self):
+        """The scorecard as a list of 18 None/"W"/"L"/"D" results."""
+        return decode_scorecard(self.scorecard_bits)
+
+    @scorecard.setter
+    def scorecard(self, results):
+        self.scorecard_bits = encode_scorecard(results)
 
     def __repr__(self):
         return f"<Player {self.id} {self.name}>"
@@ -38,20 +63,76 @@ class Player(db.Model):
 class Match(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    players = relationship("Player", backref="match", lazy=True)
-    holes = relationship("Hole", backref="match", lazy=True)
-    pointstable = relationship("PointsTable", backref="match", lazy=True)
-    holematches = relationship("HoleMatch", backref="match", lazy=True)
+    # Child rows are removed by ON DELETE CASCADE, so they are not loaded
+    # just to be deleted
+    players = relationship(
+        "Player",
+        backref="match",
+        lazy=True,
+        order_by="Player.id",
+        cascade="all",
+        passive_deletes=True,
+    )
+    holes = relationship(
+        "Hole", backref="match", lazy=True, cascade="all", passive_deletes=True
+    )
+    pointstable = relationship(
+        "PointsTable", backref="match", lazy=True, cascade="all", passive_deletes=True
+    )
+    holematches = relationship(
+        "HoleMatch", backref="match", lazy=True, cascade="all", passive_deletes=True
+    )
     completed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # Bit n - 1 is set once both of hole n's matchups have a result
+    completed_holes = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    # JSON record of an archived match's players, results and points table,
+    # whose rows have been removed, see ArchiveService
+    archive = db.Column(db.Text, nullable=True)
+    # Bumped by every scoring write, which only applies to the version it
+    # read, see HoleService._update_progress
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (db.Index("ix_match_user_id_created_at", "user_id", "created_at"),)
+
+    @property
+    def archived(self):
+        """Whether the match has been compacted into its archive record."""
+        return self.archive is not None
+
+    @property
+    def player_names(self):
+        """The player names in order, whether or not the match is archived."""
+        if self.archived:
+            return [player[1] for player in json.loads(self.archive)["players"]]
+        return [player.name for player in self.players]
+
+    @property
+    def holes_completed(self):
+        """The number of holes with both results recorded."""
+        return popcount(self.completed_holes)
+
+    @property
+    def first_incomplete_hole_num(self):
+        """The lowest hole number still missing a result, or None."""
+        return first_incomplete_hole(self.completed_holes)
 
     def __repr__(self):
         return f"<Match {self.id}>"
 
 
 class PointsTable(db.Model):
-    match_id = db.Column(db.Integer, db.ForeignKey("match.id"), primary_key=True)
-    player_id = db.Column(db.Integer, db.ForeignKey("player.id"), primary_key=True)
+    match_id = db.Column(
+        db.Integer, db.ForeignKey("match.id", ondelete="CASCADE"), primary_key=True
+    )
+    player_id = db.Column(
+        db.Integer,
+        db.ForeignKey("player.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
     thru = db.Column(db.Integer, default=0)
     wins = db.Column(db.Integer, default=0)
     draws = db.Column(db.Integer, default=0)
@@ -65,9 +146,15 @@ class PointsTable(db.Model):
 class Hole(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     num = db.Column(db.Integer, nullable=False)
-    match_id = db.Column(db.Integer, db.ForeignKey("match.id"), nullable=False)
+    match_id = db.Column(
+        db.Integer, db.ForeignKey("match.id", ondelete="CASCADE"), nullable=False
+    )
+
+    holematches = relationship(
+        "HoleMatch", backref="hole", lazy=True, cascade="all", passive_deletes=True
+    )
 
-    holematches = relationship("HoleMatch", backref="hole", lazy=True)
+    __table_args__ = (db.Index("ix_hole_match_id_num", "match_id", "num", unique=True),)
 
     def __repr__(self):
         return f"<Hole {self.num}>"
@@ -75,15 +162,41 @@ class Hole(db.Model):
 
 class HoleMatch(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    hole_id = db.Column(db.Integer, db.ForeignKey("hole.id"), nullable=False)
-    match_id = db.Column(db.Integer, db.ForeignKey("match.id"), nullable=False)
-    player1_id = db.Column(db.Integer, db.ForeignKey("player.id"), nullable=False)
-    player2_id = db.Column(db.Integer, db.ForeignKey("player.id"), nullable=False)
-    winner_id = db.Column(db.Integer, db.ForeignKey("player.id"), nullable=True)
+    hole_id = db.Column(
+        db.Integer,
+        db.ForeignKey("hole.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    match_id = db.Column(
+        db.Integer,
+        db.ForeignKey("match.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    # Indexed so that foreign key checks on deleting a player are lookups
+    player1_id = db.Column(
+        db.Integer,
+        db.ForeignKey("player.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    player2_id = db.Column(
+        db.Integer,
+        db.ForeignKey("player.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    # A player ID, -1 for a draw or None, so it has no foreign key constraint
+    winner_id = db.Column(db.Integer, nullable=True)
 
     player1 = relationship("Player", foreign_keys=[player1_id])
     player2 = relationship("Player", foreign_keys=[player2_id])
-    winner = relationship("Player", foreign_keys=[winner_id])
+    winner = relationship(
+        "Player",
+        primaryjoin="foreign(HoleMatch.winner_id) == Player.id",
+        viewonly=True,
+    )
 
     __table_args__ = (
         db.CheckConstraint("player1_id != player2_id", name="check_different_players"),
@@ -91,3 +204,47 @@ class HoleMatch(db.Model):
 
     def __repr__(self):
         return f"<HoleMatch {self.id} for Hole {self.hole_id}>"
+
+
+class MatchSnapshot(db.Model):
+    """The frozen standings and pages of a completed match."""
+
+    match_id = db.Column(
+        db.Integer, db.ForeignKey("match.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Leaderboard as JSON, see LeaderboardService.build_leaderboard
+    data = db.Column(db.Text, nullable=False)
+    # Gzipped HTML and its strong ETag for each page
+    overview_html = db.Column(db.LargeBinary, nullable=False)
+    overview_etag = db.Column(db.String(64), nullable=False)
+    summary_html = db.Column(db.LargeBinary, nullable=False)
+    summary_etag = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<MatchSnapshot {self.match_id}>"
+
+
+class IdempotencyKey(db.Model):
+    """A client's Idempotency-Key and the response stored for it."""
+
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True
+    )
+    key = db.Column(db.String(255), primary_key=True)
+    # Hash of the request the key was first used for
+    fingerprint = db.Column(db.String(32), nullable=False)
+    # None while the first request with the key is still running
+    status = db.Column(db.Integer, nullable=True)
+    mimetype = db.Column(db.String(64), nullable=True)
+    location = db.Column(db.String(255), nullable=True)
+    body = db.Column(db.LargeBinary, nullable=True)
+    created_at = db.Column(
+        db.DateTime, default=db.func.current_timestamp(), nullable=False, index=True
+    )
+
+    # Looked up by its primary key only, so the table is stored in its order
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.user_id} {self.key}>"
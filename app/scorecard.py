@@ -0,0 +1,85 @@
+"""Compact scorecard encoding.
+
+A player's scorecard is stored as a single integer with two bits per hole,
+hole 1 in the lowest bits. Each pair holds 00 (not played), 01 (win),
+10 (loss) or 11 (draw), so result counts come from popcounts over masks
+rather than from decoding the whole card.
+"""
+
+HOLES = 18
+
+CODES = {None: 0b00, "W": 0b01, "L": 0b10, "D": 0b11}
+RESULTS = {code: result for result, code in CODES.items()}
+
+# Low and high bit of every hole's pair
+LOW_BITS = int("01" * HOLES, 2)
+HIGH_BITS = LOW_BITS << 1
+
+
+def _shift(hole):
+    if hole < 1 or hole > HOLES:
+        raise ValueError("Hole number must be between 1 and 18")
+    return (hole - 1) * 2
+
+
+def popcount(bits):
+    """Count the set bits in an integer."""
+    return bin(bits).count("1")
+
+
+def first_incomplete_hole(completed_holes):
+    """Get the lowest hole number whose bit is not set in a progress mask.
+
+    Args:
+        completed_holes: Bitmask with bit n - 1 set for each complete hole n
+
+    Returns:
+        The hole number, or None if all 18 holes are complete
+    """
+    missing = ~completed_holes & ((1 << HOLES) - 1)
+    return (missing & -missing).bit_length() or None
+
+
+def encode_scorecard(results):
+    """Encode a list of 18 None/"W"/"L"/"D" results as an integer."""
+    if len(results) != HOLES:
+        raise ValueError("Scorecard must have 18 entries")
+
+    bits = 0
+    for hole, result in enumerate(results, 1):
+        if result not in CODES:
+            raise ValueError("Invalid scorecard entry")
+        bits |= CODES[result] << _shift(hole)
+    return bits
+
+
+def decode_scorecard(bits):
+    """Decode an integer scorecard into a list of 18 results."""
+    bits = bits or 0
+    return [RESULTS[(bits >> (hole * 2)) & 0b11] for hole in range(HOLES)]
+
+
+def get_result(bits, hole):
+    """Get the result recorded for a hole."""
+    return RESULTS[((bits or 0) >> _shift(hole)) & 0b11]
+
+
+def set_result(bits, hole, result):
+    """Return the scorecard with a hole's result replaced."""
+    if result not in CODES:
+        raise ValueError("Invalid scorecard entry")
+    shift = _shift(hole)
+    return ((bits or 0) & ~(0b11 << shift)) | (CODES[result] << shift)
+
+
+def tally_scorecard(bits):
+    """Count holes played, wins, draws and losses on an encoded scorecard."""
+    bits = bits or 0
+    low = bits & LOW_BITS
+    high = (bits & HIGH_BITS) >> 1
+    return {
+        "thru": popcount(low | high),
+        "wins": popcount(low & ~high),
+        "draws": popcount(low & high),
+        "losses": popcount(high & ~low),
+    }
@@ -0,0 +1,221 @@
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.models import db, Hole, HoleMatch, Match, Player, PointsTable
+from app.services.hole_service import HoleService
+from app.services.leaderboard_service import POINTS_COLUMNS
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class ArchiveService:
+    """Compaction of completed matches into a single JSON record.
+
+    An archived match keeps its Match row, with the players, per-hole
+    winners and points table stored in Match.archive, and loses its
+    Player, Hole, HoleMatch and PointsTable rows. The archive looks like:
+
+        {"players": [[id, name, scorecard bits], ...],
+         "results": [[winner ID, winner ID] or null for holes 1-18],
+         "pointstable": [[player ID, thru, wins, draws, losses, points], ...]}
+    """
+
+    @staticmethod
+    def build_archives(match_ids: List[int]) -> Dict[int, Dict]:
+        """Build the archive records of several matches from their rows."""
+        archives = {
+            match_id: {"players": [], "results": [None] * 18, "pointstable": []}
+            for match_id in match_ids
+        }
+        players = db.session.execute(
+            select(Player.match_id, Player.id, Player.name, Player.scorecard_bits)
+            .where(Player.match_id.in_(match_ids))
+            .order_by(Player.id)
+        )
+        for match_id, *player in players:
+            archives[match_id]["players"].append(player)
+
+        winners = db.session.execute(
+            select(Hole.match_id, Hole.num, HoleMatch.winner_id)
+            .join(HoleMatch, HoleMatch.hole_id == Hole.id)
+            .where(Hole.match_id.in_(match_ids))
+            .order_by(Hole.match_id, Hole.num, HoleMatch.id)
+        )
+        for match_id, num, winner_id in winners:
+            results = archives[match_id]["results"]
+            results[num - 1] = (results[num - 1] or []) + [winner_id]
+
+        points = db.session.execute(
+            select(
+                PointsTable.match_id,
+                PointsTable.player_id,
+                *(getattr(PointsTable, column) for column in POINTS_COLUMNS),
+            )
+            .where(PointsTable.match_id.in_(match_ids))
+            .order_by(PointsTable.player_id)
+        )
+        for match_id, *row in points:
+            archives[match_id]["pointstable"].append(row)
+        return archives
+
+    @staticmethod
+    def archive_matches(match_ids: List[int], commit: bool = True) -> Dict:
+        """Archive completed matches, removing their per-player rows.
+
+        Matches that are not completed or already archived are skipped.
+
+        Args:
+            match_ids: IDs of the matches to archive
+            commit: Whether to commit the transaction (default: True)
+
+        Returns:
+            Dict with the number of matches archived and rows removed
+        """
+        try:
+            match_ids = db.session.scalars(
+                select(Match.id).where(
+                    Match.id.in_(match_ids),
+                    Match.completed.is_(True),
+                    Match.archive.is_(None),
+                )
+            ).all()
+            if not match_ids:
+                return {"matches": 0, "rows": 0}
+
+            archives = ArchiveService.build_archives(match_ids)
+            db.session.execute(
+                update(Match),
+                [
+                    {
+                        "id": match_id,
+                        "archive": json.dumps(archive, separators=(",", ":")),
+                    }
+                    for match_id, archive in archives.items()
+                ],
+            )
+
+            rows = 0
+            for model in (HoleMatch, Hole, PointsTable, Player):
+                rows += db.session.execute(
+                    delete(model).where(model.match_id.in_(match_ids)),
+                    execution_options={"synchronize_session": False},
+                ).rowcount
+
+            if commit:
+                db.session.commit()
+            return {"matches": len(match_ids), "rows": rows}
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to archive matches: {str(e)}")
+
+    @staticmethod
+    def archive_old_matches(
+        older_than_days: int, batch_size: int = 100, limit: Optional[int] = None
+    ):
+        """Archive completed matches created before a cutoff, in batches.
+
+        Each batch is its own short transaction, so the write lock is never
+        held for long.
+
+        Args:
+            older_than_days: Only archive matches created this many days ago
+            batch_size: Matches per transaction (default: 100)
+            limit: Stop after this many matches (default: no limit)
+
+        Yields:
+            The result of archive_matches for each batch
+        """
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            match_ids = db.session.scalars(
+                select(Match.id)
+                .where(
+                    Match.completed.is_(True),
+                    Match.archive.is_(None),
+                    Match.created_at < cutoff,
+                )
+                .order_by(Match.id)
+                .limit(size)
+            ).all()
+            if not match_ids:
+                return
+
+            result = ArchiveService.archive_matches(match_ids)
+            if not result["matches"]:
+                return
+            yield result
+            if remaining is not None:
+                remaining -= result["matches"]
+
+    @staticmethod
+    def unarchive_match(match_id: int, commit: bool = True) -> bool:
+        """Restore an archived match's rows from its archive record.
+
+        Players get new IDs; winners and points rows are mapped to them.
+
+        Returns:
+            True if the match was archived and has been restored
+        """
+        match = db.session.get(Match, match_id)
+        if not match or not match.archived:
+            return False
+
+        archive = json.loads(match.archive)
+        try:
+            player_ids = {}
+            for old_id, name, scorecard_bits in archive["players"]:
+                player_ids[old_id] = db.session.scalar(
+                    insert(Player).returning(Player.id),
+                    {
+                        "name": name,
+                        "match_id": match_id,
+                        "scorecard_bits": scorecard_bits,
+                    },
+                )
+            player_ids[-1] = -1
+            player_ids[None] = None
+
+            db.session.execute(
+                insert(PointsTable),
+                [
+                    {
+                        "match_id": match_id,
+                        "player_id": player_ids[player_id],
+                        **dict(zip(POINTS_COLUMNS, values)),
+                    }
+                    for player_id, *values in archive["pointstable"]
+                ],
+            )
+
+            ordered_ids = [player_ids[player[0]] for player in archive["players"]]
+            for num, winners_ids in enumerate(archive["results"], 1):
+                if winners_ids is None:
+                    continue
+                hole_id = db.session.scalar(
+                    insert(Hole).returning(Hole.id), {"num": num, "match_id": match_id}
+                )
+                db.session.execute(
+                    insert(HoleMatch),
+                    [
+                        {
+                            "hole_id": hole_id,
+                            "match_id": match_id,
+                            "player1_id": ordered_ids[first],
+                            "player2_id": ordered_ids[second],
+                            "winner_id": player_ids.get(winner_id, winner_id),
+                        }
+                        for (first, second), winner_id in zip(
+                            HoleService.get_matchups(num), winners_ids
+                        )
+                    ],
+                )
+
+            match.archive = None
+            if commit:
+                db.session.commit()
+            return True
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to unarchive match: {str(e)}")
@@ -1,11 +1,46 @@
-from app.models import Hole, HoleMatch
+import json
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from app.group_commit import group_writer
+from app.models import Hole, HoleMatch, Match, Player, PointsTable
+from app.scorecard import first_incomplete_hole, get_result, set_result
 from app.services.player_service import PlayerService
 from app.services.pointstable_service import PointstableService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.snapshot_service import SnapshotService
 from app import db
+from flask import current_app
+from sqlalchemy import case, insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
+
+# Player index pairs for each hole, repeating every three holes
+MATCHUPS = [
+    [(0, 1), (2, 3)],  # Hole 1, 4, 7, 10, 13, 16
+    [(0, 2), (1, 3)],  # Hole 2, 5, 8, 11, 14, 17
+    [(0, 3), (1, 2)],  # Hole 3, 6, 9, 12, 15, 18
+]
+
+
+class ConflictError(Exception):
+    """Another scorer changed the same holes at the same time."""
+
+
+class StaleVersionError(ConflictError):
+    """The match changed between reading and writing; the write can be retried."""
+
+
+class ScoringTimeoutError(Exception):
+    """The group commit writer did not commit the write in time.
+
+    The write is still queued, so it may yet be committed.
+    """
 
 
 class HoleService:
+    @staticmethod
+    def get_matchups(num: int) -> list:
+        """Get the player index pairs that play each other on a hole."""
+        return MATCHUPS[(num - 1) % 3]
 
     @staticmethod
     def create_hole(num: int, match_id: int, player_ids: list, commit: bool = False):
@@ -22,13 +57,7 @@ class HoleService:
             db.session.add(hole)
             db.session.flush()
 
-            matchups = [
-                [(0, 1), (2, 3)],  # Hole 1, 4, 7, 10, 13, 16
-                [(0, 2), (1, 3)],  # Hole 2, 5, 8, 11, 14, 17
-                [(0, 3), (1, 2)],  # Hole 3, 6, 9, 12, 15, 18
-            ][(num - 1) % 3]
-
-            for matchup in matchups:
+            for matchup in HoleService.get_matchups(num):
                 holematch = HoleMatch(
                     hole_id=hole.id,
                     match_id=match_id,
@@ -51,8 +80,70 @@ class HoleService:
 
     @staticmethod
     def get_hole_by_match_hole_num(match_id, hole_num):
-        """Get a hole by match ID and hole number."""
-        return Hole.query.filter_by(match_id=match_id, num=hole_num).first()
+        """Get a hole by match ID and hole number.
+
+        Holes are only stored once a result is recorded. Until then an
+        unsaved Hole is built from the matchup rotation, with holematches
+        whose winner_id is None. Its id is None and it is not added to the
+        session.
+        """
+        if hole_num < 1 or hole_num > 18:
+            return None
+
+        hole = Hole.query.filter_by(match_id=match_id, num=hole_num).first()
+        if hole:
+            return hole
+
+        players = Player.query.filter_by(match_id=match_id).order_by(Player.id).all()
+        if len(players) != 4:
+            return HoleService._get_archived_hole(match_id, hole_num)
+
+        hole = Hole(num=hole_num, match_id=match_id)
+        hole.holematches = [
+            HoleMatch(
+                match_id=match_id,
+                player1=players[matchup[0]],
+                player2=players[matchup[1]],
+                player1_id=players[matchup[0]].id,
+                player2_id=players[matchup[1]].id,
+            )
+            for matchup in HoleService.get_matchups(hole_num)
+        ]
+        return hole
+
+    @staticmethod
+    def _get_archived_hole(match_id, hole_num):
+        """Build a read-only hole from an archived match's record.
+
+        The hole, its holematches and players are transient copies marked
+        archived; they must not be added to the session.
+        """
+        archive = db.session.scalar(select(Match.archive).where(Match.id == match_id))
+        if not archive:
+            return None
+        archive = json.loads(archive)
+
+        players = [
+            Player(id=player_id, name=name, match_id=match_id)
+            for player_id, name, _ in archive["players"]
+        ]
+        winners_ids = archive["results"][hole_num - 1] or [None, None]
+        hole = Hole(num=hole_num, match_id=match_id)
+        hole.holematches = [
+            HoleMatch(
+                match_id=match_id,
+                player1=players[first],
+                player2=players[second],
+                player1_id=players[first].id,
+                player2_id=players[second].id,
+                winner_id=winner_id,
+            )
+            for (first, second), winner_id in zip(
+                HoleService.get_matchups(hole_num), winners_ids
+            )
+        ]
+        hole.archived = True
+        return hole
 
     @staticmethod
     def get_all_holes():
@@ -60,16 +151,41 @@ class HoleService:
         return Hole.query.all()
 
     @staticmethod
-    def handle_hole_outcome(match_id: int, hole_id: int, winners_ids: list):
-        """Handle the outcome of a hole."""
+    def handle_hole_outcome(match_id: int, hole_num: int, winners_ids: list):
+        """Handle the outcome of a hole.
+
+        The hole and its holematches are written the first time a result
+        is recorded for it. Retried like score_hole if another scorer
+        changes the match at the same time.
+        """
         if len(winners_ids) != 2:
             raise ValueError("Must provide winner for each match")
 
-        hole = HoleService.get_hole(hole_id)
-        if not hole:
-            raise ValueError("Hole not found")
+        def write(seen):
+            # Read before anything else, so the version covers what follows
+            version = db.session.scalar(
+                select(Match.version).where(Match.id == match_id)
+            )
+            hole = HoleService.get_hole_by_match_hole_num(match_id, hole_num)
+            if not hole:
+                raise ValueError("Hole not found")
+            if getattr(hole, "archived", False):
+                raise ValueError("Match is archived")
 
-        try:
+            stored = [holematch.winner_id for holematch in hole.holematches]
+            seen.setdefault(hole.num, stored)
+            if stored != seen[hole.num]:
+                raise ConflictError(
+                    f"Hole {hole.num} was changed by another scorer; reload and retry"
+                )
+            # Take the version first, so a lost race fails before any writes
+            HoleService._update_progress(match_id, {hole.num: winners_ids}, version)
+
+            if hole.id is None:
+                db.session.add(hole)
+                db.session.flush()
+
+            changes = []
             for holematch, winner_id in zip(hole.holematches, winners_ids):
                 holematch.winner_id = winner_id
 
@@ -77,12 +193,10 @@ class HoleService:
                     continue
 
                 if winner_id == -1:
-                    PlayerService.update_scorecard(
-                        holematch.player1_id, hole.num, "D", commit=False
-                    )
-                    PlayerService.update_scorecard(
-                        holematch.player2_id, hole.num, "D", commit=False
-                    )
+                    results = [
+                        (holematch.player1_id, "D"),
+                        (holematch.player2_id, "D"),
+                    ]
                 else:
                     winner = (
                         holematch.player1
@@ -94,42 +208,420 @@ class HoleService:
                         if winner_id == holematch.player1_id
                         else holematch.player1
                     )
-                    PlayerService.update_scorecard(
-                        winner.id, hole.num, "W", commit=False
+                    results = [(winner.id, "W"), (loser.id, "L")]
+
+                for player_id, result in results:
+                    previous = PlayerService.update_scorecard(
+                        player_id, hole.num, result, commit=False
                     )
-                    PlayerService.update_scorecard(
-                        loser.id, hole.num, "L", commit=False
+                    changes.append((player_id, previous, result))
+
+            # Flushed here so a stale player raises StaleDataError unwrapped
+            db.session.flush()
+            PointstableService.apply_result_changes(match_id, changes, commit=False)
+
+        try:
+            HoleService._commit_with_retries(write)
+        except Exception as e:
+            db.session.rollback()
+            if isinstance(e, (ValueError, ConflictError)):
+                raise e
+            raise Exception(f"Failed to update hole outcome: {str(e)}")
+
+        LeaderboardService.results_changed(match_id)
+
+    @staticmethod
+    def _commit_with_retries(write) -> None:
+        """Run write(seen) and commit, retrying if another scorer got in first.
+
+        A write that lost the race is rolled back and run again from a
+        fresh read, up to SCORING_MAX_RETRIES times. seen holds the holes'
+        results from the first attempt, so a retry raises ConflictError
+        instead if another scorer changed one of the same holes.
+
+        Raises:
+            ConflictError: If the holes changed or the retries ran out
+        """
+        seen = {}
+        for _ in range(current_app.config["SCORING_MAX_RETRIES"] + 1):
+            try:
+                write(seen)
+                db.session.commit()
+                return
+            except (StaleVersionError, StaleDataError):
+                db.session.rollback()
+        raise ConflictError("The match kept changing while saving; try again")
+
+    @staticmethod
+    def _update_progress(match_id: int, results: dict, version: int) -> None:
+        """Set or clear holes' bits in the match's completed_holes mask.
+
+        This is also the compare-and-swap of the match's version: it only
+        applies if the match is still at the version the caller read, so
+        two scorers cannot both write results worked out from the same
+        state. A completed match's snapshot is dropped in the same
+        transaction, as it would no longer match the results.
+
+        Args:
+            match_id: The ID of the match
+            results: Dict of hole number -> the hole's new winner IDs
+            version: The match version the results were worked out from
+
+        Raises:
+            StaleVersionError: If the match has changed since
+        """
+        complete = incomplete = 0
+        for num, winners_ids in results.items():
+            if all(winner_id is not None for winner_id in winners_ids):
+                complete |= 1 << (num - 1)
+            else:
+                incomplete |= 1 << (num - 1)
+
+        progress = Match.completed_holes.op("|")(complete)
+        if incomplete:
+            progress = progress.op("&")(~incomplete)
+        updated = db.session.execute(
+            update(Match)
+            .where(Match.id == match_id, Match.version == version)
+            .values(completed_holes=progress, version=Match.version + 1)
+            .returning(Match.completed),
+            execution_options={"synchronize_session": False},
+        ).first()
+        if updated is None:
+            raise StaleVersionError("The match was changed by another scorer")
+        if updated.completed:
+            SnapshotService.delete_snapshot(match_id)
+
+    @staticmethod
+    def _matchup_results(player1_id: int, player2_id: int, winner_id):
+        """Get the (player_id, result) pairs for one matchup's winner.
+
+        Like handle_hole_outcome, any winner other than player1 or a draw
+        counts as a win for player2.
+        """
+        if winner_id is None:
+            return []
+        if winner_id == -1:
+            return [(player1_id, "D"), (player2_id, "D")]
+        if winner_id == player1_id:
+            return [(player1_id, "W"), (player2_id, "L")]
+        return [(player2_id, "W"), (player1_id, "L")]
+
+    @staticmethod
+    def _write_results(
+        match_id: int, results: dict, strict: bool = False, seen: dict = None
+    ) -> None:
+        """Write hole results with set-based statements, without committing.
+
+        The players and any stored holes with their winners are read with
+        one query each, the new scorecards and points table deltas are
+        worked out in Python, and each table is then written with a single
+        statement. The first write is the match version's compare-and-swap.
+
+        Args:
+            match_id: The ID of the match
+            results: Dict of hole number -> [winner ID, winner ID]
+            strict: Whether to reject winners who are not in the matchup
+                (default: False)
+            seen: The holes' stored results from an earlier attempt, which
+                is filled in on the first attempt (default: not checked)
+
+        Raises:
+            StaleVersionError: If the match changed after it was read
+            ConflictError: If one of the holes changed since the earlier
+                attempt
+        """
+        players = db.session.execute(
+            select(Player.id, Player.scorecard_bits, Match.version)
+            .join(Match, Match.id == Player.match_id)
+            .where(Player.match_id == match_id)
+            .order_by(Player.id)
+        ).all()
+        if len(players) != 4:
+            raise ValueError("Hole not found")
+        player_ids = [player.id for player in players]
+        scorecards = {player.id: player.scorecard_bits for player in players}
+
+        # The stored winners, not the scorecards, as clearing a result only
+        # changes these
+        hole_ids = {}
+        stored = {num: [] for num in results}
+        for num, hole_id, winner_id in db.session.execute(
+            select(Hole.num, Hole.id, HoleMatch.winner_id)
+            .outerjoin(HoleMatch, HoleMatch.hole_id == Hole.id)
+            .where(Hole.match_id == match_id, Hole.num.in_(results))
+            .order_by(Hole.num, HoleMatch.id)
+        ):
+            hole_ids[num] = hole_id
+            stored[num].append(winner_id)
+
+        if seen is not None:
+            stored = {num: winners or [None, None] for num, winners in stored.items()}
+            if not seen:
+                seen.update(stored)
+            for num in sorted(results):
+                if stored[num] != seen[num]:
+                    raise ConflictError(
+                        f"Hole {num} was changed by another scorer; reload and retry"
+                    )
+
+        HoleService._update_progress(match_id, results, players[0].version)
+
+        new_nums = {num for num in results if num not in hole_ids}
+        if new_nums:
+            created = db.session.execute(
+                insert(Hole).returning(Hole.num, Hole.id),
+                [{"num": num, "match_id": match_id} for num in sorted(new_nums)],
+            ).all()
+            hole_ids.update(created)
+
+        new_holematches = []
+        winner_updates = {}
+        deltas = {}
+        for num, winners_ids in sorted(results.items()):
+            new_hole = num in new_nums
+            for (first, second), winner_id in zip(
+                HoleService.get_matchups(num), winners_ids
+            ):
+                player1_id, player2_id = player_ids[first], player_ids[second]
+                if strict and winner_id not in (None, -1, player1_id, player2_id):
+                    raise ValueError(f"Invalid winner for hole {num}")
+                if new_hole:
+                    new_holematches.append(
+                        {
+                            "hole_id": hole_ids[num],
+                            "match_id": match_id,
+                            "player1_id": player1_id,
+                            "player2_id": player2_id,
+                            "winner_id": winner_id,
+                        }
+                    )
+                else:
+                    winner_updates[(hole_ids[num], player1_id)] = winner_id
+
+                for player_id, result in HoleService._matchup_results(
+                    player1_id, player2_id, winner_id
+                ):
+                    previous = get_result(scorecards[player_id], num)
+                    scorecards[player_id] = set_result(
+                        scorecards[player_id], num, result
                     )
+                    if previous == result:
+                        continue
+                    delta = deltas.setdefault(
+                        player_id,
+                        {"thru": 0, "wins": 0, "draws": 0, "losses": 0, "points": 0},
+                    )
+                    for outcome, step in ((previous, -1), (result, 1)):
+                        if outcome is None:
+                            continue
+                        column, points = PointstableService.RESULT_COLUMNS[outcome]
+                        delta[column] += step
+                        delta["points"] += step * points
+                        delta["thru"] += step
+
+        if new_holematches:
+            db.session.execute(insert(HoleMatch), new_holematches)
+
+        if winner_updates:
+            whens = [
+                (
+                    (HoleMatch.hole_id == hole_id)
+                    & (HoleMatch.player1_id == player1_id),
+                    winner_id,
+                )
+                for (hole_id, player1_id), winner_id in winner_updates.items()
+            ]
+            db.session.execute(
+                update(HoleMatch)
+                .where(HoleMatch.hole_id.in_({key[0] for key in winner_updates}))
+                .values(winner_id=case(*whens, else_=HoleMatch.winner_id)),
+                execution_options={"synchronize_session": False},
+            )
+
+        changed = [
+            player.id
+            for player in players
+            if scorecards[player.id] != player.scorecard_bits
+        ]
+        if changed:
+            db.session.execute(
+                update(Player)
+                .where(Player.id.in_(changed))
+                .values(
+                    scorecard_bits=case(
+                        {player_id: scorecards[player_id] for player_id in changed},
+                        value=Player.id,
+                    ),
+                    version=Player.version + 1,
+                ),
+                execution_options={"synchronize_session": False},
+            )
+
+        deltas = {
+            player_id: delta
+            for player_id, delta in deltas.items()
+            if any(delta.values())
+        }
+        if deltas:
+            db.session.execute(
+                update(PointsTable)
+                .where(
+                    PointsTable.match_id == match_id,
+                    PointsTable.player_id.in_(deltas),
+                )
+                .values(
+                    {
+                        column: getattr(PointsTable, column)
+                        + case(
+                            {
+                                player_id: delta[column]
+                                for player_id, delta in deltas.items()
+                            },
+                            value=PointsTable.player_id,
+                            else_=0,
+                        )
+                        for column in ("thru", "wins", "draws", "losses", "points")
+                    }
+                ),
+                execution_options={"synchronize_session": False},
+            )
+
+    @staticmethod
+    def score_hole(
+        match_id: int, hole_num: int, winners_ids: list, commit: bool = True
+    ) -> None:
+        """Record a hole's two results in one short transaction.
+
+        Gives the same results as handle_hole_outcome, including draws (-1)
+        and cleared results (None), but reads and writes whole rows with a
+        handful of set-based statements instead of going through the ORM
+        one player at a time. With group commit on, the write is handed to
+        the group commit writer and this waits for its batch to commit.
+
+        Args:
+            match_id: The ID of the match
+            hole_num: The hole number (1-18)
+            winners_ids: The winner of each of the hole's two matchups
+            commit: Whether to commit the transaction (default: True). The
+                caller is then responsible for rolling back on failure.
+
+        Raises:
+            ScoringTimeoutError: If group commit is on and the batch did not
+                commit within GROUP_COMMIT_TIMEOUT seconds. The write may
+                still be committed afterwards.
+        """
+        if len(winners_ids) != 2:
+            raise ValueError("Must provide winner for each match")
+        if hole_num < 1 or hole_num > 18:
+            raise ValueError("Hole not found")
 
-            PointstableService.update_pointstable_for_all(match_id, commit=False)
+        if commit and group_writer.enabled:
+            # End this session's transaction first, as the writer thread
+            # may need the connection it holds
             db.session.commit()
+            try:
+                group_writer.run(
+                    HoleService.score_hole,
+                    match_id,
+                    hole_num,
+                    winners_ids,
+                    commit=False,
+                )
+            except FutureTimeoutError:
+                raise ScoringTimeoutError(
+                    "Saving the result is taking too long; it may still be saved"
+                )
+            LeaderboardService.results_changed(match_id)
+            return
+
+        results = {hole_num: winners_ids}
+        try:
+            if commit:
+                HoleService._commit_with_retries(
+                    lambda seen: HoleService._write_results(
+                        match_id, results, seen=seen
+                    )
+                )
+            else:
+                HoleService._write_results(match_id, results)
         except Exception as e:
-            db.session.rollback()
-            if isinstance(e, ValueError):
+            if commit:
+                db.session.rollback()
+            if isinstance(e, (ValueError, ConflictError)):
                 raise e
             raise Exception(f"Failed to update hole outcome: {str(e)}")
 
+        if commit:
+            LeaderboardService.results_changed(match_id)
+
     @staticmethod
-    def get_next_hole_num(hole_id: int) -> int:
-        """Get the next hole number."""
-        current_hole = db.session.get(Hole, hole_id)
-        return current_hole.num + 1
+    def score_holes(match_id: int, results: dict) -> None:
+        """Record the results of many holes in one transaction.
+
+        Every result is checked before anything is written, and the points
+        table is updated once for the whole batch. Either all results are
+        recorded or none are.
+
+        Args:
+            match_id: The ID of the match
+            results: Dict of hole number -> [winner ID, winner ID], where a
+                winner is a player in the matchup, -1 for a draw or None to
+                clear the result
+        """
+        if not results:
+            raise ValueError("No hole results provided")
+        for hole_num, winners_ids in results.items():
+            if not isinstance(hole_num, int) or hole_num < 1 or hole_num > 18:
+                raise ValueError("Hole number must be between 1 and 18")
+            if len(winners_ids) != 2:
+                raise ValueError(
+                    f"Must provide winner for each match on hole {hole_num}"
+                )
+
+        try:
+            HoleService._commit_with_retries(
+                lambda seen: HoleService._write_results(
+                    match_id, results, strict=True, seen=seen
+                )
+            )
+        except Exception as e:
+            db.session.rollback()
+            if isinstance(e, (ValueError, ConflictError)):
+                raise e
+            raise Exception(f"Failed to update hole outcomes: {str(e)}")
+
+        LeaderboardService.results_changed(match_id)
+
+    @staticmethod
+    def get_next_hole_num(hole_num: int):
+        """Get the next hole number, or None after the last hole."""
+        return hole_num + 1 if hole_num < 18 else None
 
     @staticmethod
-    def get_previous_results(hole_id: int) -> dict:
+    def get_previous_results(hole: Hole) -> dict:
         """Get previous hole results."""
-        hole = db.session.get(Hole, hole_id)
         return {
             f"winner{i+1}": holematch.winner_id
             for i, holematch in enumerate(hole.holematches)
         }
 
+    @staticmethod
+    def get_first_incomplete_hole_num(match_id: int):
+        """Get the first hole without both results, or None when all are done.
+
+        Progress is kept on the match as holes are scored, so this is a
+        single primary key read.
+        """
+        completed_holes = db.session.scalar(
+            select(Match.completed_holes).where(Match.id == match_id)
+        )
+        if completed_holes is None:
+            return None
+        return first_incomplete_hole(completed_holes)
+
     @staticmethod
     def get_first_incomplete_hole(match_id):
         """Get the first incomplete hole in a match."""
-        holes = Hole.query.filter_by(match_id=match_id).order_by(Hole.num).all()
-        for hole in holes:
-            for holematch in hole.holematches:
-                if holematch.winner_id is None:
-                    return hole
-        return None
+        num = HoleService.get_first_incomplete_hole_num(match_id)
+        return HoleService.get_hole_by_match_hole_num(match_id, num) if num else None
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from app.models import db, IdempotencyKey
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class IdempotencyService:
+    """Storage of the responses to requests sent with an Idempotency-Key.
+
+    A key is reserved before its first request runs and gets the response
+    once it has finished, so a retry can be answered from the table. Keys
+    expire after a TTL, see purge_expired.
+    """
+
+    @staticmethod
+    def reserve(
+        user_id: int, key: str, fingerprint: str, ttl: int, lock_timeout: int
+    ) -> Tuple[Optional[datetime], Optional[IdempotencyKey]]:
+        """Claim a key for a request, unless it is already in use.
+
+        An expired key is replaced, as if it had never been used. So is a
+        reservation that never got its response within lock_timeout, as
+        its request's process has most likely died.
+
+        Args:
+            user_id: The ID of the user sending the request
+            key: The request's Idempotency-Key
+            fingerprint: Hash of the request, see app.idempotency
+            ttl: Seconds a key stays in use
+            lock_timeout: Seconds after which a reservation without a
+                response is taken over
+
+        Returns:
+            (reserved_at, None) if the key was claimed and the request
+            should run, where reserved_at identifies this reservation to
+            save_response and release, else (None, the key's row from an
+            earlier request)
+        """
+        now = datetime.utcnow()
+        try:
+            db.session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    or_(
+                        IdempotencyKey.created_at < now - timedelta(seconds=ttl),
+                        and_(
+                            IdempotencyKey.status.is_(None),
+                            IdempotencyKey.created_at
+                            < now - timedelta(seconds=lock_timeout),
+                        ),
+                    ),
+                )
+            )
+            # Inserted and committed up front, so a retry that arrives while
+            # the first request is still running finds the key taken
+            claimed = db.session.execute(
+                insert(IdempotencyKey)
+                .values(
+                    user_id=user_id,
+                    key=key,
+                    fingerprint=fingerprint,
+                    created_at=now,
+                )
+                .on_conflict_do_nothing()
+            ).rowcount
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to reserve idempotency key: {str(e)}")
+
+        if claimed:
+            return now, None
+        return None, db.session.scalar(
+            select(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+            )
+        )
+
+    @staticmethod
+    def save_response(
+        user_id: int,
+        key: str,
+        reserved_at: datetime,
+        status: int,
+        mimetype: Optional[str],
+        location: Optional[str],
+        body: bytes,
+    ) -> None:
+        """Store the response to a reserved key's request.
+
+        Nothing is stored if the reservation has since been taken over.
+        """
+        try:
+            db.session.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at == reserved_at,
+                )
+                .values(status=status, mimetype=mimetype, location=location, body=body),
+                execution_options={"synchronize_session": False},
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to save idempotent response: {str(e)}")
+
+    @staticmethod
+    def release(user_id: int, key: str, reserved_at: datetime) -> None:
+        """Free a reserved key whose request failed, so it can be retried."""
+        try:
+            db.session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at == reserved_at,
+                ),
+                execution_options={"synchronize_session": False},
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to release idempotency key: {str(e)}")
+
+    @staticmethod
+    def purge_expired(ttl: int) -> int:
+        """Delete the keys older than the TTL.
+
+        Args:
+            ttl: Seconds a key stays in use
+
+        Returns:
+            The number of keys deleted
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+        try:
+            deleted = db.session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+            db.session.commit()
+            return deleted
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to purge idempotency keys: {str(e)}")
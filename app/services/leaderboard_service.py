@@ -0,0 +1,113 @@
+import json
+from typing import Dict, Optional
+from app.cache import leaderboard_cache
+from app.database import read_only
+from app.events import match_events
+from app.models import db, Match
+from app.scorecard import decode_scorecard
+from app.services.player_service import PlayerService
+from app.services.pointstable_service import PointstableService
+from sqlalchemy import select
+
+# Points table columns in the order archive records store them
+POINTS_COLUMNS = ("thru", "wins", "draws", "losses", "points")
+
+
+class LeaderboardService:
+    @staticmethod
+    @read_only
+    def build_leaderboard(match_id: int) -> Dict:
+        """Build the formatted points table and scorecards for a match.
+
+        Archived matches have no points table rows, so only when none are
+        found is the match's archive record checked.
+        """
+        pointstable = PointstableService.get_formatted_pointstable(match_id)
+        if not pointstable:
+            archive = db.session.scalar(
+                select(Match.archive).where(Match.id == match_id)
+            )
+            if archive:
+                return LeaderboardService.build_archived_leaderboard(
+                    json.loads(archive)
+                )
+        return {
+            "pointstable": pointstable,
+            "scorecards": [
+                {"player_name": player.name, "scorecard": player.scorecard}
+                for player in PlayerService.get_all_players(match_id)
+            ],
+        }
+
+    @staticmethod
+    def build_archived_leaderboard(archive: Dict) -> Dict:
+        """Build the same leaderboard from a match's archive record."""
+        names = {player_id: name for player_id, name, _ in archive["players"]}
+        # Points desc, wins desc, player ID, as in get_formatted_pointstable
+        rows = sorted(
+            archive["pointstable"], key=lambda row: (-row[5], -row[2], row[0])
+        )
+        return {
+            "pointstable": [
+                {"player_name": names[player_id], **dict(zip(POINTS_COLUMNS, values))}
+                for player_id, *values in rows
+            ],
+            "scorecards": [
+                {"player_name": name, "scorecard": decode_scorecard(bits)}
+                for _, name, bits in archive["players"]
+            ],
+        }
+
+    @staticmethod
+    def get_leaderboard(match_id: int, version: Optional[int] = None) -> Dict:
+        """Get a match's leaderboard, reading through the in-process cache.
+
+        Entries are stamped with Match.version, which every scoring write
+        bumps, so a write made through another worker is seen on the next
+        read instead of once the entry expires.
+
+        The returned data is shared between requests and must not be modified.
+
+        Args:
+            match_id: The ID of the match
+            version: The match's version, if the caller has already loaded
+                the match (default: read by primary key)
+        """
+        if version is None:
+            version = db.session.scalar(
+                select(Match.version).where(Match.id == match_id)
+            )
+            if version is None:
+                return LeaderboardService.build_leaderboard(match_id)
+        return leaderboard_cache.get_or_load(
+            match_id,
+            lambda: LeaderboardService.build_leaderboard(match_id),
+            stamp=version,
+        )
+
+    @staticmethod
+    def invalidate(match_id: int) -> None:
+        """Drop a match's cached leaderboard after its results change."""
+        leaderboard_cache.invalidate(match_id)
+
+    @staticmethod
+    def results_changed(match_id: int) -> None:
+        """Refresh a match's leaderboard after a results commit.
+
+        The cached copy is dropped and, if anyone is streaming the match,
+        the new leaderboard is computed once and pushed to all of them.
+        """
+        LeaderboardService.invalidate(match_id)
+        if match_events.has_subscribers(match_id):
+            match_events.publish(match_id, LeaderboardService.get_leaderboard(match_id))
+
+    @staticmethod
+    def match_deleted(match_id: int) -> None:
+        """Drop a deleted match's cached leaderboard and end its streams."""
+        LeaderboardService.invalidate(match_id)
+        match_events.close(match_id)
+
+    @staticmethod
+    def cache_stats() -> Dict:
+        """Get the leaderboard cache's hit/miss counters."""
+        return leaderboard_cache.stats()
@@ -1,7 +1,22 @@
-from app.models import db, Match, Player, PointsTable, HoleMatch, Hole
-from app.services.hole_service import HoleService
+from datetime import datetime, timedelta
+from typing import Optional
+from app.models import db, HoleMatch, Match, Player, PointsTable
+from app.database import read_only
 from app.services.pointstable_service import PointstableService
+from app.services.leaderboard_service import LeaderboardService
+from flask import current_app
 from flask_login import current_user
+from sqlalchemy import (
+    String,
+    delete,
+    exists,
+    func,
+    insert,
+    select,
+    tuple_,
+    type_coerce,
+)
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import SQLAlchemyError
 
 
@@ -15,6 +30,73 @@ class MatchService:
             .all()
         )
 
+    @staticmethod
+    def encode_cursor(created_at, match_id):
+        """Encode a match's (created_at, id) position as a page cursor.
+
+        created_at is the text SQLite stores, which is what pages are
+        ordered by. It has no fraction when set by CURRENT_TIMESTAMP but
+        six digits when written from Python, even if they are all zero.
+        """
+        return f"{created_at}|{match_id}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Decode a page cursor into its (created_at, id) position."""
+        created_at, _, match_id = cursor.rpartition("|")
+        if not created_at or not match_id.isdigit():
+            raise ValueError("Invalid page cursor")
+        return created_at, int(match_id)
+
+    @staticmethod
+    @read_only
+    def get_matches_page(cursor=None, page_size=None):
+        """Get one page of the current user's matches, newest first.
+
+        Pages are keyed on (created_at, id) rather than an offset, so every
+        page costs the same however many matches the user has. Players for
+        the whole page are loaded with one extra query.
+
+        Args:
+            cursor: Cursor returned for the previous page, or None
+            page_size: Matches per page (default: MATCHES_PAGE_SIZE), at
+                most MATCHES_MAX_PAGE_SIZE
+
+        Returns:
+            Tuple of (matches, cursor for the next page or None)
+
+        Raises:
+            ValueError: If the cursor is malformed or page_size is below 1
+        """
+        if page_size is None:
+            page_size = current_app.config["MATCHES_PAGE_SIZE"]
+        elif page_size < 1:
+            # LIMIT 0 would end the pages early and a negative LIMIT is none
+            raise ValueError("Page size must be at least 1")
+        page_size = min(page_size, current_app.config["MATCHES_MAX_PAGE_SIZE"])
+
+        query = Match.query.options(selectinload(Match.players)).filter_by(
+            user_id=current_user.id
+        )
+        stored_created_at = type_coerce(Match.created_at, String)
+        if cursor:
+            created_at, match_id = MatchService.decode_cursor(cursor)
+            query = query.filter(
+                tuple_(stored_created_at, Match.id) < tuple_(created_at, match_id)
+            )
+
+        rows = (
+            query.add_columns(stored_created_at)
+            .order_by(Match.created_at.desc(), Match.id.desc())
+            .limit(page_size + 1)
+            .all()
+        )
+        matches = [match for match, _ in rows[:page_size]]
+        if len(rows) > page_size:
+            last, created_at = rows[page_size - 1]
+            return matches, MatchService.encode_cursor(created_at, last.id)
+        return matches, None
+
     @staticmethod
     def get_match(match_id):
         """Get a specific match, ensuring it belongs to the current user."""
@@ -23,16 +105,28 @@ class MatchService:
         ).first_or_404()
 
     @staticmethod
-    def create_match(player_names):
-        """Create a new match with the given player names."""
+    def _validate_player_names(player_names):
+        """Validate player names before starting any database operations."""
         if len(player_names) != 4:
             raise ValueError("Exactly 4 player names are required")
 
-        # Validate player names before starting any database operations
         for name in player_names:
             if not name.strip():
                 raise ValueError("Player names cannot be empty")
 
+    @staticmethod
+    def create_match(player_names, bulk=False):
+        """Create a new match with the given player names.
+
+        Args:
+            player_names: List of the four player names
+            bulk: Whether to use the multi-row INSERT path (default: False)
+        """
+        if bulk:
+            return MatchService.create_matches([player_names])[0]
+
+        MatchService._validate_player_names(player_names)
+
         try:
             match = Match(user_id=current_user.id)
             db.session.add(match)
@@ -46,13 +140,8 @@ class MatchService:
                 db.session.add(player)
             db.session.flush()
 
-            # Create holes and points table entries in a single transaction
-            for i in range(1, 19):
-                hole = HoleService.create_hole(
-                    i, match.id, [player.id for player in players], commit=False
-                )
-
-            # Create points table entries
+            # Create points table entries. Holes are written as results
+            # are recorded, see HoleService.get_hole_by_match_hole_num.
             PointstableService.create_pointstable(match.id, commit=False)
 
             db.session.commit()
@@ -63,26 +152,162 @@ class MatchService:
             raise Exception(f"Failed to create match: {str(e)}")
 
     @staticmethod
-    def delete_match(match_id):
-        """Delete a match and all related entities."""
+    def create_matches(player_name_lists):
+        """Create many matches in a single transaction.
+
+        Each table is written with one multi-row INSERT instead of one
+        ORM object and flush at a time. Holes are written as results are
+        recorded, see HoleService.get_hole_by_match_hole_num.
+
+        Args:
+            player_name_lists: List of player name lists, one per match
+        """
+        for player_names in player_name_lists:
+            MatchService._validate_player_names(player_names)
+
+        if not player_name_lists:
+            return []
+
         try:
-            match = db.session.get(Match, match_id)
-            if match:
-                # Delete related HoleMatch entries
-                HoleMatch.query.filter(
-                    HoleMatch.hole_id.in_(
-                        Hole.query.with_entities(Hole.id).filter_by(match_id=match_id)
-                    )
-                ).delete(synchronize_session=False)
-
-                PointsTable.query.filter_by(match_id=match_id).delete()
-                Hole.query.filter_by(match_id=match_id).delete()
-                Player.query.filter_by(match_id=match_id).delete()
-                db.session.delete(match)
+            match_ids = db.session.scalars(
+                insert(Match).returning(Match.id, sort_by_parameter_order=True),
+                [{"user_id": current_user.id} for _ in player_name_lists],
+            ).all()
 
-                db.session.commit()
-                return True
-            return False
+            player_ids = db.session.scalars(
+                insert(Player).returning(Player.id, sort_by_parameter_order=True),
+                [
+                    {"name": name, "match_id": match_id}
+                    for match_id, player_names in zip(match_ids, player_name_lists)
+                    for name in player_names
+                ],
+            ).all()
+            db.session.execute(
+                insert(PointsTable),
+                [
+                    {"match_id": match_ids[i // 4], "player_id": player_id}
+                    for i, player_id in enumerate(player_ids)
+                ],
+            )
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to create matches: {str(e)}")
+
+        return Match.query.filter(Match.id.in_(match_ids)).order_by(Match.id).all()
+
+    @staticmethod
+    def delete_match(match_id):
+        """Delete a match; its other rows go with it by ON DELETE CASCADE."""
+        try:
+            deleted = db.session.execute(
+                delete(Match).where(Match.id == match_id)
+            ).rowcount
+            db.session.commit()
         except SQLAlchemyError as e:
             db.session.rollback()
             raise Exception(f"Failed to delete match: {str(e)}")
+
+        if deleted:
+            LeaderboardService.match_deleted(match_id)
+        return bool(deleted)
+
+    @staticmethod
+    def delete_matches(match_ids):
+        """Delete many of the current user's matches in one transaction.
+
+        IDs of matches that do not exist or belong to another user are
+        ignored.
+
+        Returns:
+            The number of matches deleted
+        """
+        if not match_ids:
+            return 0
+
+        try:
+            deleted_ids = db.session.scalars(
+                delete(Match)
+                .where(Match.id.in_(match_ids), Match.user_id == current_user.id)
+                .returning(Match.id)
+            ).all()
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to delete matches: {str(e)}")
+
+        for match_id in deleted_ids:
+            LeaderboardService.match_deleted(match_id)
+        return len(deleted_ids)
+
+    @staticmethod
+    def purge_abandoned_matches(
+        older_than_days: int,
+        include_played: bool = False,
+        batch_size: int = 100,
+        limit: Optional[int] = None,
+    ):
+        """Delete unfinished matches created before a cutoff, in batches.
+
+        By default only matches without any recorded result are purged,
+        including older ones created with a row for every hole. Each
+        batch is its own short transaction, and the DELETE re-checks the
+        conditions, so a match scored since it was selected is kept.
+
+        Args:
+            older_than_days: Only purge matches created this many days ago
+            include_played: Also purge unfinished matches with holes played
+            batch_size: Matches per transaction (default: 100)
+            limit: Stop after this many matches (default: no limit)
+
+        Yields:
+            Dict with the number of matches and rows deleted by each batch
+        """
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        conditions = [
+            Match.completed.is_(False),
+            Match.archive.is_(None),
+            Match.created_at < cutoff,
+        ]
+        if not include_played:
+            conditions += [
+                Match.completed_holes == 0,
+                ~exists().where(
+                    HoleMatch.match_id == Match.id, HoleMatch.winner_id.isnot(None)
+                ),
+            ]
+
+        last_id = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            match_ids = db.session.scalars(
+                select(Match.id)
+                .where(Match.id > last_id, *conditions)
+                .order_by(Match.id)
+                .limit(size)
+            ).all()
+            if not match_ids:
+                return
+            last_id = match_ids[-1]
+
+            try:
+                # total_changes() also counts the rows removed by cascades
+                changes = db.session.scalar(select(func.total_changes()))
+                deleted_ids = db.session.scalars(
+                    delete(Match)
+                    .where(Match.id.in_(match_ids), *conditions)
+                    .returning(Match.id)
+                ).all()
+                rows = db.session.scalar(select(func.total_changes())) - changes
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                raise Exception(f"Failed to purge matches: {str(e)}")
+
+            for match_id in deleted_ids:
+                LeaderboardService.match_deleted(match_id)
+            yield {"matches": len(deleted_ids), "rows": rows}
+            if remaining is not None:
+                remaining -= len(match_ids)
@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Optional
 from app.models import Player
+from app.scorecard import get_result, set_result
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -31,7 +32,7 @@ class PlayerService:
     @staticmethod
     def update_scorecard(
         player_id: int, hole: int, result: str, commit: bool = True
-    ) -> None:
+    ) -> Optional[str]:
         """Update a player's scorecard.
 
         Args:
@@ -39,6 +40,9 @@ class PlayerService:
             hole: The hole number (1-18)
             result: The result (W/L/D)
             commit: Whether to commit the transaction (default: True)
+
+        Returns:
+            The result previously recorded for the hole, or None
         """
         if hole < 1 or hole > 18:
             raise ValueError("Hole number must be between 1 and 18")
@@ -51,12 +55,12 @@ class PlayerService:
             if not player:
                 raise ValueError("Player not found")
 
-            scorecard = player.scorecard.copy()
-            scorecard[hole - 1] = result
-            player.scorecard = scorecard
+            previous = get_result(player.scorecard_bits, hole)
+            player.scorecard_bits = set_result(player.scorecard_bits, hole, result)
 
             if commit:
                 db.session.commit()
+            return previous
         except SQLAlchemyError as e:
             db.session.rollback()
             raise Exception(f"Failed to update scorecard: {str(e)}")
@@ -77,7 +81,7 @@ class PlayerService:
     @staticmethod
     def get_all_players(match_id: int) -> List[Player]:
         """Get all players for a match."""
-        return Player.query.filter_by(match_id=match_id).all()
+        return Player.query.filter_by(match_id=match_id).order_by(Player.id).all()
 
     @staticmethod
     def delete_player(player_id: int, commit: bool = True) -> None:
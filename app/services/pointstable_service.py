@@ -1,11 +1,23 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from app.models import PointsTable, Player
 from app.services.player_service import PlayerService
+from app.scorecard import tally_scorecard
 from app import db
+from app.database import read_only
 from sqlalchemy.exc import SQLAlchemyError
 
 
 class PointstableService:
+    # Points table column and points awarded for each scorecard result
+    RESULT_COLUMNS = {"W": ("wins", 3), "D": ("draws", 1), "L": ("losses", 0)}
+
+    @staticmethod
+    def _tally_scorecard(scorecard_bits: int) -> Dict:
+        """Count an encoded scorecard's results into points table values."""
+        tally = tally_scorecard(scorecard_bits)
+        tally["points"] = tally["wins"] * 3 + tally["draws"]
+        return tally
+
     @staticmethod
     def create_pointsrow(
         match_id: int, player_id: int, commit: bool = True
@@ -63,26 +75,33 @@ class PointstableService:
         return PointsTable.query.filter_by(match_id=match_id).all()
 
     @staticmethod
+    @read_only
     def get_formatted_pointstable(match_id: int) -> List[Dict]:
-        """Get a formatted points table for display."""
+        """Get a formatted points table for display.
+
+        Player names are joined in and rows are sorted by points, then wins,
+        in a single query.
+        """
         try:
-            pointstable = PointsTable.query.filter_by(match_id=match_id).all()
-            formatted_table = []
-            for row in pointstable:
-                player = PlayerService.get_player(row.player_id)
-                formatted_row = {
-                    "player_name": player.name,
-                    "thru": row.thru,
-                    "wins": row.wins,
-                    "draws": row.draws,
-                    "losses": row.losses,
-                    "points": row.points,
-                }
-                formatted_table.append(formatted_row)
-
-            # Sort final_results by points in descending order, then by wins
-            formatted_table.sort(key=lambda x: (x["points"], x["wins"]), reverse=True)
-            return formatted_table
+            rows = (
+                db.session.query(
+                    Player.name.label("player_name"),
+                    PointsTable.thru,
+                    PointsTable.wins,
+                    PointsTable.draws,
+                    PointsTable.losses,
+                    PointsTable.points,
+                )
+                .join(Player, Player.id == PointsTable.player_id)
+                .filter(PointsTable.match_id == match_id)
+                .order_by(
+                    PointsTable.points.desc(),
+                    PointsTable.wins.desc(),
+                    PointsTable.player_id,
+                )
+                .all()
+            )
+            return [row._asdict() for row in rows]
         except SQLAlchemyError as e:
             raise Exception(f"Failed to get formatted points table: {str(e)}")
 
@@ -105,15 +124,9 @@ class PointstableService:
             if not pointsrow:
                 raise ValueError("Points table row not found")
 
-            scorecard = player.scorecard
-            if not all(score in [None, "W", "L", "D"] for score in scorecard):
-                raise ValueError("Invalid scorecard entry")
-
-            pointsrow.thru = len([score for score in scorecard if score is not None])
-            pointsrow.wins = scorecard.count("W")
-            pointsrow.draws = scorecard.count("D")
-            pointsrow.losses = scorecard.count("L")
-            pointsrow.points = pointsrow.wins * 3 + pointsrow.draws
+            tally = PointstableService._tally_scorecard(player.scorecard_bits)
+            for column, value in tally.items():
+                setattr(pointsrow, column, value)
 
             if commit:
                 db.session.commit()
@@ -149,6 +162,66 @@ class PointstableService:
         except ValueError as e:
             raise e
 
+    @staticmethod
+    def apply_result_changes(
+        match_id: int,
+        changes: List[Tuple[int, Optional[str], Optional[str]]],
+        commit: bool = True,
+    ) -> None:
+        """Apply scorecard changes to the affected points table rows.
+
+        Only the difference between each old and new result is applied, so
+        re-scoring a hole moves a player's totals instead of adding to them.
+
+        Args:
+            match_id: The ID of the match
+            changes: List of (player_id, old_result, new_result) tuples
+            commit: Whether to commit the transaction (default: True)
+        """
+        try:
+            for player_id, old_result, new_result in changes:
+                if old_result == new_result:
+                    continue
+
+                pointsrow = db.session.get(PointsTable, (match_id, player_id))
+                if not pointsrow:
+                    raise ValueError("Points table row not found")
+
+                for result, step in ((old_result, -1), (new_result, 1)):
+                    if result is None:
+                        continue
+                    column, points = PointstableService.RESULT_COLUMNS[result]
+                    setattr(pointsrow, column, getattr(pointsrow, column) + step)
+                    pointsrow.points += step * points
+                    pointsrow.thru += step
+
+            if commit:
+                db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to apply points table changes: {str(e)}")
+        except ValueError as e:
+            raise e
+
+    @staticmethod
+    def verify_pointstable(match_id: int) -> List[int]:
+        """Check the stored points table against the players' scorecards.
+
+        Returns:
+            IDs of players whose points table row does not match their
+            scorecard. Use update_pointstable_for_all to repair them.
+        """
+        players = Player.query.filter_by(match_id=match_id).all()
+        mismatched = []
+        for player in players:
+            pointsrow = db.session.get(PointsTable, (match_id, player.id))
+            tally = PointstableService._tally_scorecard(player.scorecard_bits)
+            if pointsrow is None or any(
+                getattr(pointsrow, column) != value for column, value in tally.items()
+            ):
+                mismatched.append(player.id)
+        return mismatched
+
     @staticmethod
     def delete_pointstable(pointstable_id: int) -> None:
         """Delete a points table row."""
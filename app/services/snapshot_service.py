@@ -0,0 +1,102 @@
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional
+from flask import render_template
+from app.models import db, Match, MatchSnapshot
+from app.services.leaderboard_service import LeaderboardService
+from sqlalchemy import delete
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class SnapshotService:
+    # Snapshot page name -> template
+    PAGES = {"overview": "match_overview.html", "summary": "round_summary.html"}
+
+    @staticmethod
+    def render_pages(match: Match, leaderboard: Dict) -> Dict:
+        """Render a completed match's pages for a snapshot.
+
+        Pages are rendered with snapshot=True, which leaves out the
+        per-session parts of the layout such as flashed messages.
+
+        Returns:
+            Dict of page name -> (gzipped HTML, ETag)
+        """
+        context = {
+            "match": match,
+            "pointstable": leaderboard["pointstable"],
+            "scorecards": leaderboard["scorecards"],
+            "final_results": leaderboard["pointstable"],
+            "snapshot": True,
+        }
+        pages = {}
+        for page, template in SnapshotService.PAGES.items():
+            html = render_template(template, **context).encode()
+            pages[page] = (
+                gzip.compress(html, mtime=0),
+                hashlib.sha256(html).hexdigest()[:32],
+            )
+        return pages
+
+    @staticmethod
+    def create_snapshot(
+        match: Match, leaderboard: Optional[Dict] = None, commit: bool = True
+    ) -> MatchSnapshot:
+        """Freeze a completed match's standings and pages.
+
+        Args:
+            match: The completed match
+            leaderboard: The match's leaderboard (default: built fresh)
+            commit: Whether to commit the transaction (default: True)
+        """
+        if not match.completed:
+            raise ValueError("Only completed matches can be snapshotted")
+        if leaderboard is None:
+            leaderboard = LeaderboardService.build_leaderboard(match.id)
+
+        try:
+            pages = SnapshotService.render_pages(match, leaderboard)
+            snapshot = db.session.merge(
+                MatchSnapshot(
+                    match_id=match.id,
+                    data=json.dumps(leaderboard, separators=(",", ":")),
+                    overview_html=pages["overview"][0],
+                    overview_etag=pages["overview"][1],
+                    summary_html=pages["summary"][0],
+                    summary_etag=pages["summary"][1],
+                )
+            )
+
+            if commit:
+                db.session.commit()
+            return snapshot
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise Exception(f"Failed to create match snapshot: {str(e)}")
+
+    @staticmethod
+    def get_snapshot(match: Match) -> Optional[MatchSnapshot]:
+        """Get a completed match's snapshot, creating it if it is missing.
+
+        Returns:
+            The snapshot, or None if the match is not completed
+        """
+        if not match.completed:
+            return None
+        snapshot = db.session.get(MatchSnapshot, match.id)
+        if snapshot is None:
+            snapshot = SnapshotService.create_snapshot(match)
+        return snapshot
+
+    @staticmethod
+    def get_page(snapshot: MatchSnapshot, page: str):
+        """Get a snapshot page's gzipped HTML and ETag."""
+        return getattr(snapshot, f"{page}_html"), getattr(snapshot, f"{page}_etag")
+
+    @staticmethod
+    def delete_snapshot(match_id: int) -> None:
+        """Drop a match's snapshot without committing, e.g. when results change."""
+        db.session.execute(
+            delete(MatchSnapshot).where(MatchSnapshot.match_id == match_id)
+        )
@@ -0,0 +1,71 @@
+from typing import Optional
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.cache import user_cache
+from app.models import db, User
+
+# Session.info key of the IDs of users changed in the current transaction
+CHANGED_USERS = "changed_users"
+
+
+class UserIdentity(UserMixin):
+    """The fields of a User that requests need, detached from any session."""
+
+    __slots__ = ("id", "username")
+
+    def __init__(self, id: int, username: str):
+        self.id = id
+        self.username = username
+
+    def __repr__(self):
+        return f"<UserIdentity {self.username}>"
+
+
+class UserService:
+    @staticmethod
+    def load_user(user_id: int) -> Optional[UserIdentity]:
+        """Get the identity of a logged-in user, reading through the cache.
+
+        Each worker keeps its own bounded cache, so a change made through
+        another worker is seen there once the entry's TTL runs out.
+
+        Returns:
+            The user's identity, or None if no such user exists
+        """
+        return user_cache.get_or_load(user_id, lambda: UserService._load(user_id))
+
+    @staticmethod
+    def _load(user_id: int) -> Optional[UserIdentity]:
+        row = db.session.execute(
+            db.select(User.id, User.username).where(User.id == user_id)
+        ).first()
+        return UserIdentity(row.id, row.username) if row else None
+
+    @staticmethod
+    def invalidate(user_id: int) -> None:
+        """Drop a user's cached identity, e.g. on logout or after a change."""
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    # These run at flush, so only note the user; another request could
+    # otherwise cache the old row again before the commit
+    session = object_session(target)
+    # IDs of deleted users can be reused, so inserts invalidate too
+    session.info.setdefault(CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop(CHANGED_USERS, ()):
+        UserService.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_users(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(CHANGED_USERS, None)
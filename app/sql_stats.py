@@ -0,0 +1,126 @@
+"""Per-request SQL statement counting and slow-query logging.
+
+Engine events count the statements each request issues and the time spent
+in the database. In debug mode the totals are returned as X-DB-* response
+headers; otherwise they are written to a rotating log file. Statements
+slower than SQL_SLOW_QUERY_MS are logged with their EXPLAIN QUERY PLAN.
+"""
+
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger("app.sql")
+
+
+def explain_query_plan(cursor, statement, parameters):
+    """Get SQLite's query plan for a statement as a list of detail lines."""
+    try:
+        rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+    except Exception as e:
+        return [f"unavailable: {e}"]
+
+
+def _new_stats():
+    return {"count": 0, "seconds": 0.0, "slow": []}
+
+
+def _listen(app, engine):
+    """Time the statements an engine executes within requests."""
+    explain = engine.dialect.name == "sqlite"
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        # Kept on the statement's own context, which a failed statement
+        # simply drops, rather than on the pooled connection
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        started = getattr(context, "_query_start", None)
+        if started is None or not has_request_context():
+            return
+        elapsed = time.perf_counter() - started
+
+        stats = g.setdefault("sql_stats", _new_stats())
+        stats["count"] += 1
+        stats["seconds"] += elapsed
+        if elapsed * 1000 < app.config["SQL_SLOW_QUERY_MS"]:
+            return
+
+        plan = []
+        if explain and not many and statement.lstrip().upper().startswith("SELECT"):
+            plan = explain_query_plan(cursor, statement, parameters)
+        stats["slow"].append(
+            {"statement": statement, "ms": elapsed * 1000, "plan": plan}
+        )
+        logger.warning(
+            "slow query %.1f ms on %s %s: %s | plan: %s",
+            elapsed * 1000,
+            request.method,
+            request.path,
+            " ".join(statement.split()),
+            "; ".join(plan),
+        )
+
+
+def init_sql_stats(app, *engines):
+    """Attach statement timing to engines and reporting to an app."""
+    for engine in engines:
+        _listen(app, engine)
+
+    @app.before_request
+    def reset_sql_stats():
+        g.sql_stats = _new_stats()
+
+    @app.after_request
+    def report_sql_stats(response):
+        stats = g.get("sql_stats")
+        if stats is None:
+            return response
+
+        if app.config["SQL_STATS_HEADERS"]:
+            response.headers["X-DB-Query-Count"] = str(stats["count"])
+            response.headers["X-DB-Time-Ms"] = f"{stats['seconds'] * 1000:.2f}"
+            response.headers["X-DB-Slow-Queries"] = str(len(stats["slow"]))
+        logger.info(
+            "%s %s %s queries=%d db_ms=%.2f slow=%d",
+            request.method,
+            request.path,
+            response.status_code,
+            stats["count"],
+            stats["seconds"] * 1000,
+            len(stats["slow"]),
+        )
+        return response
+
+    if app.config["SQL_STATS_HEADERS"] is None:
+        app.config["SQL_STATS_HEADERS"] = app.debug
+
+    if not app.debug and not app.testing:
+        _add_log_handler(app)
+
+
+def _add_log_handler(app):
+    """Write SQL stats to a rotating log file in production."""
+    path = app.config["SQL_LOG_FILE"] or os.path.join(
+        app.instance_path, "logs", "sql.log"
+    )
+    path = os.path.abspath(path)
+    logger.setLevel(logging.INFO)
+    if any(getattr(h, "baseFilename", None) == path for h in logger.handlers):
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=app.config["SQL_LOG_MAX_BYTES"],
+        backupCount=app.config["SQL_LOG_BACKUP_COUNT"],
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
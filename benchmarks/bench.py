@@ -0,0 +1,454 @@
+"""Service and route benchmarks.
+
+Seeds a SQLite database with a realistic data volume, times the key
+service operations and routes, and writes the timings as JSON. A stored
+result can be used as a baseline to flag regressions:
+
+    python benchmarks/bench.py --output baseline.json
+    python benchmarks/bench.py --compare baseline.json
+
+Seeding the default 10k users / 1M matches takes a few minutes; use
+--users and --matches for a quicker run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_login import login_user  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User  # noqa: E402
+from app.scorecard import set_result, tally_scorecard  # noqa: E402
+from app.services.hole_service import HoleService  # noqa: E402
+from app.services.match_service import MatchService  # noqa: E402
+from app.services.pointstable_service import PointstableService  # noqa: E402
+
+CHUNK_SIZE = 50_000
+PLAYER_NAMES = ["Alice", "Bob", "Carol", "Dave"]
+BULK_DELETE_SIZE = 10
+
+# name -> function(context) run once per timed iteration
+SERVICE_BENCHMARKS = {}
+ROUTE_BENCHMARKS = {}
+
+
+def service_benchmark(name):
+    """Register a benchmark run inside a request context as the bench user."""
+
+    def register(func):
+        SERVICE_BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def route_benchmark(name):
+    """Register a benchmark run through a logged-in Flask test client."""
+
+    def register(func):
+        ROUTE_BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+# Seeding
+
+
+def seed(path, users, matches, played_fraction, rng):
+    """Write users, matches, players, points rows and played holes.
+
+    Rows are written with plain sqlite3 executemany in chunks, bypassing
+    the ORM, so seeding a million matches stays practical.
+    """
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = OFF")
+    password_hash = generate_password_hash("bench")
+
+    connection.executemany(
+        "INSERT INTO user (id, username, email, password_hash) VALUES (?, ?, ?, ?)",
+        (
+            (i, f"user{i}", f"user{i}@example.com", password_hash)
+            for i in range(1, users + 1)
+        ),
+    )
+
+    start = datetime(2024, 1, 1)
+    for first in range(1, matches + 1, CHUNK_SIZE):
+        last = min(first + CHUNK_SIZE, matches + 1)
+        match_rows, player_rows, points_rows = [], [], []
+        hole_rows, holematch_rows = [], []
+        for match_id in range(first, last):
+            played = rng.random() < played_fraction
+            created_at = start + timedelta(seconds=match_id * 30)
+            match_rows.append(
+                (
+                    match_id,
+                    (match_id - 1) % users + 1,
+                    played,
+                    created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    (1 << 18) - 1 if played else 0,
+                )
+            )
+            player_ids = [match_id * 4 + i for i in range(4)]
+            scorecards = [0] * 4
+            if played:
+                for num in range(1, 19):
+                    hole_id = match_id * 18 + num
+                    hole_rows.append((hole_id, num, match_id))
+                    for a, b in HoleService.get_matchups(num):
+                        outcome = rng.choice(("W", "L", "D"))
+                        other = {"W": "L", "L": "W", "D": "D"}[outcome]
+                        scorecards[a] = set_result(scorecards[a], num, outcome)
+                        scorecards[b] = set_result(scorecards[b], num, other)
+                        winner = {
+                            "W": player_ids[a],
+                            "L": player_ids[b],
+                            "D": -1,
+                        }[outcome]
+                        holematch_rows.append(
+                            (hole_id, match_id, player_ids[a], player_ids[b], winner)
+                        )
+            for player_id, name, scorecard in zip(player_ids, PLAYER_NAMES, scorecards):
+                player_rows.append((player_id, name, match_id, scorecard))
+                tally = tally_scorecard(scorecard)
+                points_rows.append(
+                    (
+                        match_id,
+                        player_id,
+                        tally["thru"],
+                        tally["wins"],
+                        tally["draws"],
+                        tally["losses"],
+                        tally["wins"] * 3 + tally["draws"],
+                    )
+                )
+
+        connection.executemany(
+            'INSERT INTO "match" (id, user_id, completed, created_at, completed_holes) '
+            "VALUES (?, ?, ?, ?, ?)",
+            match_rows,
+        )
+        connection.executemany(
+            "INSERT INTO player (id, name, match_id, scorecard) VALUES (?, ?, ?, ?)",
+            player_rows,
+        )
+        connection.executemany(
+            "INSERT INTO points_table "
+            "(match_id, player_id, thru, wins, draws, losses, points) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            points_rows,
+        )
+        connection.executemany(
+            "INSERT INTO hole (id, num, match_id) VALUES (?, ?, ?)", hole_rows
+        )
+        connection.executemany(
+            "INSERT INTO hole_match "
+            "(hole_id, match_id, player1_id, player2_id, winner_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            holematch_rows,
+        )
+        connection.commit()
+
+    connection.execute("ANALYZE")
+    connection.commit()
+    connection.close()
+
+
+# Service benchmarks
+
+
+def fresh_match(context):
+    """Create an unplayed match for the bench user."""
+    return MatchService.create_match(PLAYER_NAMES, bulk=True).id
+
+
+@service_benchmark("match_service.create_match")
+def bench_create_match(context):
+    MatchService.create_match(PLAYER_NAMES)
+
+
+@service_benchmark("match_service.create_match_bulk")
+def bench_create_match_bulk(context):
+    MatchService.create_match(PLAYER_NAMES, bulk=True)
+
+
+@service_benchmark("hole_service.handle_hole_outcome")
+def bench_handle_hole_outcome(context):
+    match_id = context["scoring_match_id"]
+    num = context["rng"].randint(1, 18)
+    HoleService.handle_hole_outcome(match_id, num, [-1, None])
+
+
+@service_benchmark("hole_service.score_hole")
+def bench_score_hole(context):
+    match_id = context["scoring_match_id"]
+    num = context["rng"].randint(1, 18)
+    HoleService.score_hole(match_id, num, [-1, None])
+
+
+@service_benchmark("pointstable_service.get_formatted_pointstable")
+def bench_get_formatted_pointstable(context):
+    PointstableService.get_formatted_pointstable(
+        context["rng"].choice(context["seeded_match_ids"])
+    )
+
+
+@service_benchmark("hole_service.get_first_incomplete_hole")
+def bench_get_first_incomplete_hole(context):
+    HoleService.get_first_incomplete_hole(
+        context["rng"].choice(context["seeded_match_ids"])
+    )
+
+
+@service_benchmark("hole_service.get_first_incomplete_hole_num")
+def bench_get_first_incomplete_hole_num(context):
+    HoleService.get_first_incomplete_hole_num(
+        context["rng"].choice(context["seeded_match_ids"])
+    )
+
+
+@service_benchmark("match_service.delete_match")
+def bench_delete_match(context):
+    MatchService.delete_match(context["deletable_match_ids"].pop())
+
+
+@service_benchmark("match_service.delete_match_per_table")
+def bench_delete_match_per_table(context):
+    # The previous delete_match: one statement per table instead of cascades
+    match_id = context["deletable_match_ids"].pop()
+    for table in ("hole_match", "hole", "points_table", "player", '"match"'):
+        column = "id" if table == '"match"' else "match_id"
+        db.session.execute(
+            db.text(f"DELETE FROM {table} WHERE {column} = :id"), {"id": match_id}
+        )
+    db.session.commit()
+
+
+@service_benchmark("match_service.delete_matches")
+def bench_delete_matches(context):
+    ids = context["deletable_match_ids"]
+    MatchService.delete_matches([ids.pop() for _ in range(BULK_DELETE_SIZE)])
+
+
+# Route benchmarks
+
+
+@route_benchmark("route.match_overview")
+def bench_match_overview(context):
+    match_id = context["rng"].choice(context["seeded_match_ids"])
+    response = context["client"].get(f"/matches/{match_id}")
+    assert response.status_code == 200
+
+
+@route_benchmark("route.process_hole")
+def bench_process_hole(context):
+    match_id = context["scoring_match_id"]
+    num = context["rng"].randint(1, 18)
+    response = context["client"].post(
+        f"/matches/{match_id}/hole/{num}/process",
+        data={"winner1": "draw", "winner2": "draw"},
+    )
+    assert response.status_code == 200
+
+
+# Runner
+
+
+def summarize(timings):
+    """Summarize a list of durations in seconds as milliseconds."""
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+def time_benchmark(func, context, repeat, warmup):
+    """Time func(context) repeat times after warmup untimed runs."""
+    for _ in range(warmup):
+        func(context)
+    timings = []
+    for _ in range(repeat):
+        db.session.expire_all()
+        started = time.perf_counter()
+        func(context)
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def run(args):
+    """Seed a database, run the selected benchmarks and return the results.
+
+    The database, SQL log and metrics go to a temporary directory that is
+    removed afterwards.
+    """
+    with tempfile.TemporaryDirectory(prefix="rrg-bench-") as workdir:
+        return _run_in(args, workdir)
+
+
+def _run_in(args, workdir):
+    rng = random.Random(args.seed)
+    path = os.path.join(workdir, "bench.db")
+    app = create_app(
+        config={
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "WTF_CSRF_ENABLED": False,
+            "SQL_LOG_FILE": os.path.join(workdir, "sql.log"),
+            "METRICS_DIR": os.path.join(workdir, "metrics"),
+        }
+    )
+
+    started = time.perf_counter()
+    seed(path, args.users, args.matches, args.played_fraction, rng)
+    seed_seconds = time.perf_counter() - started
+
+    selected = set(args.only or [])
+    results = {}
+    with app.app_context():
+        user = db.session.get(User, 1)
+        user_id = user.id
+        seeded_match_ids = [
+            match_id
+            for (match_id,) in db.session.execute(
+                db.text('SELECT id FROM "match" WHERE user_id = :id'), {"id": user_id}
+            )
+        ]
+
+    # Every iteration either reads or consumes a match, so prepare enough
+    runs = args.repeat + args.warmup
+    with app.test_request_context():
+        login_user(user)
+        context = {
+            "rng": rng,
+            "seeded_match_ids": seeded_match_ids,
+            "scoring_match_id": fresh_match(None),
+            "deletable_match_ids": [
+                fresh_match(None) for _ in range(runs * (2 + BULK_DELETE_SIZE))
+            ],
+        }
+        for name, func in SERVICE_BENCHMARKS.items():
+            if selected and name not in selected:
+                continue
+            print(f"running {name}", file=sys.stderr)
+            results[name] = time_benchmark(func, context, args.repeat, args.warmup)
+            db.session.remove()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    context["client"] = client
+    for name, func in ROUTE_BENCHMARKS.items():
+        if selected and name not in selected:
+            continue
+        print(f"running {name}", file=sys.stderr)
+        with app.app_context():
+            results[name] = time_benchmark(func, context, args.repeat, args.warmup)
+    with app.app_context():
+        db.engine.dispose()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "users": args.users,
+            "matches": args.matches,
+            "played_fraction": args.played_fraction,
+            "repeat": args.repeat,
+            "seed_seconds": seed_seconds,
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Compare median timings against a baseline.
+
+    Returns:
+        List of (name, baseline ms, current ms, ratio) for every benchmark
+        whose median is more than threshold slower than the baseline
+    """
+    regressions = []
+    for name, current in sorted(results["results"].items()):
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:50} {current['median_ms']:10.3f} ms  (new)")
+            continue
+        ratio = current["median_ms"] / previous["median_ms"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(
+            f"{name:50} {previous['median_ms']:10.3f} -> "
+            f"{current['median_ms']:10.3f} ms  x{ratio:.2f} {flag}"
+        )
+        if flag:
+            regressions.append(
+                (name, previous["median_ms"], current["median_ms"], ratio)
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument(
+        "--played-fraction",
+        type=float,
+        default=0.05,
+        help="fraction of seeded matches with all 18 holes played",
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--only", action="append", help="run only the named benchmark(s)"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed median slowdown before flagging a regression (0.2 = 20%%)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
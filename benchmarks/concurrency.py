@@ -0,0 +1,199 @@
+"""Concurrent read/write benchmark of the SQLite connection setups.
+
+For each setup, seeds a database, then runs reader threads viewing
+in-progress matches alongside writer threads scoring holes on them, and
+reports throughput, latency percentiles and failed requests:
+
+    python benchmarks/concurrency.py --readers 8 --writers 2 --duration 10
+
+With the default profile's rollback journal every commit blocks the
+readers; with the tuned profile's write-ahead log they carry on, and
+with read routing they also stop competing with writers for connections.
+Group commit pays off with many writers (try --writers 16).
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import PLAYER_NAMES, seed  # noqa: E402
+from flask_login import login_user  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.group_commit import group_writer  # noqa: E402
+from app.models import User  # noqa: E402
+from app.services.match_service import MatchService  # noqa: E402
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+def summarize(latencies, errors, seconds):
+    return {
+        "requests": len(latencies),
+        "per_second": len(latencies) / seconds,
+        "median_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies) * 1000 if latencies else None,
+        "errors": errors,
+    }
+
+
+def worker(app, request_fn, deadline, seed_value, latencies, errors):
+    """Issue requests until the deadline, recording latencies and failures."""
+    rng = random.Random(seed_value)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = "1"
+        session["_fresh"] = True
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            ok = request_fn(client, rng).status_code < 500
+        except Exception:
+            ok = False
+        latencies.append(time.perf_counter() - started)
+        if not ok:
+            errors.append(1)
+
+
+# name -> config overrides
+SETUPS = {
+    "default": {"SQLITE_PROFILE": "default"},
+    "tuned": {"SQLITE_PROFILE": "tuned", "DB_READ_ROUTING": False},
+    "tuned-routed": {"SQLITE_PROFILE": "tuned", "DB_READ_ROUTING": True},
+    "tuned-group": {"SQLITE_PROFILE": "tuned", "GROUP_COMMIT": True},
+}
+
+
+def run_setup(setup, args):
+    """Seed a fresh database and run the mixed workload on one setup.
+
+    Everything the run writes goes to a temporary directory that is
+    removed afterwards.
+    """
+    with tempfile.TemporaryDirectory(prefix="rrg-concurrency-") as workdir:
+        return _run_setup_in(setup, args, workdir)
+
+
+def _run_setup_in(setup, args, workdir):
+    path = os.path.join(workdir, "bench.db")
+    app = create_app(
+        config={
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "WTF_CSRF_ENABLED": False,
+            "SQL_LOG_FILE": os.path.join(workdir, "sql.log"),
+            "METRICS_DIR": os.path.join(workdir, "metrics"),
+            "DB_POOL_SIZE": args.readers + args.writers,
+            **SETUPS[setup],
+        }
+    )
+    # The journal mode can only change while no other connection is open
+    with app.app_context():
+        db.engine.dispose()
+    seed(path, args.users, args.matches, 0.5, random.Random(args.seed))
+
+    with app.test_request_context():
+        login_user(db.session.get(User, 1))
+        match_ids = [
+            MatchService.create_match(PLAYER_NAMES, bulk=True).id
+            for _ in range(args.live_matches)
+        ]
+        db.engine.dispose()
+
+    def read(client, rng):
+        return client.get(f"/matches/{rng.choice(match_ids)}")
+
+    def write(client, rng):
+        return client.post(
+            f"/matches/{rng.choice(match_ids)}/hole/{rng.randint(1, 18)}/process",
+            data={"winner1": "draw", "winner2": "draw"},
+        )
+
+    reads, read_errors, writes, write_errors = [], [], [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(
+            target=worker, args=(app, read, deadline, i, reads, read_errors)
+        )
+        for i in range(args.readers)
+    ] + [
+        threading.Thread(
+            target=worker, args=(app, write, deadline, -i - 1, writes, write_errors)
+        )
+        for i in range(args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    group_writer.stop()
+    with app.app_context():
+        db.engine.dispose()
+
+    return {
+        "reads": summarize(reads, len(read_errors), args.duration),
+        "writes": summarize(writes, len(write_errors), args.duration),
+        "group_commit": group_writer.stats(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--matches", type=int, default=20_000)
+    parser.add_argument("--live-matches", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--setup",
+        action="append",
+        choices=list(SETUPS),
+        help="setup(s) to run (default: all)",
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    for setup in args.setup or SETUPS:
+        print(f"running {setup}", file=sys.stderr)
+        results[setup] = run_setup(setup, args)
+
+    for setup, result in results.items():
+        for kind in ("reads", "writes"):
+            r = result[kind]
+            print(
+                f"{setup:12} {kind:6} {r['per_second']:8.1f}/s "
+                f"median {r['median_ms'] or 0:7.2f} ms  p95 {r['p95_ms'] or 0:7.2f} ms  "
+                f"p99 {r['p99_ms'] or 0:7.2f} ms  errors {r['errors']}"
+            )
+        batches = result["group_commit"]["batches"]
+        if batches:
+            operations = result["group_commit"]["operations"]
+            print(f"{setup:12} {operations / batches:.1f} writes per commit")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
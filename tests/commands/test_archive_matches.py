@@ -0,0 +1,33 @@
+"""Tests for the archive-matches and unarchive-match commands."""
+
+from sqlalchemy import text
+from app.models import Match
+from app.services.match_service import MatchService
+
+
+def test_archive_and_unarchive_commands(runner, _db, logged_in_user):
+    """Test archiving old completed matches and restoring one"""
+    matches = MatchService.create_matches([["A", "B", "C", "D"]] * 2)
+    for match in matches:
+        match.completed = True
+    _db.session.commit()
+    match_id = matches[0].id
+    _db.session.execute(
+        text("UPDATE \"match\" SET created_at = '2020-01-01 00:00:00' WHERE id = :id"),
+        {"id": match_id},
+    )
+    _db.session.commit()
+
+    result = runner.invoke(args=["archive-matches", "--batch-size", "10"])
+    assert "archived 1 matches (8 rows)" in result.output
+    assert "total: 1 matches archived, 8 rows removed" in result.output
+    assert _db.session.get(Match, match_id).archived
+
+    result = runner.invoke(args=["unarchive-match", str(match_id)])
+    assert f"match {match_id} restored" in result.output
+    _db.session.expire_all()
+    assert not _db.session.get(Match, match_id).archived
+
+    result = runner.invoke(args=["unarchive-match", str(match_id)])
+    assert result.exit_code != 0
+    assert "is not archived" in result.output
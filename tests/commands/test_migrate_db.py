@@ -0,0 +1,127 @@
+"""Tests for the migrate-db command."""
+
+import json
+from sqlalchemy import delete, text
+from app.models import Match, Player, PointsTable
+from app.services.hole_service import HoleService
+
+
+def test_migrate_json_scorecards(runner, _db, test_player):
+    """Test that JSON list scorecards are re-encoded as integers"""
+    scorecard = ["W", "D", "L"] + [None] * 15
+    _db.session.execute(
+        text("UPDATE player SET scorecard = :scorecard WHERE id = :id"),
+        {"scorecard": json.dumps(scorecard), "id": test_player.id},
+    )
+    _db.session.commit()
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "migrate_scorecards: 1 changed" in result.output
+
+    _db.session.expire_all()
+    player = _db.session.get(Player, test_player.id)
+    assert player.scorecard == scorecard
+
+    # Running again leaves already migrated rows alone
+    result = runner.invoke(args=["migrate-db"])
+    assert "migrate_scorecards: 0 changed" in result.output
+
+
+def test_migrate_creates_missing_indexes(runner, _db):
+    """Test that indexes missing from an existing database are created"""
+    _db.session.execute(text("DROP INDEX ix_hole_match_id_num"))
+    _db.session.commit()
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "create_indexes: 1 changed" in result.output
+
+    indexes = _db.session.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index'")
+    ).scalars()
+    assert "ix_hole_match_id_num" in set(indexes)
+
+
+def test_migrate_adds_match_progress(runner, _db, service_created_match):
+    """Test that completed_holes is added and filled from hole results"""
+    match_id = service_created_match.id
+    HoleService.handle_hole_outcome(match_id, 1, [-1, -1])
+    HoleService.handle_hole_outcome(match_id, 2, [-1, -1])
+    HoleService.handle_hole_outcome(match_id, 4, [-1, None])
+    _db.session.execute(text('ALTER TABLE "match" DROP COLUMN completed_holes'))
+    _db.session.commit()
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "add_match_progress: 1 changed" in result.output
+
+    _db.session.expire_all()
+    assert _db.session.get(Match, match_id).completed_holes == 0b11
+    assert HoleService.get_first_incomplete_hole_num(match_id) == 3
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "add_match_progress: 0 changed" in result.output
+
+
+def test_migrate_adds_match_archive(runner, _db):
+    """Test that the archive column is added to existing databases"""
+    _db.session.execute(text('ALTER TABLE "match" DROP COLUMN archive'))
+    _db.session.commit()
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "add_match_archive: 1 changed" in result.output
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "add_match_archive: 0 changed" in result.output
+
+
+def test_migrate_adds_versions(runner, _db, service_created_match):
+    """Test that the version columns are added to existing databases"""
+    _db.session.execute(text('ALTER TABLE "match" DROP COLUMN version'))
+    _db.session.execute(text("ALTER TABLE player DROP COLUMN version"))
+    _db.session.commit()
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "add_versions: 2 changed" in result.output
+    assert _db.session.execute(text('SELECT version FROM "match"')).scalar() == 1
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "add_versions: 0 changed" in result.output
+
+
+def test_migrate_adds_cascade_deletes(runner, _db, service_created_match):
+    """Test that tables with plain foreign keys are rebuilt with cascades"""
+    match_id = service_created_match.id
+    player_id = service_created_match.players[0].id
+    _db.session.execute(text("PRAGMA foreign_keys = OFF"))
+    _db.session.execute(text("DROP TABLE points_table"))
+    _db.session.execute(
+        text(
+            "CREATE TABLE points_table ("
+            'match_id INTEGER NOT NULL REFERENCES "match" (id), '
+            "player_id INTEGER NOT NULL REFERENCES player (id), "
+            "thru INTEGER, wins INTEGER, draws INTEGER, losses INTEGER, "
+            "points FLOAT, PRIMARY KEY (match_id, player_id))"
+        )
+    )
+    _db.session.execute(
+        text("INSERT INTO points_table VALUES (:match_id, :player_id, 0, 0, 0, 0, 0)"),
+        {"match_id": match_id, "player_id": player_id},
+    )
+    _db.session.commit()
+    _db.session.execute(text("PRAGMA foreign_keys = ON"))
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "add_cascade_deletes: 1 changed" in result.output
+
+    actions = _db.session.execute(text("PRAGMA foreign_key_list(points_table)")).all()
+    assert {row[6] for row in actions} == {"CASCADE"}
+    indexes = _db.session.execute(text("PRAGMA index_list(points_table)")).all()
+    assert "ix_points_table_player_id" in {row[1] for row in indexes}
+    assert PointsTable.query.filter_by(match_id=match_id).count() == 1
+
+    assert _db.session.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    _db.session.execute(delete(Match).where(Match.id == match_id))
+    _db.session.commit()
+    assert PointsTable.query.filter_by(match_id=match_id).count() == 0
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "add_cascade_deletes: 0 changed" in result.output
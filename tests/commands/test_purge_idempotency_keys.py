@@ -0,0 +1,23 @@
+"""Tests for the purge-idempotency-keys command."""
+
+from sqlalchemy import select, text
+from app.models import IdempotencyKey
+from app.services.idempotency_service import IdempotencyService
+
+
+def test_purge_idempotency_keys_command(runner, _db, logged_in_user):
+    """Test that only keys older than the TTL are purged"""
+    for key in ("old", "new"):
+        IdempotencyService.reserve(logged_in_user.id, key, "fingerprint", 60, 5)
+    _db.session.execute(
+        text(
+            "UPDATE idempotency_key SET created_at = '2020-01-01 00:00:00' "
+            "WHERE key = 'old'"
+        )
+    )
+    _db.session.commit()
+
+    result = runner.invoke(args=["purge-idempotency-keys"])
+    assert result.exit_code == 0
+    assert "purged 1 expired idempotency keys" in result.output
+    assert _db.session.scalars(select(IdempotencyKey.key)).all() == ["new"]
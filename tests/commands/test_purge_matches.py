@@ -0,0 +1,76 @@
+"""Tests for the purge-matches command."""
+
+from sqlalchemy import text
+from app.models import Hole, HoleMatch, Match
+from app.services.hole_service import HoleService
+from app.services.match_service import MatchService
+
+
+def _age(_db, match_ids):
+    _db.session.execute(
+        text(
+            "UPDATE \"match\" SET created_at = '2020-01-01 00:00:00' "
+            "WHERE id IN (%s)" % ", ".join(str(i) for i in match_ids)
+        )
+    )
+    _db.session.commit()
+
+
+def test_purge_matches_command(runner, _db, logged_in_user):
+    """Test purging old unplayed matches, then old started ones"""
+    unplayed, started, finished, recent = MatchService.create_matches(
+        [["A", "B", "C", "D"]] * 4
+    )
+    ids = [match.id for match in (unplayed, started, finished, recent)]
+    HoleService.score_hole(ids[1], 1, [-1, -1])
+    finished.completed = True
+    _db.session.commit()
+    _age(_db, ids[:3])
+
+    result = runner.invoke(args=["purge-matches", "--batch-size", "1"])
+    assert result.exit_code == 0
+    # The match row, 4 players and 4 points rows
+    assert "purged 1 matches (9 rows)" in result.output
+    assert "total: 1 matches purged, 9 rows removed" in result.output
+    assert "KiB free in the database file" in result.output
+    assert _db.session.get(Match, ids[0]) is None
+    assert _db.session.get(Match, ids[1]) is not None
+
+    result = runner.invoke(args=["purge-matches", "--include-played"])
+    # Also the hole and its two hole matches
+    assert "total: 1 matches purged, 12 rows removed" in result.output
+    _db.session.expire_all()
+    assert _db.session.get(Match, ids[1]) is None
+    assert _db.session.get(Match, ids[2]) is not None
+    assert _db.session.get(Match, ids[3]) is not None
+
+
+def test_purge_matches_with_empty_hole_rows(runner, _db, logged_in_user):
+    """Test that unplayed matches with a row for every hole are purged"""
+    legacy, started = MatchService.create_matches([["A", "B", "C", "D"]] * 2)
+    for match in (legacy, started):
+        players = sorted(match.players, key=lambda player: player.id)
+        for num in range(1, 19):
+            hole = Hole(num=num, match_id=match.id)
+            _db.session.add(hole)
+            _db.session.flush()
+            for player1, player2 in (players[:2], players[2:]):
+                _db.session.add(
+                    HoleMatch(
+                        hole_id=hole.id,
+                        match_id=match.id,
+                        player1_id=player1.id,
+                        player2_id=player2.id,
+                    )
+                )
+    _db.session.commit()
+    ids = [legacy.id, started.id]
+    HoleService.score_hole(ids[1], 1, [-1, None])
+    _age(_db, ids)
+
+    result = runner.invoke(args=["purge-matches"])
+    assert result.exit_code == 0
+    assert "total: 1 matches purged" in result.output
+    _db.session.expire_all()
+    assert _db.session.get(Match, ids[0]) is None
+    assert _db.session.get(Match, ids[1]) is not None
@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import event
 from app import create_app, db
 from app.models import User, Player, Match, PointsTable, Hole, HoleMatch
 from flask_login import login_user
@@ -8,8 +9,8 @@ from app.services.pointstable_service import PointstableService
 
 
 @pytest.fixture
-def app():
-    app = create_app("testing")
+def app(tmp_path):
+    app = create_app("testing", config={"METRICS_DIR": str(tmp_path / "metrics")})
     return app
 
 
@@ -25,13 +26,26 @@ def runner(app):
 
 @pytest.fixture
 def _db(app):
-    with app.app_context():
+    with app.test_request_context():
         db.create_all()
         yield db
         db.session.remove()
         db.drop_all()
 
 
+@pytest.fixture
+def query_counter(_db):
+    """Record (statement, parameters) for every SQL statement executed"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    event.listen(_db.engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(_db.engine, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture
 def test_user(_db):
     user = User(username="testuser", email="test@example.com")
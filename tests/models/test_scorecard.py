@@ -0,0 +1,70 @@
+"""Tests for the compact scorecard encoding."""
+
+import pytest
+from app.scorecard import (
+    decode_scorecard,
+    encode_scorecard,
+    first_incomplete_hole,
+    get_result,
+    set_result,
+    tally_scorecard,
+)
+
+
+def test_encode_decode_round_trip():
+    """Test that encoding then decoding returns the original scorecard"""
+    scorecard = ["W", "L", "D", None] * 4 + ["D", "W"]
+    bits = encode_scorecard(scorecard)
+    assert isinstance(bits, int)
+    assert bits < 2**36
+    assert decode_scorecard(bits) == scorecard
+
+
+def test_empty_scorecard():
+    """Test that an empty scorecard encodes to zero"""
+    assert encode_scorecard([None] * 18) == 0
+    assert decode_scorecard(0) == [None] * 18
+    assert decode_scorecard(None) == [None] * 18
+
+
+def test_get_and_set_result():
+    """Test reading and replacing a single hole's result"""
+    bits = set_result(0, 18, "W")
+    assert get_result(bits, 18) == "W"
+    assert get_result(bits, 17) is None
+
+    bits = set_result(bits, 18, "L")
+    assert get_result(bits, 18) == "L"
+
+    bits = set_result(bits, 18, None)
+    assert bits == 0
+
+
+def test_invalid_values():
+    """Test that invalid holes and results are rejected"""
+    with pytest.raises(ValueError, match="Hole number must be between 1 and 18"):
+        set_result(0, 19, "W")
+    with pytest.raises(ValueError, match="Invalid scorecard entry"):
+        set_result(0, 1, "X")
+    with pytest.raises(ValueError, match="Scorecard must have 18 entries"):
+        encode_scorecard([None] * 17)
+
+
+def test_tally_scorecard():
+    """Test counting results from an encoded scorecard"""
+    scorecard = ["W", "W", "D", "L", None, "D", "W"] + [None] * 11
+    assert tally_scorecard(encode_scorecard(scorecard)) == {
+        "thru": 6,
+        "wins": 3,
+        "draws": 2,
+        "losses": 1,
+    }
+
+
+def test_first_incomplete_hole():
+    """Test finding the lowest unset hole in a progress mask"""
+    assert first_incomplete_hole(0) == 1
+    assert first_incomplete_hole(0b1) == 2
+    assert first_incomplete_hole(0b1011) == 3
+    assert first_incomplete_hole((1 << 18) - 1) is None
+    assert first_incomplete_hole(((1 << 18) - 1) & ~(1 << 17)) == 18
@@ -0,0 +1,160 @@
+"""Tests for Idempotency-Key handling of the create and scoring endpoints."""
+
+import pytest
+from sqlalchemy import func, select, text
+from app.models import IdempotencyKey, Match
+from app.services.hole_service import HoleService
+from app.services.match_service import MatchService
+
+PLAYERS = {
+    "player1": "Player One",
+    "player2": "Player Two",
+    "player3": "Player Three",
+    "player4": "Player Four",
+}
+
+
+@pytest.fixture
+def csrf_token(client, logged_in_user):
+    html = client.get("/matches/new").data.decode()
+    return html.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+
+
+def test_start_match_retry_is_replayed(client, csrf_token, _db, mocker):
+    """Test that a retried match creation returns the stored response"""
+    create_match = mocker.spy(MatchService, "create_match")
+    data = {**PLAYERS, "csrf_token": csrf_token}
+    headers = {"Idempotency-Key": "start-1"}
+
+    first = client.post("/matches/start", data=data, headers=headers)
+    retry = client.post("/matches/start", data=data, headers=headers)
+
+    assert first.status_code == retry.status_code == 302
+    assert retry.location == first.location
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert create_match.call_count == 1
+    assert _db.session.scalar(select(func.count(Match.id))) == 1
+
+    # Another key is another request
+    client.post("/matches/start", data=data, headers={"Idempotency-Key": "start-2"})
+    assert _db.session.scalar(select(func.count(Match.id))) == 2
+
+
+def test_requests_without_key_are_not_stored(client, csrf_token, _db):
+    """Test that requests without the header run every time"""
+    data = {**PLAYERS, "csrf_token": csrf_token}
+    client.post("/matches/start", data=data)
+    client.post("/matches/start", data=data)
+
+    assert _db.session.scalar(select(func.count(Match.id))) == 2
+    assert _db.session.scalar(select(func.count()).select_from(IdempotencyKey)) == 0
+
+
+def test_process_hole_retry_is_replayed(
+    client, csrf_token, service_created_match, mocker
+):
+    """Test that a retried hole result is not scored again"""
+    score_hole = mocker.spy(HoleService, "score_hole")
+    url = f"/matches/{service_created_match.id}/hole/1/process"
+    data = {"csrf_token": csrf_token, "winner1": "draw", "winner2": "draw"}
+    headers = {"Idempotency-Key": "hole-1"}
+
+    first = client.post(url, data=data, headers=headers)
+    retry = client.post(url, data=data, headers=headers)
+
+    assert first.get_json() == retry.get_json() == {"status": "success"}
+    assert retry.mimetype == "application/json"
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert score_hole.call_count == 1
+
+
+def test_key_reused_for_other_request(client, csrf_token, service_created_match):
+    """Test that a key sent with a different request is rejected"""
+    url = f"/matches/{service_created_match.id}/hole/1/process"
+    headers = {"Idempotency-Key": "hole-1"}
+    client.post(
+        url,
+        data={"csrf_token": csrf_token, "winner1": "draw", "winner2": "draw"},
+        headers=headers,
+    )
+
+    response = client.post(
+        url, data={"csrf_token": csrf_token, "winner1": "draw"}, headers=headers
+    )
+    assert response.status_code == 422
+    assert response.get_json()["status"] == "error"
+
+
+def test_key_in_use(client, csrf_token, service_created_match, _db):
+    """Test that a retry while the first request is still running gets 409"""
+    url = f"/matches/{service_created_match.id}/hole/1/process"
+    data = {"csrf_token": csrf_token, "winner1": "draw", "winner2": "draw"}
+    client.post(url, data=data, headers={"Idempotency-Key": "hole-1"})
+    _db.session.execute(text("UPDATE idempotency_key SET status = NULL"))
+    _db.session.commit()
+
+    response = client.post(url, data=data, headers={"Idempotency-Key": "hole-1"})
+    assert response.status_code == 409
+
+
+def test_abandoned_key_is_taken_over(client, csrf_token, _db, mocker):
+    """Test that a key left running by a dead request is retaken after a while"""
+    create_match = mocker.spy(MatchService, "create_match")
+    data = {**PLAYERS, "csrf_token": csrf_token}
+    headers = {"Idempotency-Key": "start-1"}
+    client.post("/matches/start", data=data, headers=headers)
+    # As if the worker died before storing the response, two minutes ago
+    _db.session.execute(
+        text(
+            "UPDATE idempotency_key SET status = NULL, "
+            "created_at = datetime('now', '-2 minutes')"
+        )
+    )
+    _db.session.commit()
+
+    response = client.post("/matches/start", data=data, headers=headers)
+    assert response.status_code == 302
+    assert "Idempotent-Replayed" not in response.headers
+    assert create_match.call_count == 2
+
+    retry = client.post("/matches/start", data=data, headers=headers)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+
+def test_failed_request_releases_key(client, csrf_token, service_created_match):
+    """Test that errors are not stored, so the retry runs again"""
+    url = f"/matches/{service_created_match.id}/hole/19/process"
+    data = {"csrf_token": csrf_token, "winner1": "draw", "winner2": "draw"}
+    headers = {"Idempotency-Key": "hole-19"}
+
+    assert client.post(url, data=data, headers=headers).status_code == 404
+    response = client.post(url, data=data, headers=headers)
+    assert response.status_code == 404
+    assert "Idempotent-Replayed" not in response.headers
+
+
+def test_expired_key_runs_again(client, csrf_token, _db):
+    """Test that a key past IDEMPOTENCY_KEY_TTL is treated as new"""
+    data = {**PLAYERS, "csrf_token": csrf_token}
+    headers = {"Idempotency-Key": "start-1"}
+    client.post("/matches/start", data=data, headers=headers)
+    _db.session.execute(
+        text("UPDATE idempotency_key SET created_at = '2020-01-01 00:00:00'")
+    )
+    _db.session.commit()
+
+    response = client.post("/matches/start", data=data, headers=headers)
+    assert "Idempotent-Replayed" not in response.headers
+    assert _db.session.scalar(select(func.count(Match.id))) == 2
+
+
+def test_key_too_long(client, csrf_token, _db):
+    """Test that overlong keys are rejected"""
+    response = client.post(
+        "/matches/start",
+        data={**PLAYERS, "csrf_token": csrf_token},
+        headers={"Idempotency-Key": "k" * 256},
+    )
+    assert response.status_code == 400
+    assert _db.session.scalar(select(func.count(Match.id))) == 0
@@ -1,6 +1,17 @@
+import gzip
 import pytest
 from flask import url_for
-from app.models import Match, Player, User
+from app.models import Match, MatchSnapshot, Player, User
+from app.services.archive_service import ArchiveService
+from app.services.match_service import MatchService
+from app.services.hole_service import (
+    ConflictError,
+    HoleService,
+    ScoringTimeoutError,
+)
+from app.services.leaderboard_service import LeaderboardService
+from app.services.player_service import PlayerService
+from app.events import match_events
 
 
 @pytest.fixture
@@ -35,6 +46,51 @@ def test_matches_page(client, logged_in_user):
     assert b"matches" in response.data.lower()
 
 
+def test_matches_page_pagination(app, client, logged_in_user):
+    """Test that the matches page links to older matches"""
+    app.config["MATCHES_PAGE_SIZE"] = 2
+    MatchService.create_matches(
+        [[f"Player {i + j}" for j in range(1, 5)] for i in range(0, 12, 4)]
+    )
+
+    response = client.get("/matches/")
+    assert response.status_code == 200
+    assert b"Player 9" in response.data
+    assert b"Player 5" in response.data
+    assert b"Player 1," not in response.data
+    assert b"Older" in response.data
+
+    next_url = response.data.decode().split('href="/matches/?before=')[1]
+    next_url = "/matches/?before=" + next_url.split('"')[0].replace("&amp;", "&")
+    response = client.get(next_url)
+    assert response.status_code == 200
+    assert b"Player 1," in response.data
+    assert b"Player 9" not in response.data
+    assert b"Older" not in response.data
+    assert b"Newest Matches" in response.data
+
+
+@pytest.mark.parametrize("per_page", ["0", "-1", "-2"])
+def test_matches_page_invalid_page_size(client, logged_in_user, per_page):
+    """Test that a page size below 1 returns 400"""
+    response = client.get(f"/matches/?per_page={per_page}")
+    assert response.status_code == 400
+
+
+def test_matches_page_keeps_page_size(client, logged_in_user):
+    """Test that the link to older matches keeps a custom page size"""
+    MatchService.create_matches([["A", "B", "C", "D"]] * 3)
+
+    response = client.get("/matches/?per_page=1")
+    assert "per_page=1" in response.data.decode().split("Older")[0].split("href=")[-1]
+
+
+def test_matches_page_invalid_cursor(client, logged_in_user):
+    """Test that a malformed cursor returns 400"""
+    response = client.get("/matches/?before=bogus")
+    assert response.status_code == 400
+
+
 def test_new_match_page(client, logged_in_user):
     """Test that the new match page loads correctly"""
     response = client.get("/matches/new")
@@ -91,6 +147,29 @@ def test_delete_match(client, service_created_match, logged_in_user, _db):
     assert _db.session.get(Match, match_id) is None
 
 
+def test_delete_selected_matches(
+    client, logged_in_user, other_user_match, service_created_match, _db
+):
+    """Test deleting several matches at once skips other users' matches"""
+    second = MatchService.create_match(["E", "F", "G", "H"])
+    match_ids = [service_created_match.id, second.id, other_user_match.id]
+
+    html = client.get("/matches/").data.decode()
+    csrf_token = html.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+    response = client.post(
+        "/matches/delete",
+        data={"match_ids": match_ids, "csrf_token": csrf_token},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+    assert b"Deleted 2 matches." in response.data
+
+    _db.session.expire_all()
+    assert _db.session.get(Match, match_ids[0]) is None
+    assert _db.session.get(Match, match_ids[1]) is None
+    assert _db.session.get(Match, match_ids[2]) is not None
+
+
 def test_finish_round_incomplete(client, service_created_match, logged_in_user):
     """Test finishing a round with incomplete holes"""
     response = client.get(
@@ -185,3 +264,290 @@ def test_process_hole_missing_winners(client, service_created_match, logged_in_u
         follow_redirects=True,
     )
     assert response.status_code == 200
+
+
+def test_process_hole_conflict(client, service_created_match, logged_in_user, mocker):
+    """Test that a concurrent change to the same hole returns 409"""
+    match_id = service_created_match.id
+    html = client.get(f"/matches/{match_id}/hole/1").data.decode()
+    csrf_token = html.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+    mocker.patch.object(
+        HoleService, "score_hole", side_effect=ConflictError("Hole 1 was changed")
+    )
+
+    response = client.post(
+        f"/matches/{match_id}/hole/1/process",
+        data={"csrf_token": csrf_token, "winner1": "draw", "winner2": "draw"},
+    )
+    assert response.status_code == 409
+    assert response.get_json() == {"status": "error", "message": "Hole 1 was changed"}
+
+
+def test_process_hole_timeout(client, service_created_match, logged_in_user, mocker):
+    """Test that a write the group commit writer did not finish returns 503"""
+    match_id = service_created_match.id
+    html = client.get(f"/matches/{match_id}/hole/1").data.decode()
+    csrf_token = html.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+    mocker.patch.object(
+        HoleService, "score_hole", side_effect=ScoringTimeoutError("Too slow")
+    )
+
+    response = client.post(
+        f"/matches/{match_id}/hole/1/process",
+        data={"csrf_token": csrf_token, "winner1": "draw", "winner2": "draw"},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json() == {"status": "error", "message": "Too slow"}
+
+
+def test_match_overview_query_count(
+    client, service_created_match, logged_in_user, query_counter
+):
+    """Test that the overview page does not issue a query per player"""
+    match_id = service_created_match.id
+    query_counter.clear()
+
+    response = client.get(f"/matches/{match_id}")
+
+    assert response.status_code == 200
+    # User, match, points table with player names, and the scorecard players
+    assert len(query_counter) == 4
+
+
+def test_process_hole_invalid_number(client, service_created_match, logged_in_user):
+    """Test processing results for a hole outside the round"""
+    match_id = service_created_match.id
+    response = client.get(f"/matches/{match_id}/hole/1")
+    html = response.data.decode()
+    csrf_token = html.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+
+    response = client.post(
+        f"/matches/{match_id}/hole/19/process",
+        data={"winner1": "draw", "winner2": "draw", "csrf_token": csrf_token},
+    )
+    assert response.status_code == 404
+
+
+def test_finish_round_complete(client, service_created_match, logged_in_user, _db):
+    """Test finishing a fully scored round shows the summary"""
+    match_id = service_created_match.id
+    for hole_num in range(1, 19):
+        HoleService.handle_hole_outcome(match_id, hole_num, [-1, -1])
+    # Warm the cache so finishing has something to invalidate
+    client.get(f"/matches/{match_id}")
+
+    response = client.get(f"/matches/finish/{match_id}")
+
+    assert response.status_code == 200
+    assert b"Round Summary" in response.data
+    assert LeaderboardService.cache_stats()["size"] == 0
+    assert _db.session.get(Match, match_id).completed
+
+
+def test_match_stream(client, service_created_match, logged_in_user):
+    """Test that the stream sends the leaderboard, then deltas"""
+    match_id = service_created_match.id
+    response = client.get(f"/matches/{match_id}/stream", buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    chunks = iter(response.response)
+    first = next(chunks)
+    assert first.startswith(b"event: leaderboard\n")
+    assert b"Player 1" in first
+
+    HoleService.handle_hole_outcome(match_id, 1, [-1, -1])
+    assert next(chunks).startswith(b"event: delta\n")
+
+    response.close()
+    assert not match_events.has_subscribers(match_id)
+
+
+def test_match_stream_limit(app, client, service_created_match, logged_in_user):
+    """Test that streams beyond SSE_MAX_STREAMS are turned away"""
+    match_events.configure(app.config["SSE_QUEUE_SIZE"], max_streams=1)
+    match_id = service_created_match.id
+    first = client.get(f"/matches/{match_id}/stream", buffered=False)
+    next(iter(first.response))
+
+    response = client.get(f"/matches/{match_id}/stream")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+    first.close()
+    assert match_events.stream_count() == 0
+    second = client.get(f"/matches/{match_id}/stream", buffered=False)
+    assert second.status_code == 200
+    # Closed without reading, as when the client disconnects straight away
+    second.close()
+    assert match_events.stream_count() == 0
+
+
+def test_match_stream_other_user_404(client, logged_in_user, other_user_match):
+    """Test that another user's match cannot be streamed"""
+    response = client.get(f"/matches/{other_user_match.id}/stream")
+    assert response.status_code == 404
+
+
+def test_process_holes_batch(client, service_created_match, logged_in_user):
+    """Test recording several holes in one JSON request"""
+    match_id = service_created_match.id
+    html = client.get(f"/matches/{match_id}/hole/1").data.decode()
+    csrf_token = html.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+    players = PlayerService.get_all_players(match_id)
+
+    response = client.post(
+        f"/matches/{match_id}/holes/process",
+        json={
+            "results": [
+                {"hole": 1, "winners": [players[0].id, -1]},
+                {"hole": 2, "winners": [-1, None]},
+            ]
+        },
+        headers={"X-CSRFToken": csrf_token},
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["status"] == "success"
+    assert data["pointstable"][0]["player_name"] == players[0].name
+    assert data["pointstable"][0]["points"] == 4
+    assert sum(row["thru"] for row in data["pointstable"]) == 6
+
+
+def test_process_holes_batch_invalid(client, service_created_match, logged_in_user):
+    """Test that a bad batch is rejected with a message"""
+    match_id = service_created_match.id
+    html = client.get(f"/matches/{match_id}/hole/1").data.decode()
+    csrf_token = html.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+
+    response = client.post(
+        f"/matches/{match_id}/holes/process",
+        json={"results": [{"hole": 1, "winners": [-1, -1]}, {"hole": 1}]},
+        headers={"X-CSRFToken": csrf_token},
+    )
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+
+    response = client.post(
+        f"/matches/{match_id}/holes/process",
+        json={
+            "results": [
+                {"hole": 1, "winners": [-1, -1]},
+                {"hole": 1, "winners": [-1, -1]},
+            ]
+        },
+        headers={"X-CSRFToken": csrf_token},
+    )
+    assert response.status_code == 400
+    assert "Duplicate" in response.get_json()["message"]
+
+
+def test_process_holes_other_user_404(client, logged_in_user, other_user_match):
+    """Test that another user's match cannot be scored in a batch"""
+    html = client.get("/matches/new").data.decode()
+    csrf_token = html.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+    response = client.post(
+        f"/matches/{other_user_match.id}/holes/process",
+        json={"results": [{"hole": 1, "winners": [-1, -1]}]},
+        headers={"X-CSRFToken": csrf_token},
+    )
+    assert response.status_code == 404
+
+
+def test_completed_match_served_from_snapshot(
+    client, service_created_match, logged_in_user, query_counter
+):
+    """Test that a finished match is served gzipped with a strong ETag"""
+    match_id = service_created_match.id
+    HoleService.score_holes(match_id, {num: [-1, -1] for num in range(1, 19)})
+    client.get(f"/matches/finish/{match_id}")
+
+    response = client.get(f"/matches/{match_id}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+    assert b"Match Overview" in gzip.decompress(response.data)
+
+    query_counter.clear()
+    response = client.get(
+        f"/matches/{match_id}",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+    # Match and snapshot only, no standings or players
+    assert len(query_counter) == 2
+
+    response = client.get(f"/matches/{match_id}")
+    assert "Content-Encoding" not in response.headers
+    assert b"Match Overview" in response.data
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+def test_snapshot_etag_per_encoding(
+    client, service_created_match, logged_in_user, accept_encoding
+):
+    """Test that each content coding has its own ETag and 304s on it"""
+    match_id = service_created_match.id
+    HoleService.score_holes(match_id, {num: [-1, -1] for num in range(1, 19)})
+    client.get(f"/matches/finish/{match_id}")
+    url = f"/matches/{match_id}"
+    other_encoding = "identity" if accept_encoding == "gzip" else "gzip"
+    etag = client.get(url, headers={"Accept-Encoding": accept_encoding}).headers["ETag"]
+    other_etag = client.get(url, headers={"Accept-Encoding": other_encoding}).headers[
+        "ETag"
+    ]
+    assert etag != other_etag
+
+    response = client.get(
+        url, headers={"Accept-Encoding": accept_encoding, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    # The other coding's validator does not match this representation
+    response = client.get(
+        url, headers={"Accept-Encoding": accept_encoding, "If-None-Match": other_etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+
+
+def test_finish_round_again_serves_summary(
+    client, service_created_match, logged_in_user
+):
+    """Test that revisiting a finished round serves the frozen summary"""
+    match_id = service_created_match.id
+    HoleService.score_holes(match_id, {num: [-1, -1] for num in range(1, 19)})
+    first = client.get(f"/matches/finish/{match_id}")
+    second = client.get(f"/matches/finish/{match_id}")
+
+    assert second.status_code == 200
+    assert b"Round Summary" in second.data
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_archived_match_pages(client, service_created_match, logged_in_user, _db):
+    """Test that archived matches read the same through every page"""
+    match_id = service_created_match.id
+    HoleService.score_holes(match_id, {num: [-1, -1] for num in range(1, 19)})
+    client.get(f"/matches/finish/{match_id}")
+    ArchiveService.archive_matches([match_id])
+    # Rebuild the snapshot from the archive record
+    MatchSnapshot.query.filter_by(match_id=match_id).delete()
+    _db.session.commit()
+
+    response = client.get(f"/matches/{match_id}")
+    assert response.status_code == 200
+    assert b"Player 1" in response.data
+
+    response = client.get(f"/matches/{match_id}/hole/2")
+    assert response.status_code == 200
+    assert b"Player 3" in response.data
+
+    response = client.get("/matches/")
+    assert b"Player 1, Player 2, Player 3, Player 4" in response.data
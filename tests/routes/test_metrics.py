@@ -0,0 +1,103 @@
+import os
+from app.metrics import MmapValues, metrics, read_samples
+
+
+def test_metrics_endpoint(client, service_created_match, logged_in_user):
+    """Test that request latency, counts and cache stats are exported"""
+    client.get(f"/matches/{service_created_match.id}")
+    client.get(f"/matches/{service_created_match.id}")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert (
+        'http_request_duration_seconds_count{endpoint="matches.match_overview"} 2.0'
+        in text
+    )
+    assert (
+        'http_request_duration_seconds_bucket{endpoint="matches.match_overview",'
+        'le="+Inf"} 2.0' in text
+    )
+    assert (
+        'http_requests_total{endpoint="matches.match_overview",method="GET",'
+        'status="200"} 2.0' in text
+    )
+    assert 'http_requests_in_progress{endpoint="main.metrics_endpoint"} 1.0' in text
+    assert "leaderboard_cache_hits_total 1.0" in text
+
+
+def test_metrics_counts_errors(app, client, logged_in_user):
+    """Test that 5xx responses are counted as errors"""
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    client.get("/boom")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_request_errors_total{endpoint="boom"} 1.0' in text
+    assert 'http_requests_total{endpoint="boom",method="GET",status="500"}' in text
+
+
+def test_metrics_summed_across_processes(app, client):
+    """Test that samples written by other workers are included"""
+    client.get("/")
+    other = MmapValues(os.path.join(metrics.directory, "metrics_999999.db"))
+    other.add(
+        '["http_request_duration_seconds", "_count", {"endpoint": "main.home"}]', 3
+    )
+    other.close()
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{endpoint="main.home"} 4.0' in text
+
+
+def test_metrics_skip_gauges_of_exited_processes(app, client, mocker):
+    """Test that a dead worker's in-flight gauge is dropped, not its counters"""
+    mocker.patch("app.metrics._pid_alive", side_effect=lambda pid: pid != 999999)
+    other = MmapValues(os.path.join(metrics.directory, "metrics_999999.db"))
+    other.add('["http_requests_in_progress", "", {"endpoint": "main.home"}]', 1)
+    other.add(
+        '["http_request_duration_seconds", "_count", {"endpoint": "main.home"}]', 3
+    )
+    other.close()
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_in_progress{endpoint="main.home"}' not in text
+    assert 'http_request_duration_seconds_count{endpoint="main.home"} 3.0' in text
+
+
+def test_metrics_reset_gauges_of_reused_pid(app, client):
+    """Test that a process reusing a dead worker's file starts its gauges at 0"""
+    path = os.path.join(metrics.directory, f"metrics_{os.getpid()}.db")
+    metrics.configure(metrics.directory)
+    stale = MmapValues(path)
+    stale.add('["http_requests_in_progress", "", {"endpoint": "main.home"}]', 2)
+    stale.close()
+
+    client.get("/")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_in_progress{endpoint="main.home"} 0.0' in text
+
+
+def test_mmap_values_grow_and_reopen(tmp_path):
+    """Test that values survive the file growing and being reopened"""
+    path = tmp_path / "metrics_1.db"
+    values = MmapValues(str(path), initial_size=64)
+    for i in range(100):
+        values.add(f"key{i}", i)
+    values.add("key5", 1)
+    values.close()
+
+    reopened = MmapValues(str(path), initial_size=64)
+    reopened.add("key5", 1)
+    reopened.close()
+
+    samples = {key: value for key, value, _ in read_samples(path.read_bytes())}
+    assert len(samples) == 100
+    assert samples["key5"] == 7
+    assert samples["key99"] == 99
@@ -0,0 +1,57 @@
+import copy
+import logging
+import pytest
+from sqlalchemy.exc import OperationalError
+from app import db
+
+
+def test_sql_stats_headers(app, client, service_created_match, logged_in_user):
+    """Test that query count and DB time are reported in debug headers"""
+    app.config["SQL_STATS_HEADERS"] = True
+    response = client.get(f"/matches/{service_created_match.id}")
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Query-Count"]) > 0
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+    assert response.headers["X-DB-Slow-Queries"] == "0"
+
+
+def test_sql_stats_headers_off_outside_debug(client, logged_in_user):
+    """Test that the headers are not sent unless enabled"""
+    response = client.get("/matches/")
+    assert "X-DB-Query-Count" not in response.headers
+
+
+def test_sql_stats_counts_per_request(app, client, logged_in_user):
+    """Test that each request's count starts from zero"""
+    app.config["SQL_STATS_HEADERS"] = True
+    first = client.get("/matches/")
+    second = client.get("/matches/")
+    assert first.headers["X-DB-Query-Count"] == second.headers["X-DB-Query-Count"]
+
+
+def test_slow_query_logged_with_plan(
+    app, client, service_created_match, logged_in_user, caplog
+):
+    """Test that slow SELECTs are logged with their query plan"""
+    app.config.update(SQL_STATS_HEADERS=True, SQL_SLOW_QUERY_MS=0)
+    path = f"/matches/{service_created_match.id}"
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        response = client.get(path)
+
+    slow = [
+        r.getMessage()
+        for r in caplog.records
+        if r.getMessage().startswith("slow query") and f"GET {path}:" in r.getMessage()
+    ]
+    assert int(response.headers["X-DB-Slow-Queries"]) == len(slow) > 0
+    assert any("SEARCH points_table" in message for message in slow)
+
+
+def test_failed_statement_leaves_no_state(app):
+    """Test that a statement that fails leaves nothing on its connection"""
+    with app.test_request_context(), db.engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+        info = copy.deepcopy(conn.info)
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql("SELECT * FROM missing_table")
+        assert conn.info == info
@@ -0,0 +1,138 @@
+import json
+import pytest
+from sqlalchemy import text
+from app.models import Hole, HoleMatch, Match, Player, PointsTable
+from app.services.archive_service import ArchiveService
+from app.services.hole_service import HoleService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.match_service import MatchService
+from app.services.player_service import PlayerService
+
+
+@pytest.fixture
+def completed_match(_db, service_created_match):
+    """A completed match with a mix of wins, draws and an unplayed hole"""
+    match_id = service_created_match.id
+    player_ids = [player.id for player in PlayerService.get_all_players(match_id)]
+    results = {
+        num: [player_ids[HoleService.get_matchups(num)[0][num % 2]], -1]
+        for num in range(1, 18)
+    }
+    results[5] = [-1, None]
+    HoleService.score_holes(match_id, results)
+    match = MatchService.get_match(match_id)
+    match.completed = True
+    _db.session.commit()
+    return match
+
+
+def _row_counts(match_id):
+    return [
+        model.query.filter_by(match_id=match_id).count()
+        for model in (Player, Hole, HoleMatch, PointsTable)
+    ]
+
+
+def test_archive_match(_db, completed_match):
+    """Test that a match is compacted into its archive record"""
+    match_id = completed_match.id
+    leaderboard = LeaderboardService.build_leaderboard(match_id)
+
+    result = ArchiveService.archive_matches([match_id])
+
+    assert result == {"matches": 1, "rows": 4 + 17 + 34 + 4}
+    assert _row_counts(match_id) == [0, 0, 0, 0]
+    match = _db.session.get(Match, match_id)
+    assert match.archived
+    archive = json.loads(match.archive)
+    assert archive["results"][4] == [-1, None]
+    assert archive["results"][17] is None
+    assert match.player_names == ["Player 1", "Player 2", "Player 3", "Player 4"]
+    # Reads are unchanged
+    assert LeaderboardService.build_leaderboard(match_id) == leaderboard
+
+
+def test_archive_skips_incomplete_and_archived(_db, service_created_match):
+    """Test that only completed, unarchived matches are archived"""
+    assert ArchiveService.archive_matches([service_created_match.id]) == {
+        "matches": 0,
+        "rows": 0,
+    }
+    assert _row_counts(service_created_match.id)[0] == 4
+
+
+def test_archived_hole_is_read_only(_db, completed_match):
+    """Test that archived holes can be viewed but not scored"""
+    match_id = completed_match.id
+    before = HoleService.get_previous_results(
+        HoleService.get_hole_by_match_hole_num(match_id, 3)
+    )
+    ArchiveService.archive_matches([match_id])
+
+    hole = HoleService.get_hole_by_match_hole_num(match_id, 3)
+    assert HoleService.get_previous_results(hole) == before
+    assert hole.holematches[0].player1.name == "Player 1"
+
+    with pytest.raises(ValueError, match="Match is archived"):
+        HoleService.handle_hole_outcome(match_id, 3, [-1, -1])
+    with pytest.raises(ValueError, match="Hole not found"):
+        HoleService.score_hole(match_id, 3, [-1, -1])
+    assert _row_counts(match_id) == [0, 0, 0, 0]
+
+
+def test_unarchive_match(_db, completed_match):
+    """Test that unarchiving restores the same results"""
+    match_id = completed_match.id
+    leaderboard = LeaderboardService.build_leaderboard(match_id)
+    winners = [
+        HoleService.get_previous_results(
+            HoleService.get_hole_by_match_hole_num(match_id, num)
+        )
+        for num in range(1, 19)
+    ]
+    ArchiveService.archive_matches([match_id])
+
+    assert ArchiveService.unarchive_match(match_id)
+
+    assert not _db.session.get(Match, match_id).archived
+    assert _row_counts(match_id) == [4, 17, 34, 4]
+    assert LeaderboardService.build_leaderboard(match_id) == leaderboard
+    player_ids = [player.id for player in PlayerService.get_all_players(match_id)]
+    restored = [
+        HoleService.get_previous_results(
+            HoleService.get_hole_by_match_hole_num(match_id, num)
+        )
+        for num in range(1, 19)
+    ]
+    # Players have new IDs, so compare winners by position
+    old_ids = sorted({w for r in winners for w in r.values() if w and w > 0})
+    mapping = dict(zip(old_ids, player_ids))
+    assert restored == [
+        {key: mapping.get(value, value) for key, value in result.items()}
+        for result in winners
+    ]
+    assert ArchiveService.unarchive_match(match_id) is False
+
+
+def test_archive_old_matches_in_batches(_db, logged_in_user):
+    """Test that only old completed matches are archived, a batch at a time"""
+    names = ["A", "B", "C", "D"]
+    matches = MatchService.create_matches([names] * 5)
+    for match in matches:
+        match.completed = True
+    _db.session.commit()
+    match_ids = [match.id for match in matches]
+    _db.session.execute(
+        text(
+            "UPDATE \"match\" SET created_at = '2020-01-01 00:00:00' "
+            "WHERE id != :newest"
+        ),
+        {"newest": match_ids[-1]},
+    )
+    _db.session.commit()
+
+    results = list(ArchiveService.archive_old_matches(30, batch_size=3))
+
+    assert [result["matches"] for result in results] == [3, 1]
+    archived = [_db.session.get(Match, match_id).archived for match_id in match_ids]
+    assert archived == [True, True, True, True, False]
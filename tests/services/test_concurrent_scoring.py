@@ -0,0 +1,157 @@
+"""Tests for optimistic concurrency control of scoring writes."""
+
+import threading
+import pytest
+from sqlalchemy import select, text
+from flask_login import login_user
+from app import create_app, db
+from app.models import Match, Player, User
+from app.services.hole_service import ConflictError, HoleService, StaleVersionError
+from app.services.match_service import MatchService
+from app.services.pointstable_service import PointstableService
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    # A file database, so each thread and the interfering writer get their
+    # own connection; the single-writer pool of read routing is turned off
+    # so that writers actually race
+    app = create_app(
+        "testing",
+        config={
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/test.db",
+            "METRICS_DIR": str(tmp_path / "metrics"),
+            "DB_READ_ROUTING": False,
+            "SCORING_MAX_RETRIES": 50,
+        },
+    )
+    with app.test_request_context():
+        user = User(username="scorer", email="scorer@example.com")
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.commit()
+        login_user(user)
+        MatchService.create_match(["A", "B", "C", "D"])
+        db.session.remove()
+    return app
+
+
+def _interfere_once(mocker, statements):
+    """Commit statements on another connection just before the first CAS."""
+    original = HoleService._update_progress
+    calls = []
+
+    def update_progress(*args):
+        if not calls:
+            with db.engine.begin() as connection:
+                for statement in statements:
+                    connection.execute(text(statement))
+        calls.append(args)
+        return original(*args)
+
+    mocker.patch.object(HoleService, "_update_progress", update_progress)
+    return calls
+
+
+def test_retry_after_other_hole_written(mocker, file_app):
+    """Test that losing a race to a write on another hole is retried"""
+    with file_app.app_context():
+        calls = _interfere_once(mocker, ['UPDATE "match" SET version = version + 1'])
+        HoleService.score_hole(1, 1, [-1, -1])
+
+        assert len(calls) == 2
+        assert db.session.get(Match, 1).version == 3
+        assert HoleService.get_first_incomplete_hole_num(1) == 2
+
+
+@pytest.mark.parametrize("scorer", ["score_hole", "handle_hole_outcome"])
+def test_conflict_on_same_hole(mocker, file_app, scorer):
+    """Test that a race on the same hole is reported, not overwritten"""
+    with file_app.app_context():
+        # Another scorer records a draw on hole 1 between read and write
+        HoleService.score_hole(1, 2, [-1, -1])
+        _interfere_once(
+            mocker,
+            [
+                'UPDATE "match" SET version = version + 1',
+                "INSERT INTO hole (num, match_id) VALUES (1, 1)",
+                "INSERT INTO hole_match (hole_id, match_id, player1_id, "
+                "player2_id, winner_id) SELECT hole.id, 1, 1, 2, -1 FROM hole "
+                "WHERE match_id = 1 AND num = 1",
+                "INSERT INTO hole_match (hole_id, match_id, player1_id, "
+                "player2_id, winner_id) SELECT hole.id, 1, 3, 4, -1 FROM hole "
+                "WHERE match_id = 1 AND num = 1",
+                "UPDATE player SET scorecard = scorecard | 3",
+            ],
+        )
+        with pytest.raises(ConflictError, match="Hole 1 was changed"):
+            getattr(HoleService, scorer)(1, 1, [1, 3])
+
+
+@pytest.mark.parametrize("scorer", ["score_hole", "handle_hole_outcome"])
+def test_conflict_on_cleared_hole(mocker, file_app, scorer):
+    """Test that a result cleared by another scorer is not overwritten"""
+    with file_app.app_context():
+        HoleService.score_hole(1, 1, [-1, -1])
+        # Clearing leaves the scorecards alone; only the winners change
+        _interfere_once(
+            mocker,
+            [
+                'UPDATE "match" SET version = version + 1, '
+                "completed_holes = completed_holes & ~1",
+                "UPDATE hole_match SET winner_id = NULL WHERE match_id = 1",
+            ],
+        )
+        with pytest.raises(ConflictError, match="Hole 1 was changed"):
+            getattr(HoleService, scorer)(1, 1, [1, 3])
+
+
+def test_retries_are_bounded(mocker, file_app):
+    """Test that a match that keeps changing gives up with a conflict"""
+    file_app.config["SCORING_MAX_RETRIES"] = 2
+    mocker.patch.object(
+        HoleService,
+        "_update_progress",
+        side_effect=StaleVersionError("changed"),
+    )
+    with file_app.app_context():
+        with pytest.raises(ConflictError, match="kept changing"):
+            HoleService.score_hole(1, 1, [-1, -1])
+        assert HoleService._update_progress.call_count == 3
+
+
+def test_concurrent_scorers_lose_no_updates(file_app):
+    """Test that threads scoring one match at once lose no results"""
+    errors = []
+    start = threading.Barrier(6)
+
+    def score(holes):
+        with file_app.app_context():
+            start.wait()
+            for hole_num in holes:
+                try:
+                    scorer = (
+                        HoleService.score_hole
+                        if hole_num % 2
+                        else HoleService.handle_hole_outcome
+                    )
+                    scorer(1, hole_num, [-1, -1])
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [
+        threading.Thread(target=score, args=(range(i + 1, 19, 6),)) for i in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with file_app.app_context():
+        assert HoleService.get_first_incomplete_hole_num(1) is None
+        scorecards = db.session.scalars(
+            select(Player.scorecard_bits).where(Player.match_id == 1)
+        ).all()
+        assert all(bits == (1 << 36) - 1 for bits in scorecards)
+        assert PointstableService.verify_pointstable(1) == []
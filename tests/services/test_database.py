@@ -0,0 +1,212 @@
+"""Tests for the SQLite connection profiles and read routing."""
+
+import threading
+from unittest import mock
+import pytest
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.exc import OperationalError
+from flask_login import login_user
+from app import create_app, db
+from app.database import read_engine, read_only
+from app.models import Match, User
+from app.services.match_service import MatchService
+
+
+def _pragma(name):
+    return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def _file_app(tmp_path, **config):
+    return create_app(
+        "testing",
+        config={
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/test.db",
+            "METRICS_DIR": str(tmp_path / "metrics"),
+            **config,
+        },
+    )
+
+
+def test_tuned_profile(tmp_path):
+    """Test that file databases get the tuned pragmas and sized pools"""
+    app = _file_app(tmp_path, DB_POOL_SIZE=3, DB_MAX_OVERFLOW=2)
+    with app.app_context():
+        assert _pragma("journal_mode") == "wal"
+        assert _pragma("synchronous") == 1  # NORMAL
+        assert _pragma("busy_timeout") == 5000
+        assert _pragma("cache_size") == -16000
+        assert _pragma("temp_store") == 2  # MEMORY
+        assert _pragma("foreign_keys") == 1
+        # A single writer connection, with reads on a pool of their own
+        assert db.engine.pool.size() == 1
+        reader = read_engine()
+        assert reader.pool.size() == 3
+        assert reader.pool._max_overflow == 2
+
+
+def test_default_profile_with_overrides(tmp_path):
+    """Test that a profile's pragmas can be overridden individually"""
+    # Leaves the file in WAL mode, which can only be left once it is closed
+    with _file_app(tmp_path).app_context():
+        db.engine.dispose()
+
+    app = _file_app(
+        tmp_path, SQLITE_PROFILE="default", SQLITE_PRAGMAS={"busy_timeout": 250}
+    )
+    with app.app_context():
+        assert _pragma("journal_mode") == "delete"
+        assert _pragma("synchronous") == 2  # FULL
+        assert _pragma("busy_timeout") == 250
+
+
+def test_unknown_profile():
+    """Test that a misspelt profile is rejected at startup"""
+    with pytest.raises(ValueError, match="Unknown SQLITE_PROFILE"):
+        create_app("testing", config={"SQLITE_PROFILE": "fast", "METRICS_DIR": ""})
+
+
+@pytest.fixture
+def routed_app(tmp_path):
+    app = _file_app(tmp_path, WTF_CSRF_ENABLED=False)
+    with app.test_request_context():
+        user = User(username="reader", email="reader@example.com")
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.commit()
+        login_user(user)
+        MatchService.create_match(["A", "B", "C", "D"])
+        db.session.remove()
+    return app
+
+
+def _count_statements(engine):
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+def test_read_engine_is_read_only(routed_app):
+    """Test that the read engine's connections cannot write"""
+    with routed_app.app_context():
+        with read_engine().connect() as connection:
+            assert connection.scalar(select(Match.id)) == 1
+            with pytest.raises(OperationalError, match="readonly"):
+                connection.execute(insert(Match).values(user_id=1))
+
+
+def test_requests_read_from_read_engine(routed_app):
+    """Test that requests read from the read engine and write to the writer"""
+    with routed_app.app_context():
+        reads = _count_statements(read_engine())
+        writes = _count_statements(db.engine)
+
+    client = routed_app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = "1"
+        session["_fresh"] = True
+
+    assert client.get("/matches/1").status_code == 200
+    assert reads and not writes
+
+    reads.clear()
+    response = client.post(
+        "/matches/1/hole/1/process", data={"winner1": "draw", "winner2": "draw"}
+    )
+    assert response.status_code == 200
+    # The match and players are read before the first write
+    assert reads and writes
+    assert not any(statement.startswith("UPDATE") for statement in reads)
+
+
+def test_slow_post_does_not_block_writes(routed_app, tmp_path):
+    """Test that a POST busy before its first write holds no writer connection"""
+    # The routed app's database, with a short wait for the writer connection
+    routed_app = _file_app(
+        tmp_path,
+        WTF_CSRF_ENABLED=False,
+        SQLALCHEMY_ENGINE_OPTIONS={"pool_timeout": 2},
+    )
+    hashing = threading.Event()
+    release = threading.Event()
+    check_password = User.check_password
+
+    def slow_check_password(user, password):
+        hashing.set()
+        release.wait(10)
+        return check_password(user, password)
+
+    def login():
+        client = routed_app.test_client()
+        results["login"] = client.post(
+            "/auth/login", data={"username": "reader", "password": "password123"}
+        ).status_code
+
+    results = {}
+    with mock.patch.object(User, "check_password", slow_check_password):
+        thread = threading.Thread(target=login)
+        thread.start()
+        try:
+            assert hashing.wait(10)
+            # The login has looked up its user and is now hashing
+            client = routed_app.test_client()
+            with client.session_transaction() as session:
+                session["_user_id"] = "1"
+                session["_fresh"] = True
+            response = client.post(
+                "/matches/1/hole/1/process",
+                data={"winner1": "draw", "winner2": "draw"},
+            )
+            assert response.status_code == 200
+            assert thread.is_alive()
+        finally:
+            release.set()
+            thread.join()
+    assert results["login"] == 302
+
+
+def test_reads_follow_writes_until_commit(routed_app):
+    """Test read-your-writes: after a write, reads use the writer until commit"""
+    with routed_app.app_context():
+        query = select(Match.id)
+        assert db.session.get_bind(clause=query) is db.engine
+
+        db.session.info["read_only"] = True
+        assert db.session.get_bind(clause=query) is read_engine()
+
+        db.session.execute(insert(Match).values(user_id=1))
+        assert db.session.get_bind(clause=query) is db.engine
+        assert db.session.scalar(select(Match.id).order_by(Match.id.desc())) == 2
+
+        db.session.commit()
+        assert db.session.get_bind(clause=query) is read_engine()
+        assert db.session.scalar(select(Match.id).order_by(Match.id.desc())) == 2
+
+
+def test_read_only_decorator(routed_app):
+    """Test that @read_only routes a method's reads, then restores the session"""
+
+    @read_only
+    def count_matches():
+        return db.session.get_bind(clause=select(Match.id))
+
+    with routed_app.app_context():
+        assert count_matches() is read_engine()
+        assert not db.session.info["read_only"]
+
+
+def test_write_pool_size(tmp_path):
+    """Test that the writer pool is sized by DB_WRITE_POOL_SIZE when routed"""
+    app = _file_app(tmp_path, DB_POOL_SIZE=5, DB_WRITE_POOL_SIZE=2)
+    with app.app_context():
+        assert db.engine.pool.size() == 2
+        assert read_engine().pool.size() == 5
+
+
+def test_memory_database_is_not_routed(app):
+    """Test that in-memory databases keep a single engine"""
+    with app.app_context():
+        assert read_engine() is None
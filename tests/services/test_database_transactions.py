@@ -25,16 +25,27 @@ def test_successful_match_creation_transaction(mocker, logged_in_user):
     # Verify the match was created with all its related entities
     assert match.user_id == logged_in_user.id
     assert len(Player.query.filter_by(match_id=match.id).all()) == 4
-    assert len(Hole.query.filter_by(match_id=match.id).all()) == 18
+    assert len(Hole.query.filter_by(match_id=match.id).all()) == 0
     assert len(PointsTable.query.filter_by(match_id=match.id).all()) == 4
 
 
+def test_successful_bulk_match_creation_transaction(mocker, logged_in_user):
+    """Test bulk match creation commits once for all matches"""
+    mock_commit = mocker.patch("app.models.db.session.commit")
+
+    MatchService.create_matches(
+        [[f"Player {i + j}" for j in range(4)] for i in range(0, 8, 4)]
+    )
+
+    assert mock_commit.call_count == 1
+
+
 def test_successful_hole_outcome_transaction(mocker, service_created_match):
     """Test successful hole outcome update commits once at the end"""
     hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
     mock_commit = mocker.patch("app.models.db.session.commit")
 
-    HoleService.handle_hole_outcome(service_created_match.id, hole.id, [-1, -1])
+    HoleService.handle_hole_outcome(service_created_match.id, hole.num, [-1, -1])
 
     # Should commit only once at the end, not for each nested operation
     assert mock_commit.call_count == 1
@@ -54,10 +65,10 @@ def test_successful_nested_transaction_control(mocker, service_created_match):
     """Test that nested operations don't commit until parent operation completes"""
     mock_commit = mocker.patch("app.models.db.session.commit")
     mock_scorecard = mocker.spy(PlayerService, "update_scorecard")
-    mock_pointstable = mocker.spy(PointstableService, "update_pointstable_for_all")
+    mock_pointstable = mocker.spy(PointstableService, "apply_result_changes")
 
     hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
-    HoleService.handle_hole_outcome(service_created_match.id, hole.id, [-1, -1])
+    HoleService.handle_hole_outcome(service_created_match.id, hole.num, [-1, -1])
 
     # Verify nested operations were called with commit=False
     for call in mock_scorecard.call_args_list:
@@ -86,10 +97,24 @@ def test_create_match_database_error(mocker, logged_in_user):
     assert mock_rollback.call_count == 1
 
 
+def test_create_matches_database_error(mocker, logged_in_user):
+    """Test bulk match creation rolls back when an insert fails"""
+    mocker.patch(
+        "app.models.db.session.execute", side_effect=SQLAlchemyError("Database error")
+    )
+    mock_rollback = mocker.patch("app.models.db.session.rollback")
+
+    with pytest.raises(Exception) as exc_info:
+        MatchService.create_matches([["Player 1", "Player 2", "Player 3", "Player 4"]])
+
+    assert "Failed to create matches" in str(exc_info.value)
+    assert mock_rollback.call_count == 1
+
+
 def test_create_match_nested_transaction_error(mocker, logged_in_user):
     """Test match creation when a nested operation fails"""
-    mock_create_hole = mocker.patch(
-        "app.services.hole_service.HoleService.create_hole",
+    mock_create_pointstable = mocker.patch(
+        "app.services.pointstable_service.PointstableService.create_pointstable",
         side_effect=SQLAlchemyError("Database error"),
     )
     mock_rollback = mocker.patch("app.models.db.session.rollback")
@@ -111,7 +136,7 @@ def test_handle_hole_outcome_nested_transaction_error(mocker, service_created_ma
     mock_rollback = mocker.patch("app.models.db.session.rollback")
 
     with pytest.raises(Exception) as exc_info:
-        HoleService.handle_hole_outcome(service_created_match.id, hole.id, [-1, -1])
+        HoleService.handle_hole_outcome(service_created_match.id, hole.num, [-1, -1])
 
     assert "Failed to update hole outcome" in str(exc_info.value)
     assert mock_rollback.call_count == 1
@@ -182,7 +207,7 @@ def test_handle_hole_outcome_database_error(mocker, service_created_match):
     mock_rollback = mocker.patch("app.models.db.session.rollback")
 
     with pytest.raises(Exception) as exc_info:
-        HoleService.handle_hole_outcome(service_created_match.id, hole.id, [-1, -1])
+        HoleService.handle_hole_outcome(service_created_match.id, hole.num, [-1, -1])
 
     assert "Failed to update hole outcome" in str(exc_info.value)
     assert mock_rollback.call_count == 1
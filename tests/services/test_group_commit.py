@@ -0,0 +1,109 @@
+"""Tests for group commit of scoring writes."""
+
+import threading
+import pytest
+from sqlalchemy import insert, select
+from flask_login import login_user
+from app import create_app, db
+from app.group_commit import group_writer
+from app.models import HoleMatch, Match, Player, User
+from app.services.hole_service import HoleService, ScoringTimeoutError
+from app.services.match_service import MatchService
+
+
+@pytest.fixture
+def group_app(tmp_path):
+    app = create_app(
+        "testing",
+        config={
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/test.db",
+            "METRICS_DIR": str(tmp_path / "metrics"),
+            "GROUP_COMMIT": True,
+            "GROUP_COMMIT_WINDOW_MS": 100,
+        },
+    )
+    with app.test_request_context():
+        user = User(username="scorer", email="scorer@example.com")
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.commit()
+        login_user(user)
+        MatchService.create_matches([["A", "B", "C", "D"]] * 4)
+        db.session.remove()
+    yield app
+    group_writer.stop()
+
+
+def _add_match(user_id, fail=False):
+    db.session.execute(insert(Match).values(user_id=user_id))
+    if fail:
+        raise ValueError("no good")
+    return user_id
+
+
+def test_operations_share_one_commit(group_app):
+    """Test that a batch commits together and failures only undo their own"""
+    with group_app.app_context():
+        futures = [
+            group_writer.submit(_add_match, 1),
+            group_writer.submit(_add_match, 1, fail=True),
+            group_writer.submit(_add_match, 1),
+        ]
+        assert futures[0].result(timeout=5) == 1
+        with pytest.raises(ValueError, match="no good"):
+            futures[1].result(timeout=5)
+        assert futures[2].result(timeout=5) == 1
+
+        assert group_writer.stats() == {"batches": 1, "operations": 2}
+        assert db.session.scalar(select(db.func.count(Match.id))) == 6
+
+
+def test_concurrent_score_hole(group_app):
+    """Test that concurrent scoring requests are batched and all recorded"""
+    errors = []
+
+    def score(match_id, hole_num):
+        with group_app.test_request_context():
+            try:
+                HoleService.score_hole(match_id, hole_num, [-1, -1])
+            except Exception as e:
+                errors.append(e)
+
+    threads = [
+        threading.Thread(target=score, args=(match_id, hole_num))
+        for match_id in range(1, 5)
+        for hole_num in (1, 2)
+    ] + [threading.Thread(target=score, args=(99, 1))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [str(e) for e in errors] == ["Hole not found"]
+    stats = group_writer.stats()
+    assert stats["operations"] == 8
+    assert stats["batches"] < 8
+    with group_app.app_context():
+        for match_id in range(1, 5):
+            assert HoleService.get_first_incomplete_hole_num(match_id) == 3
+            scorecards = db.session.scalars(
+                select(Player.scorecard_bits).where(Player.match_id == match_id)
+            ).all()
+            assert len(set(scorecards)) == 1 and scorecards[0]
+
+
+def test_score_hole_times_out_on_stalled_writer(group_app):
+    """Test that a stalled writer times out the request, then still writes"""
+    release = threading.Event()
+    with group_app.test_request_context():
+        group_writer.submit(release.wait)
+        group_writer.timeout = 0.2
+        with pytest.raises(ScoringTimeoutError):
+            HoleService.score_hole(1, 1, [-1, -1])
+
+        release.set()
+        group_writer.stop()
+        winners = db.session.scalars(
+            select(HoleMatch.winner_id).where(HoleMatch.match_id == 1)
+        ).all()
+        assert winners == [-1, -1]
@@ -1,26 +1,30 @@
+import random
 import pytest
 from app.services.hole_service import HoleService
-from app.models import Hole, HoleMatch, Player
+from app.services.match_service import MatchService
+from app.services.player_service import PlayerService
+from app.services.pointstable_service import PointstableService
+from app.models import db, Hole, HoleMatch, Match, Player
 
 
-def test_hole_creation_from_match(service_created_match):
-    """Test that holes are created correctly when a match is created"""
-    holes = (
-        Hole.query.filter_by(match_id=service_created_match.id).order_by(Hole.num).all()
-    )
+def test_holes_not_stored_at_match_creation(service_created_match):
+    """Test that no hole rows are written until a result is recorded"""
+    assert Hole.query.filter_by(match_id=service_created_match.id).count() == 0
+    assert HoleMatch.query.filter_by(match_id=service_created_match.id).count() == 0
 
-    # Verify basic hole creation
-    assert len(holes) == 18
-    assert [h.num for h in holes] == list(range(1, 19))
 
-    # Verify hole matches for first three holes follow the rotation pattern
-    hole1, hole2, hole3 = holes[:3]
+def test_virtual_holes_follow_rotation(service_created_match):
+    """Test that unplayed holes are built from the matchup rotation"""
     players = (
         Player.query.filter_by(match_id=service_created_match.id)
         .order_by(Player.id)
         .all()
     )
     player_ids = [p.id for p in players]
+    hole1, hole2, hole3 = [
+        HoleService.get_hole_by_match_hole_num(service_created_match.id, num)
+        for num in range(1, 4)
+    ]
 
     # Hole 1: (0,1) (2,3)
     matches1 = hole1.holematches
@@ -43,11 +47,32 @@ def test_hole_creation_from_match(service_created_match):
     assert matches3[1].player1_id == player_ids[1]
     assert matches3[1].player2_id == player_ids[2]
 
+    # Virtual holes are not saved
+    assert hole1.id is None
+    assert matches1[0].player1.name == "Player 1"
+    assert all(hm.winner_id is None for hm in matches1 + matches2 + matches3)
+    assert Hole.query.filter_by(match_id=service_created_match.id).count() == 0
+
+
+def test_hole_stored_when_result_recorded(service_created_match):
+    """Test that recording a result writes only that hole"""
+    match_id = service_created_match.id
+    HoleService.handle_hole_outcome(match_id, 5, [-1, -1])
+
+    holes = Hole.query.filter_by(match_id=match_id).all()
+    assert [h.num for h in holes] == [5]
+    assert HoleMatch.query.filter_by(match_id=match_id).count() == 2
+
+    # Re-scoring the same hole reuses the stored rows
+    HoleService.handle_hole_outcome(match_id, 5, [None, -1])
+    assert Hole.query.filter_by(match_id=match_id).count() == 1
+    assert HoleMatch.query.filter_by(match_id=match_id).count() == 2
+
 
 def test_get_hole(service_created_match):
     """Test retrieving a specific hole"""
-    holes = Hole.query.filter_by(match_id=service_created_match.id).all()
-    first_hole = holes[0]
+    HoleService.handle_hole_outcome(service_created_match.id, 1, [-1, -1])
+    first_hole = Hole.query.filter_by(match_id=service_created_match.id).first()
 
     retrieved_hole = HoleService.get_hole(first_hole.id)
     assert retrieved_hole.id == first_hole.id
@@ -61,6 +86,13 @@ def test_get_hole_by_match_hole_num(service_created_match):
     assert hole.match_id == service_created_match.id
 
 
+def test_get_hole_by_match_hole_num_invalid(service_created_match):
+    """Test that holes outside 1-18 or unknown matches return None"""
+    assert HoleService.get_hole_by_match_hole_num(service_created_match.id, 0) is None
+    assert HoleService.get_hole_by_match_hole_num(service_created_match.id, 19) is None
+    assert HoleService.get_hole_by_match_hole_num(999, 1) is None
+
+
 def test_handle_hole_outcome(service_created_match):
     """Test handling the outcome of a hole"""
     hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
@@ -68,11 +100,12 @@ def test_handle_hole_outcome(service_created_match):
 
     # Set winners for both matches
     winners = [holematch1.player1_id, holematch2.player2_id]
-    HoleService.handle_hole_outcome(service_created_match.id, hole.id, winners)
+    HoleService.handle_hole_outcome(service_created_match.id, hole.num, winners)
 
     # Verify winners were set
-    assert holematch1.winner_id == winners[0]
-    assert holematch2.winner_id == winners[1]
+    hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
+    assert hole.holematches[0].winner_id == winners[0]
+    assert hole.holematches[1].winner_id == winners[1]
 
     # Verify scorecards were updated
     assert holematch1.player1.scorecard[0] == "W"  # Winner
@@ -87,7 +120,7 @@ def test_handle_hole_outcome_draw(service_created_match):
     holematch = hole.holematches[0]
 
     # Set a draw (-1 indicates draw)
-    HoleService.handle_hole_outcome(service_created_match.id, hole.id, [-1, None])
+    HoleService.handle_hole_outcome(service_created_match.id, hole.num, [-1, None])
 
     # Verify draw was recorded
     assert holematch.player1.scorecard[0] == "D"
@@ -97,20 +130,26 @@ def test_handle_hole_outcome_draw(service_created_match):
 def test_get_next_hole_num(service_created_match):
     """Test getting the next hole number"""
     hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
-    next_num = HoleService.get_next_hole_num(hole.id)
+    next_num = HoleService.get_next_hole_num(hole.num)
     assert next_num == 2
+    assert HoleService.get_next_hole_num(18) is None
 
 
 def test_get_previous_results(service_created_match):
     """Test getting previous results"""
     hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
+    assert HoleService.get_previous_results(hole) == {
+        "winner1": None,
+        "winner2": None,
+    }
     holematch1, holematch2 = hole.holematches
 
     # Set some results
     winners = [holematch1.player1_id, holematch2.player2_id]
-    HoleService.handle_hole_outcome(service_created_match.id, hole.id, winners)
+    HoleService.handle_hole_outcome(service_created_match.id, hole.num, winners)
 
-    results = HoleService.get_previous_results(hole.id)
+    hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
+    results = HoleService.get_previous_results(hole)
     assert results["winner1"] == winners[0]
     assert results["winner2"] == winners[1]
 
@@ -126,7 +165,7 @@ def test_get_first_incomplete_hole(service_created_match):
     holematch1, holematch2 = hole1.holematches
     HoleService.handle_hole_outcome(
         service_created_match.id,
-        hole1.id,
+        hole1.num,
         [holematch1.player1_id, holematch2.player1_id],
     )
 
@@ -140,10 +179,167 @@ def test_get_first_incomplete_hole(service_created_match):
         holematch1, holematch2 = hole.holematches
         HoleService.handle_hole_outcome(
             service_created_match.id,
-            hole.id,
+            hole.num,
             [holematch1.player1_id, holematch2.player1_id],
         )
 
     # Now no incomplete holes
     incomplete = HoleService.get_first_incomplete_hole(service_created_match.id)
     assert incomplete is None
+
+
+def _match_state(match_id):
+    """Scorecards, points rows and hole winners by player position"""
+    players = Player.query.filter_by(match_id=match_id).order_by(Player.id).all()
+    index = {player.id: i for i, player in enumerate(players)}
+    index[-1] = -1
+    index[None] = None
+    rows = PointstableService.get_pointstable(match_id)
+    return (
+        [player.scorecard for player in players],
+        sorted(
+            (
+                index[row.player_id],
+                row.thru,
+                row.wins,
+                row.draws,
+                row.losses,
+                row.points,
+            )
+            for row in rows
+        ),
+        sorted(
+            (hole.num, index[hm.player1_id], index[hm.player2_id], index[hm.winner_id])
+            for hole in Hole.query.filter_by(match_id=match_id)
+            for hm in hole.holematches
+        ),
+    )
+
+
+def test_score_hole_matches_handle_hole_outcome(logged_in_user):
+    """Test that the set-based path gives the same results as the ORM path"""
+    names = ["Player 1", "Player 2", "Player 3", "Player 4"]
+    orm_match_id = MatchService.create_match(names).id
+    fast_match_id = MatchService.create_match(names).id
+    rng = random.Random(7)
+
+    def winner(match_id, player_index):
+        if player_index in (-1, None):
+            return player_index
+        return PlayerService.get_all_players(match_id)[player_index].id
+
+    for _ in range(60):
+        num = rng.randint(1, 18)
+        choices = [
+            rng.choice([a, b, -1, None]) for a, b in HoleService.get_matchups(num)
+        ]
+        HoleService.handle_hole_outcome(
+            orm_match_id, num, [winner(orm_match_id, c) for c in choices]
+        )
+        HoleService.score_hole(
+            fast_match_id, num, [winner(fast_match_id, c) for c in choices]
+        )
+        assert _match_state(fast_match_id) == _match_state(orm_match_id)
+
+    assert PointstableService.verify_pointstable(fast_match_id) == []
+
+
+def test_score_hole_statement_count(service_created_match, query_counter):
+    """Test that scoring a stored hole takes a fixed handful of statements"""
+    match_id = service_created_match.id
+    HoleService.score_hole(match_id, 1, [-1, -1])
+
+    player_ids = [player.id for player in PlayerService.get_all_players(match_id)]
+    query_counter.clear()
+    HoleService.score_hole(match_id, 1, [player_ids[1], player_ids[3]])
+
+    # Players, holes, then one UPDATE each for match progress, hole_match,
+    # player and points_table
+    assert len(query_counter) == 6
+
+
+def test_score_hole_invalid(service_created_match):
+    """Test that bad input is rejected without writing anything"""
+    match_id = service_created_match.id
+    with pytest.raises(ValueError, match="Must provide winner for each match"):
+        HoleService.score_hole(match_id, 1, [-1])
+    with pytest.raises(ValueError, match="Hole not found"):
+        HoleService.score_hole(match_id, 19, [-1, -1])
+    with pytest.raises(ValueError, match="Hole not found"):
+        HoleService.score_hole(999, 1, [-1, -1])
+    assert Hole.query.filter_by(match_id=match_id).count() == 0
+
+
+def test_score_holes_full_round(service_created_match, query_counter):
+    """Test that a whole round is recorded with one set of statements"""
+    match_id = service_created_match.id
+    player_ids = [player.id for player in PlayerService.get_all_players(match_id)]
+    results = {
+        num: [player_ids[a] for a, _ in HoleService.get_matchups(num)]
+        for num in range(1, 19)
+    }
+    query_counter.clear()
+
+    HoleService.score_holes(match_id, results)
+
+    # Players, holes, insert holes, insert holematches, then update match
+    # progress, player and points
+    assert len(query_counter) == 7
+    assert HoleService.get_first_incomplete_hole(match_id) is None
+    assert PointstableService.verify_pointstable(match_id) == []
+    points = {
+        row.player_id: row.points
+        for row in PointstableService.get_pointstable(match_id)
+    }
+    # The first player is listed first in every matchup, the last never is
+    assert points[player_ids[0]] == 18 * 3
+    assert points[player_ids[3]] == 0
+
+
+def test_score_holes_all_or_nothing(service_created_match):
+    """Test that one invalid result stops the whole batch"""
+    match_id = service_created_match.id
+    player_ids = [player.id for player in PlayerService.get_all_players(match_id)]
+
+    with pytest.raises(ValueError, match="Invalid winner for hole 2"):
+        HoleService.score_holes(
+            match_id, {1: [-1, -1], 2: [player_ids[1], -1], 3: [-1, None]}
+        )
+
+    assert Hole.query.filter_by(match_id=match_id).count() == 0
+    assert all(row.thru == 0 for row in PointstableService.get_pointstable(match_id))
+
+
+def test_score_holes_invalid_input(service_created_match):
+    """Test that batch input is checked before anything is read"""
+    match_id = service_created_match.id
+    with pytest.raises(ValueError, match="No hole results provided"):
+        HoleService.score_holes(match_id, {})
+    with pytest.raises(ValueError, match="between 1 and 18"):
+        HoleService.score_holes(match_id, {0: [-1, -1]})
+    with pytest.raises(ValueError, match="Must provide winner"):
+        HoleService.score_holes(match_id, {1: [-1]})
+
+
+def test_match_progress_tracked(service_created_match, query_counter):
+    """Test that completed holes are kept on the match as results change"""
+    match_id = service_created_match.id
+    HoleService.handle_hole_outcome(match_id, 1, [-1, -1])
+    HoleService.score_hole(match_id, 2, [-1, -1])
+    HoleService.score_holes(match_id, {3: [-1, None], 4: [-1, -1]})
+
+    query_counter.clear()
+    assert HoleService.get_first_incomplete_hole_num(match_id) == 3
+    assert len(query_counter) == 1
+
+    match = db.session.get(Match, match_id)
+    assert match.holes_completed == 3
+    assert match.first_incomplete_hole_num == 3
+
+    # Clearing a result makes the hole incomplete again
+    HoleService.handle_hole_outcome(match_id, 1, [None, -1])
+    assert HoleService.get_first_incomplete_hole_num(match_id) == 1
+
+    HoleService.score_holes(match_id, {num: [-1, -1] for num in range(1, 19)})
+    assert HoleService.get_first_incomplete_hole_num(match_id) is None
+    assert db.session.get(Match, match_id).holes_completed == 18
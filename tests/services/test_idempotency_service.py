@@ -0,0 +1,33 @@
+from sqlalchemy import select, text
+from app.models import IdempotencyKey
+from app.services.idempotency_service import IdempotencyService
+
+
+def test_taken_over_reservation_is_not_overwritten(_db, logged_in_user):
+    """Test that a request whose key was taken over cannot store or release it"""
+    user_id = logged_in_user.id
+    stale_at, _ = IdempotencyService.reserve(user_id, "key", "fingerprint", 3600, 5)
+    _db.session.execute(
+        text("UPDATE idempotency_key SET created_at = datetime('now', '-1 minute')")
+    )
+    _db.session.commit()
+
+    reserved_at, stored = IdempotencyService.reserve(
+        user_id, "key", "fingerprint", 3600, 5
+    )
+    assert reserved_at is not None and stored is None
+
+    # The first request was only slow, and finishes after all
+    IdempotencyService.save_response(
+        user_id, "key", stale_at, 200, "application/json", None, b"{}"
+    )
+    IdempotencyService.release(user_id, "key", stale_at)
+    row = _db.session.scalar(select(IdempotencyKey))
+    assert row.created_at == reserved_at
+    assert row.status is None
+
+    IdempotencyService.save_response(
+        user_id, "key", reserved_at, 201, "application/json", None, b"{}"
+    )
+    _db.session.expire_all()
+    assert _db.session.scalar(select(IdempotencyKey.status)) == 201
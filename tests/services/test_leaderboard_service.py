@@ -0,0 +1,160 @@
+import json
+from app.cache import TTLCache
+from app.events import match_events
+from app.services.leaderboard_service import LeaderboardService
+from app.services.hole_service import HoleService
+from app.services.match_service import MatchService
+
+
+def test_ttl_cache_lru_eviction():
+    """Test that the least recently used entry is evicted at maxsize"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_ttl_cache_expiry(mocker):
+    """Test that entries expire after the TTL"""
+    clock = mocker.patch("app.cache.time.monotonic", return_value=100.0)
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+
+    clock.return_value = 104.0
+    assert cache.get("a") == 1
+    clock.return_value = 106.0
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_skips_load_invalidated_during_load():
+    """Test that a value loaded before an invalidation is not stored"""
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    def loader():
+        cache.invalidate("a")
+        return "stale"
+
+    assert cache.get_or_load("a", loader) == "stale"
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_stamp_mismatch_is_miss():
+    """Test that an entry stored with another stamp is reloaded"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get_or_load("a", lambda: "v1", stamp=1) == "v1"
+    assert cache.get_or_load("a", lambda: "other", stamp=1) == "v1"
+    assert cache.get_or_load("a", lambda: "v2", stamp=2) == "v2"
+    assert cache.stats()["misses"] == 2
+
+
+def test_get_leaderboard_hit_and_miss(service_created_match, query_counter):
+    """Test that a second read is served from the cache"""
+    match_id = service_created_match.id
+    query_counter.clear()
+
+    first = LeaderboardService.get_leaderboard(match_id, version=1)
+    queries = len(query_counter)
+    second = LeaderboardService.get_leaderboard(match_id, version=1)
+
+    assert second is first
+    assert len(query_counter) == queries
+    assert LeaderboardService.cache_stats()["hits"] == 1
+    assert LeaderboardService.cache_stats()["misses"] == 1
+    assert [row["player_name"] for row in first["scorecards"]] == [
+        f"Player {i}" for i in range(1, 5)
+    ]
+
+
+def test_hole_outcome_invalidates_leaderboard(service_created_match):
+    """Test that recording a result refreshes the cached leaderboard"""
+    match_id = service_created_match.id
+    before = LeaderboardService.get_leaderboard(match_id)
+    assert before["scorecards"][0]["scorecard"][0] is None
+
+    HoleService.handle_hole_outcome(match_id, 1, [-1, -1])
+
+    after = LeaderboardService.get_leaderboard(match_id)
+    assert after["scorecards"][0]["scorecard"][0] == "D"
+    assert after["pointstable"][0]["points"] == 1
+
+
+def test_leaderboard_sees_writes_from_other_workers(service_created_match, mocker):
+    """Test that a write that skipped this worker's invalidation is seen"""
+    match_id = service_created_match.id
+    before = LeaderboardService.get_leaderboard(match_id)
+
+    # As in another worker: the write commits, but this cache is not told
+    mocker.patch.object(LeaderboardService, "invalidate")
+    HoleService.score_hole(match_id, 1, [-1, -1])
+
+    after = LeaderboardService.get_leaderboard(match_id)
+    assert after is not before
+    assert after["pointstable"][0]["points"] == 1
+
+
+def test_delete_match_invalidates_leaderboard(service_created_match):
+    """Test that deleting a match drops its cached leaderboard"""
+    match_id = service_created_match.id
+    LeaderboardService.get_leaderboard(match_id)
+    assert LeaderboardService.cache_stats()["size"] == 1
+
+    MatchService.delete_match(match_id)
+
+    assert LeaderboardService.cache_stats()["size"] == 0
+
+
+def test_hole_outcome_publishes_delta(service_created_match):
+    """Test that subscribers receive only the changed cells and table"""
+    match_id = service_created_match.id
+    subscription = match_events.subscribe(
+        match_id, LeaderboardService.get_leaderboard(match_id)
+    )
+    assert subscription.initial.startswith("event: leaderboard\n")
+
+    HoleService.handle_hole_outcome(match_id, 2, [-1, -1])
+
+    message = subscription.get(timeout=1)
+    assert message.startswith("event: delta\n")
+    delta = json.loads(message.split("data: ", 1)[1])
+    assert delta["scorecards"] == [[i, 2, "D"] for i in range(4)]
+    assert [row["points"] for row in delta["pointstable"]] == [1, 1, 1, 1]
+
+    match_events.unsubscribe(match_id, subscription)
+    assert not match_events.has_subscribers(match_id)
+
+
+def test_publish_computes_once_for_many_subscribers(service_created_match, mocker):
+    """Test that one update builds the leaderboard once for all subscribers"""
+    match_id = service_created_match.id
+    subscriptions = [
+        match_events.subscribe(match_id, LeaderboardService.get_leaderboard(match_id))
+        for _ in range(5)
+    ]
+    build = mocker.spy(LeaderboardService, "build_leaderboard")
+
+    HoleService.handle_hole_outcome(match_id, 1, [-1, -1])
+
+    assert build.call_count == 1
+    messages = [subscription.get(timeout=1) for subscription in subscriptions]
+    assert len(set(messages)) == 1
+
+
+def test_delete_match_closes_streams(service_created_match):
+    """Test that deleting a match ends its subscribers' streams"""
+    match_id = service_created_match.id
+    subscription = match_events.subscribe(
+        match_id, LeaderboardService.get_leaderboard(match_id)
+    )
+
+    MatchService.delete_match(match_id)
+
+    assert subscription.get(timeout=1) is None
+    assert not match_events.has_subscribers(match_id)
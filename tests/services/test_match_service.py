@@ -1,6 +1,10 @@
 import pytest
+from datetime import datetime
+from sqlalchemy import delete, text
+from app.services.hole_service import HoleService
 from app.services.match_service import MatchService
-from app.models import Match, Player, PointsTable, Hole, HoleMatch
+from app.services.snapshot_service import SnapshotService
+from app.models import Match, MatchSnapshot, Player, PointsTable, Hole, HoleMatch
 
 
 def test_create_match(logged_in_user):
@@ -16,10 +20,8 @@ def test_create_match(logged_in_user):
     assert len(players) == 4
     assert [p.name for p in players] == player_names
 
-    # Verify holes were created
-    holes = Hole.query.filter_by(match_id=match.id).all()
-    assert len(holes) == 18
-    assert [h.num for h in holes] == list(range(1, 19))
+    # Holes are only written once a result is recorded
+    assert Hole.query.filter_by(match_id=match.id).count() == 0
 
     # Verify points table entries were created
     points = PointsTable.query.filter_by(match_id=match.id).all()
@@ -38,6 +40,48 @@ def test_create_match_empty_name(logged_in_user):
         MatchService.create_match(["Player 1", "", "Player 3", "Player 4"])
 
 
+def test_create_match_bulk(logged_in_user):
+    """Test creating a match through the multi-row INSERT path"""
+    player_names = ["Player 1", "Player 2", "Player 3", "Player 4"]
+    match = MatchService.create_match(player_names, bulk=True)
+
+    assert match.user_id == logged_in_user.id
+    players = Player.query.filter_by(match_id=match.id).order_by(Player.id).all()
+    assert [p.name for p in players] == player_names
+    assert all(p.scorecard == [None] * 18 for p in players)
+
+    assert Hole.query.filter_by(match_id=match.id).count() == 0
+
+    points = PointsTable.query.filter_by(match_id=match.id).all()
+    assert len(points) == 4
+    assert all(row.points == 0 and row.thru == 0 for row in points)
+
+
+def test_create_matches(logged_in_user):
+    """Test creating several matches in one call"""
+    name_lists = [[f"Player {i + j}" for j in range(4)] for i in range(0, 12, 4)]
+    matches = MatchService.create_matches(name_lists)
+
+    assert len(matches) == 3
+    for match, names in zip(matches, name_lists):
+        players = Player.query.filter_by(match_id=match.id).order_by(Player.id).all()
+        assert [p.name for p in players] == names
+        assert Hole.query.filter_by(match_id=match.id).count() == 0
+        assert PointsTable.query.filter_by(match_id=match.id).count() == 4
+
+
+def test_create_matches_validates_all_before_insert(logged_in_user):
+    """Test that one invalid match prevents any match from being created"""
+    name_lists = [
+        ["Player 1", "Player 2", "Player 3", "Player 4"],
+        ["Player 5", "", "Player 7", "Player 8"],
+    ]
+    with pytest.raises(ValueError, match="Player names cannot be empty"):
+        MatchService.create_matches(name_lists)
+
+    assert Match.query.count() == 0
+
+
 def test_get_all_matches(logged_in_user, service_created_match):
     """Test retrieving all matches for a user"""
     # Create a second match
@@ -48,6 +92,98 @@ def test_get_all_matches(logged_in_user, service_created_match):
     assert all(match.user_id == logged_in_user.id for match in matches)
 
 
+def test_get_matches_page(logged_in_user, _db):
+    """Test keyset pagination newest first, with ties broken by id"""
+    matches = MatchService.create_matches(
+        [[f"Player {i + j}" for j in range(1, 5)] for i in range(0, 20, 4)]
+    )
+    # Two matches share the oldest timestamp, the rest are a day apart
+    timestamps = ["2024-01-01 09:00:00", "2024-01-01 09:00:00"] + [
+        f"2024-01-0{day} 09:00:00" for day in range(2, 5)
+    ]
+    for match, created_at in zip(matches, timestamps):
+        _db.session.execute(
+            text("UPDATE match SET created_at = :created_at WHERE id = :id"),
+            {"created_at": created_at, "id": match.id},
+        )
+    _db.session.commit()
+    expected = [m.id for m in reversed(matches)]
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = MatchService.get_matches_page(cursor=cursor, page_size=2)
+        seen.extend(match.id for match in page)
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+def test_get_matches_page_stored_timestamp_formats(logged_in_user, _db):
+    """Test paging past equal and zero-microsecond timestamps from Python"""
+    matches = MatchService.create_matches(
+        [[f"Player {i + j}" for j in range(1, 5)] for i in range(0, 16, 4)]
+    )
+    # Stored as 2024-01-01 09:00:00.000000, unlike CURRENT_TIMESTAMP
+    for match in matches[:3]:
+        match.created_at = datetime(2024, 1, 1, 9)
+    matches[3].created_at = datetime(2024, 1, 1, 9, 0, 0, 500)
+    _db.session.commit()
+    expected = [matches[3].id] + [m.id for m in reversed(matches[:3])]
+
+    seen = []
+    cursor = None
+    for _ in range(len(matches)):
+        page, cursor = MatchService.get_matches_page(cursor=cursor, page_size=1)
+        seen.extend(match.id for match in page)
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert cursor is None
+
+
+def test_get_matches_page_loads_players(logged_in_user, query_counter):
+    """Test that players for a whole page are loaded in one query"""
+    MatchService.create_matches(
+        [[f"Player {i + j}" for j in range(1, 5)] for i in range(0, 12, 4)]
+    )
+    user_id = logged_in_user.id
+    query_counter.clear()
+
+    page, cursor = MatchService.get_matches_page(page_size=10)
+    names = [[player.name for player in match.players] for match in page]
+
+    assert len(query_counter) == 2
+    assert cursor is None
+    assert names[0] == ["Player 9", "Player 10", "Player 11", "Player 12"]
+    assert all(match.user_id == user_id for match in page)
+
+
+@pytest.mark.parametrize("page_size", [0, -1, -2])
+def test_get_matches_page_invalid_page_size(logged_in_user, page_size):
+    """Test that page sizes below 1 are rejected rather than unlimited"""
+    with pytest.raises(ValueError, match="Page size"):
+        MatchService.get_matches_page(page_size=page_size)
+
+
+def test_get_matches_page_size_capped(app, logged_in_user):
+    """Test that large page sizes are capped at MATCHES_MAX_PAGE_SIZE"""
+    app.config["MATCHES_MAX_PAGE_SIZE"] = 2
+    MatchService.create_matches([["A", "B", "C", "D"]] * 3)
+
+    page, cursor = MatchService.get_matches_page(page_size=50)
+    assert len(page) == 2
+    assert cursor is not None
+
+
+def test_get_matches_page_invalid_cursor(logged_in_user):
+    """Test that a malformed cursor is rejected"""
+    with pytest.raises(ValueError, match="Invalid page cursor"):
+        MatchService.get_matches_page(cursor="not-a-cursor")
+
+
 def test_get_match(logged_in_user, service_created_match):
     """Test retrieving a specific match"""
     match = MatchService.get_match(service_created_match.id)
@@ -71,6 +207,47 @@ def test_delete_match(service_created_match, _db):
     assert HoleMatch.query.filter_by(match_id=match_id).first() is None
 
 
+def test_delete_match_cascades(service_created_match, _db):
+    """Test that deleting the match row removes its rows by cascade"""
+    match_id = service_created_match.id
+    HoleService.score_hole(match_id, 1, [-1, -1])
+    service_created_match.completed = True
+    SnapshotService.create_snapshot(service_created_match)
+
+    _db.session.execute(delete(Match).where(Match.id == match_id))
+    _db.session.commit()
+
+    for model in (Player, Hole, HoleMatch, PointsTable, MatchSnapshot):
+        assert _db.session.query(model).filter_by(match_id=match_id).count() == 0
+
+
+def test_delete_matches(logged_in_user, service_created_match, _db):
+    """Test deleting several matches in one call"""
+    second = MatchService.create_match(["E", "F", "G", "H"])
+    third = MatchService.create_match(["I", "J", "K", "L"])
+
+    deleted = MatchService.delete_matches([service_created_match.id, second.id, 999])
+    assert deleted == 2
+    assert _db.session.get(Match, third.id) is not None
+    assert Player.query.count() == 4
+    assert MatchService.delete_matches([]) == 0
+
+
+def test_purge_abandoned_matches_in_batches(logged_in_user, _db):
+    """Test that purging works in bounded batches and honours the limit"""
+    MatchService.create_matches([["A", "B", "C", "D"]] * 5)
+    _db.session.execute(text("UPDATE \"match\" SET created_at = '2020-01-01 00:00:00'"))
+    _db.session.commit()
+
+    results = list(MatchService.purge_abandoned_matches(30, batch_size=2, limit=3))
+    assert [result["matches"] for result in results] == [2, 1]
+    assert Match.query.count() == 2
+
+    # Recent matches are kept
+    assert list(MatchService.purge_abandoned_matches(30000)) == []
+    assert Match.query.count() == 2
+
+
 def test_delete_nonexistent_match(_db):
     """Test attempting to delete a match that doesn't exist"""
     result = MatchService.delete_match(999)
@@ -55,7 +55,7 @@ def test_scorecard_updates_from_hole_outcomes(service_created_match):
     # Record wins for first player in each match
     HoleService.handle_hole_outcome(
         service_created_match.id,
-        hole.id,
+        hole.num,
         [holematch1.player1_id, holematch2.player1_id],
     )
 
@@ -78,7 +78,7 @@ def test_scorecard_updates_with_draws(service_created_match):
     hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
 
     # Record all draws
-    HoleService.handle_hole_outcome(service_created_match.id, hole.id, [-1, -1])
+    HoleService.handle_hole_outcome(service_created_match.id, hole.num, [-1, -1])
 
     # Verify all players have "D" for first hole
     players = PlayerService.get_all_players(service_created_match.id)
@@ -105,7 +105,7 @@ def test_scorecard_multiple_holes(service_created_match):
             # Hole 3: Players 1&3 win
             winners = [holematch1.player1_id, holematch2.player2_id]
 
-        HoleService.handle_hole_outcome(service_created_match.id, hole.id, winners)
+        HoleService.handle_hole_outcome(service_created_match.id, hole.num, winners)
 
     # Verify final scorecards
     players = PlayerService.get_all_players(service_created_match.id)
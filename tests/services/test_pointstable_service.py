@@ -37,7 +37,7 @@ def test_get_formatted_pointstable_after_results(service_created_match):
     # Record a win and a draw
     HoleService.handle_hole_outcome(
         service_created_match.id,
-        hole.id,
+        hole.num,
         [holematch1.player1_id, -1],  # First player wins, second match is a draw
     )
 
@@ -59,6 +59,34 @@ def test_get_formatted_pointstable_after_results(service_created_match):
     assert formatted[2]["draws"] == 1
 
 
+def test_get_formatted_pointstable_single_query(service_created_match, query_counter):
+    """Test that the formatted points table is built with one query"""
+    match_id = service_created_match.id
+    hole = HoleService.get_hole_by_match_hole_num(match_id, 1)
+    HoleService.handle_hole_outcome(
+        match_id, hole.num, [hole.holematches[0].player2_id, -1]
+    )
+    query_counter.clear()
+
+    formatted = PointstableService.get_formatted_pointstable(match_id)
+
+    assert len(query_counter) == 1
+    assert [row["player_name"] for row in formatted] == [
+        "Player 2",
+        "Player 3",
+        "Player 4",
+        "Player 1",
+    ]
+    assert set(formatted[0]) == {
+        "player_name",
+        "thru",
+        "wins",
+        "draws",
+        "losses",
+        "points",
+    }
+
+
 def test_points_calculation_through_match(service_created_match):
     """Test points calculation through a series of hole results"""
     # Complete first three holes with different outcomes
@@ -78,7 +106,7 @@ def test_points_calculation_through_match(service_created_match):
             # Hole 3: Players 1&3 win
             winners = [holematch1.player1_id, holematch2.player2_id]
 
-        HoleService.handle_hole_outcome(service_created_match.id, hole.id, winners)
+        HoleService.handle_hole_outcome(service_created_match.id, hole.num, winners)
 
     # Get final table
     formatted = PointstableService.get_formatted_pointstable(service_created_match.id)
@@ -118,10 +146,68 @@ def test_thru_calculation(service_created_match):
         hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, i)
         HoleService.handle_hole_outcome(
             service_created_match.id,
-            hole.id,
+            hole.num,
             [hole.holematches[0].player1_id, hole.holematches[1].player1_id],
         )
 
     # Check thru holes count
     pointstable = PointstableService.get_pointstable(service_created_match.id)
     assert all(row.thru == 2 for row in pointstable)
+
+
+def test_rescoring_hole_moves_points(service_created_match):
+    """Test that changing a hole result replaces the old result in the table"""
+    hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
+    holematch1, holematch2 = hole.holematches
+    player1_id, player2_id = holematch1.player1_id, holematch1.player2_id
+
+    HoleService.handle_hole_outcome(
+        service_created_match.id, hole.num, [player1_id, holematch2.player1_id]
+    )
+    # Re-score: matchup 1 becomes a loss for player 1, matchup 2 a draw
+    HoleService.handle_hole_outcome(
+        service_created_match.id, hole.num, [player2_id, -1]
+    )
+
+    # Player 1: win replaced by a loss
+    row1 = PointstableService.get_pointsrow(service_created_match.id, player1_id)
+    assert row1.thru == 1
+    assert row1.wins == 0
+    assert row1.losses == 1
+    assert row1.points == 0
+
+    # Player 2: loss replaced by a win
+    row2 = PointstableService.get_pointsrow(service_created_match.id, player2_id)
+    assert row2.thru == 1
+    assert row2.wins == 1
+    assert row2.losses == 0
+    assert row2.points == 3
+
+    # Players 3 & 4: win/loss replaced by a draw
+    for player_id in (holematch2.player1_id, holematch2.player2_id):
+        row = PointstableService.get_pointsrow(service_created_match.id, player_id)
+        assert row.thru == 1
+        assert row.wins == 0
+        assert row.draws == 1
+        assert row.losses == 0
+        assert row.points == 1
+
+    assert PointstableService.verify_pointstable(service_created_match.id) == []
+
+
+def test_verify_and_repair_pointstable(service_created_match, _db):
+    """Test that a full recompute detects and repairs a drifted table"""
+    hole = HoleService.get_hole_by_match_hole_num(service_created_match.id, 1)
+    HoleService.handle_hole_outcome(service_created_match.id, hole.num, [-1, -1])
+
+    row = PointstableService.get_pointstable(service_created_match.id)[0]
+    row.points = 99
+    _db.session.commit()
+
+    assert PointstableService.verify_pointstable(service_created_match.id) == [
+        row.player_id
+    ]
+
+    PointstableService.update_pointstable_for_all(service_created_match.id)
+    assert PointstableService.verify_pointstable(service_created_match.id) == []
+    assert row.points == 1
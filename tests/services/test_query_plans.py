@@ -0,0 +1,76 @@
+"""Check that service queries are answered from indexes, not table scans."""
+
+import pytest
+from app.services.match_service import MatchService
+from app.services.hole_service import HoleService
+from app.services.player_service import PlayerService
+from app.services.pointstable_service import PointstableService
+
+SERVICE_CALLS = {
+    "get_all_matches": lambda match_id: MatchService.get_all_matches(),
+    "get_matches_page": lambda match_id: MatchService.get_matches_page(
+        cursor=f"2024-01-01 09:00:00|{match_id}"
+    ),
+    "get_match": lambda match_id: MatchService.get_match(match_id),
+    "get_stored_hole": lambda match_id: HoleService.get_hole_by_match_hole_num(
+        match_id, 1
+    ),
+    "get_virtual_hole": lambda match_id: HoleService.get_hole_by_match_hole_num(
+        match_id, 2
+    ),
+    "handle_hole_outcome": lambda match_id: HoleService.handle_hole_outcome(
+        match_id, 3, [-1, -1]
+    ),
+    "get_first_incomplete_hole": lambda match_id: (
+        HoleService.get_first_incomplete_hole(match_id)
+    ),
+    "get_first_incomplete_hole_num": lambda match_id: (
+        HoleService.get_first_incomplete_hole_num(match_id)
+    ),
+    "score_hole": lambda match_id: HoleService.score_hole(match_id, 1, [-1, None]),
+    "score_holes": lambda match_id: HoleService.score_holes(
+        match_id, {1: [None, -1], 4: [-1, -1]}
+    ),
+    "get_all_players": lambda match_id: PlayerService.get_all_players(match_id),
+    "get_pointstable": lambda match_id: PointstableService.get_pointstable(match_id),
+    "get_formatted_pointstable": lambda match_id: (
+        PointstableService.get_formatted_pointstable(match_id)
+    ),
+    "update_pointstable_for_all": lambda match_id: (
+        PointstableService.update_pointstable_for_all(match_id)
+    ),
+    "verify_pointstable": lambda match_id: PointstableService.verify_pointstable(
+        match_id
+    ),
+    "delete_match": lambda match_id: MatchService.delete_match(match_id),
+}
+
+
+def explain(db, statement, parameters):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement"""
+    rows = db.session.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters
+    )
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize("name", SERVICE_CALLS)
+def test_service_queries_use_indexes(name, _db, service_created_match, query_counter):
+    """Test that no statement issued by a service call scans a table"""
+    match_id = service_created_match.id
+    # Store one hole so stored-hole lookups have rows to find
+    HoleService.handle_hole_outcome(match_id, 1, [-1, -1])
+    query_counter.clear()
+
+    SERVICE_CALLS[name](match_id)
+
+    statements = [
+        (statement, parameters)
+        for statement, parameters in query_counter
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+    ]
+    assert statements
+    for statement, parameters in statements:
+        plan = explain(_db, statement, parameters)
+        scans = [detail for detail in plan if detail.startswith("SCAN")]
+        assert not scans, f"{statement}\n{plan}"
@@ -0,0 +1,70 @@
+import gzip
+import json
+import pytest
+from app.models import MatchSnapshot
+from app.services.hole_service import HoleService
+from app.services.match_service import MatchService
+from app.services.snapshot_service import SnapshotService
+
+
+@pytest.fixture
+def completed_match(_db, service_created_match):
+    """A fully drawn match marked completed"""
+    match_id = service_created_match.id
+    HoleService.score_holes(match_id, {num: [-1, -1] for num in range(1, 19)})
+    match = MatchService.get_match(match_id)
+    match.completed = True
+    _db.session.commit()
+    return match
+
+
+def test_create_snapshot(_db, completed_match):
+    """Test that a snapshot holds the standings and gzipped pages"""
+    snapshot = SnapshotService.create_snapshot(completed_match)
+
+    data = json.loads(snapshot.data)
+    assert [row["points"] for row in data["pointstable"]] == [18] * 4
+    assert len(data["scorecards"]) == 4
+
+    overview = gzip.decompress(snapshot.overview_html).decode()
+    summary = gzip.decompress(snapshot.summary_html).decode()
+    assert "Match Overview" in overview
+    assert "EventSource" not in overview
+    assert 'name="csrf-token"' not in overview
+    assert "Round Summary" in summary
+    assert snapshot.overview_etag != snapshot.summary_etag
+
+
+def test_create_snapshot_incomplete(_db, service_created_match):
+    """Test that only completed matches are snapshotted"""
+    with pytest.raises(ValueError, match="Only completed matches"):
+        SnapshotService.create_snapshot(service_created_match)
+    assert SnapshotService.get_snapshot(service_created_match) is None
+
+
+def test_get_snapshot_creates_missing(_db, completed_match):
+    """Test that a missing snapshot is built on first use"""
+    assert _db.session.get(MatchSnapshot, completed_match.id) is None
+    snapshot = SnapshotService.get_snapshot(completed_match)
+    assert snapshot.match_id == completed_match.id
+    assert SnapshotService.get_snapshot(completed_match) is snapshot
+
+
+def test_rescoring_drops_snapshot(_db, completed_match):
+    """Test that changing a completed match's results drops its snapshot"""
+    match_id = completed_match.id
+    SnapshotService.create_snapshot(completed_match)
+
+    HoleService.score_hole(match_id, 1, [None, -1])
+
+    assert _db.session.get(MatchSnapshot, match_id) is None
+
+
+def test_delete_match_deletes_snapshot(_db, completed_match):
+    """Test that deleting a match removes its snapshot"""
+    match_id = completed_match.id
+    SnapshotService.create_snapshot(completed_match)
+
+    MatchService.delete_match(match_id)
+
+    assert _db.session.get(MatchSnapshot, match_id) is None
@@ -0,0 +1,72 @@
+from app.cache import user_cache
+from app.services.user_service import UserIdentity, UserService
+
+
+def test_load_user_cached(test_user, query_counter):
+    """Test that a user's identity is loaded once and then served from cache"""
+    user_id = test_user.id
+    user_cache.clear()
+    query_counter.clear()
+
+    first = UserService.load_user(user_id)
+    second = UserService.load_user(user_id)
+
+    assert isinstance(first, UserIdentity)
+    assert second is first
+    assert first.id == user_id
+    assert first.username == "testuser"
+    assert first.is_authenticated
+    assert len(query_counter) == 1
+
+
+def test_load_user_missing(_db):
+    """Test that an unknown user ID loads as None"""
+    assert UserService.load_user(999) is None
+
+
+def test_user_update_invalidates_cache(_db, test_user):
+    """Test that changing a user drops their cached identity"""
+    assert UserService.load_user(test_user.id).username == "testuser"
+
+    test_user.username = "renamed"
+    _db.session.commit()
+
+    assert UserService.load_user(test_user.id).username == "renamed"
+
+
+def test_user_update_invalidates_cache_on_commit(_db, test_user):
+    """Test that a flushed change only evicts the cached identity on commit"""
+    user_id = test_user.id
+    cached = UserService.load_user(user_id)
+
+    test_user.username = "renamed"
+    _db.session.flush()
+    assert UserService.load_user(user_id) is cached
+    _db.session.rollback()
+    assert UserService.load_user(user_id) is cached
+
+    test_user.username = "renamed"
+    _db.session.flush()
+    _db.session.commit()
+    assert UserService.load_user(user_id).username == "renamed"
+
+
+def test_user_delete_invalidates_cache(_db, test_user):
+    """Test that a deleted user no longer loads"""
+    user_id = test_user.id
+    assert UserService.load_user(user_id) is not None
+
+    _db.session.delete(test_user)
+    _db.session.commit()
+
+    assert UserService.load_user(user_id) is None
+
+
+def test_logout_invalidates_cache(client, logged_in_user):
+    """Test that logging out drops the user's cached identity"""
+    UserService.load_user(logged_in_user.id)
+    assert user_cache.stats()["size"] == 1
+
+    client.get("/auth/logout")
+
+    assert user_cache.stats()["size"] == 0